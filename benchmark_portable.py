@@ -0,0 +1,767 @@
+"""
+Benchmark reproducible del pipeline de subtítulos.
+
+Genera videos sintéticos con las fuentes lavfi de FFmpeg, mide cada
+etapa de TraductorPortatil por separado y guarda los resultados en JSON.
+Funciona sin modelos descargados (Whisper y traductor simulados) y usa
+los modelos reales tiny/base cuando están en modelos/. También compara
+los motores de transcripción en velocidad y concordancia de palabras,
+y las formas de dividir las oraciones antes de traducir.
+
+    python benchmark_portable.py --duraciones 60,600 --salida base.json
+    python benchmark_portable.py --comparar base.json nuevo.json
+    python benchmark_portable.py --comparar-motores whisper,faster-whisper --voz
+    python benchmark_portable.py --comparar-division --transcripcion charla_en.srt
+"""
+
+import os
+import sys
+import io
+import re
+import gc
+import json
+import time
+import argparse
+import platform
+import statistics
+import contextlib
+import difflib
+import subprocess
+from types import SimpleNamespace
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import traductor_portable as tp
+from traductor_portable import TraductorPortatil, memoria_pico_mb, reiniciar_memoria_pico
+
+CARPETA_BENCHMARK = os.path.dirname(os.path.abspath(__file__))
+CARPETA_DATOS = os.path.join(CARPETA_BENCHMARK, "benchmark_datos")
+CARPETA_RESULTADOS = os.path.join(CARPETA_BENCHMARK, "benchmark_resultados")
+VERSION_FORMATO = 1
+
+# Duraciones de referencia: de 1 minuto a 3 horas
+DURACIONES_COMPLETAS = [60, 600, 3600, 10800]
+MODELOS_REALES = ["tiny", "base"]
+
+# Texto fijo para que los segmentos simulados sean siempre los mismos
+FRASES = [
+    "Welcome back to the channel.",
+    "Today we are going to talk about performance.",
+    "First, let's look at how the audio is extracted.",
+    "This part of the process usually takes a few seconds.",
+    "Mr. Smith asked whether the results were reproducible.",
+    "The answer is yes, as long as the inputs do not change!",
+    "Now we translate every segment into Spanish.",
+    "Is it faster to translate in batches? Let's find out.",
+]
+
+DICCIONARIO = {
+    "welcome": "bienvenidos", "back": "de nuevo", "to": "a", "the": "el",
+    "channel": "canal", "today": "hoy", "we": "nosotros", "are": "estamos",
+    "going": "yendo", "talk": "hablar", "about": "sobre", "performance": "rendimiento",
+    "first": "primero", "audio": "audio", "is": "es", "this": "esto",
+    "process": "proceso", "seconds": "segundos", "results": "resultados",
+    "answer": "respuesta", "yes": "sí", "translate": "traducir",
+    "every": "cada", "segment": "segmento", "into": "al", "spanish": "español",
+    "faster": "más rápido", "batches": "lotes",
+}
+
+# ============================================================
+# MODELOS SIMULADOS
+# ============================================================
+
+class WhisperSimulado:
+    """Sustituto de un modelo Whisper: un segmento cada 4 segundos de audio.
+
+    `coste_rtf` añade una espera proporcional a la duración del audio
+    para simular un modelo con ese factor de tiempo real.
+    """
+
+    def __init__(self, coste_rtf=0.0, duracion_segmento=4.0):
+        self.coste_rtf = coste_rtf
+        self.duracion_segmento = duracion_segmento
+
+    def transcribe(self, audio, **opciones):
+        import numpy as np
+
+        if isinstance(audio, str):
+            import wave
+            with wave.open(audio, 'rb') as wav:
+                audio = np.frombuffer(wav.readframes(wav.getnframes()), np.int16).astype(np.float32) / 32768.0
+
+        duracion = len(audio) / tp.FRECUENCIA_MUESTREO
+        if self.coste_rtf:
+            time.sleep(duracion * self.coste_rtf)
+
+        muestras = int(self.duracion_segmento * tp.FRECUENCIA_MUESTREO)
+        segmentos = []
+        for indice, desde in enumerate(range(0, len(audio), muestras)):
+            # Recorrer el audio de verdad, como haría el modelo
+            energia = float(np.abs(audio[desde:desde + muestras]).mean())
+            inicio = desde / tp.FRECUENCIA_MUESTREO
+            segmentos.append({
+                'id': indice,
+                'seek': desde // 160,
+                'start': round(inicio, 3),
+                'end': round(min(duracion, inicio + self.duracion_segmento * 0.9), 3),
+                'text': " " + FRASES[indice % len(FRASES)],
+                'tokens': [],
+                'temperature': 0.0,
+                'avg_logprob': -0.2,
+                'compression_ratio': 1.2,
+                'no_speech_prob': 1.0 - min(1.0, energia * 10),
+            })
+
+        return {
+            'text': "".join(s['text'] for s in segmentos),
+            'segments': segmentos,
+            'language': opciones.get('language', "en"),
+        }
+
+class MotorSimulado(tp.MotorTranscripcion):
+    """Motor para WhisperSimulado, sea cual sea el motor elegido para los reales"""
+
+    nombre = "simulado"
+    tipo_calculo = "-"
+
+    def firma(self):
+        return self.nombre
+
+    def modelo_descargado(self, modelo, ruta_modelos):
+        return True
+
+    def cargar(self, modelo, ruta_modelos, hilos=0):
+        return WhisperSimulado()
+
+    def cargar_audio(self, ruta):
+        # WhisperSimulado lee el WAV por su cuenta
+        return ruta
+
+    def transcribir(self, modelo_cargado, audio, al_segmento=None, **opciones):
+        resultado = modelo_cargado.transcribe(audio, **opciones)
+        for segmento in resultado['segments']:
+            if al_segmento:
+                al_segmento(segmento)
+        return resultado
+
+class _TokenizadorSimulado:
+    def encode(self, texto):
+        return texto.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+class _CTranslate2Simulado:
+    """Misma interfaz que ctranslate2.Translator.translate_batch"""
+
+    def translate_batch(self, tokens, target_prefix=None, **opciones):
+        return [
+            SimpleNamespace(hypotheses=[[self.traducir_token(t) for t in oracion]])
+            for oracion in tokens
+        ]
+
+    @staticmethod
+    def traducir_token(token):
+        palabra = token.strip(".,!?'").lower()
+        return token.replace(token.strip(".,!?'"), DICCIONARIO[palabra]) if palabra in DICCIONARIO else token
+
+class TraductorSimulado:
+    """Sustituto de la traducción de Argos, incluida la ruta por lotes"""
+
+    def __init__(self):
+        self.pkg = SimpleNamespace(
+            tokenizer=_TokenizadorSimulado(),
+            target_prefix="",
+            package_version="simulado",
+            package_path="",
+        )
+        self.translator = _CTranslate2Simulado()
+
+    def translate(self, texto):
+        # Como Argos: una llamada completa por texto
+        oraciones = tp.dividir_oraciones(texto)
+        resultados = self.translator.translate_batch([self.pkg.tokenizer.encode(o) for o in oraciones])
+        return " ".join(self.pkg.tokenizer.decode(r.hypotheses[0]) for r in resultados)
+
+class TraductorBenchmark(TraductorPortatil):
+    """TraductorPortatil sin estado persistente y con traductor intercambiable"""
+
+    def __init__(self, traductor="auto", **opciones):
+        self.tipo_traductor = traductor
+        super().__init__(usar_memoria_traducciones=False, usar_cache_transcripciones=False,
+                         puntos_control=False, registrar_metricas=False, **opciones)
+
+    def inicializar_traductor(self):
+        if self.tipo_traductor != "simulado":
+            super().inicializar_traductor()
+            if self.traductor_listo:
+                self.tipo_traductor = "argos"
+                return
+            if self.tipo_traductor == "argos":
+                raise RuntimeError("El traductor de Argos no está disponible")
+            print("   ⚠️ Se usará el traductor simulado")
+
+        self.tipo_traductor = "simulado"
+        self.traductores = {idioma: TraductorSimulado() for idioma in self.idiomas}
+        self.versiones_traduccion = dict.fromkeys(self.idiomas, "simulado")
+        self.traductor_listo = True
+
+# ============================================================
+# ENTRADAS SINTÉTICAS
+# ============================================================
+
+def filtro_disponible(ruta_ffmpeg, nombre):
+    try:
+        salida = subprocess.run([ruta_ffmpeg, "-hide_banner", "-filters"],
+                                capture_output=True, text=True, errors="replace").stdout
+    except Exception:
+        return False
+    return any(linea.split()[1:2] == [nombre] for linea in salida.splitlines() if linea.strip())
+
+def generar_video(ruta_ffmpeg, segundos, voz=False):
+    """Video sintético (testsrc2 + audio) de la duración pedida.
+
+    Con `voz`, el audio es habla sintetizada por el filtro flite (si este
+    FFmpeg lo incluye), para que los modelos reales tengan algo que
+    transcribir. Los videos se reutilizan entre ejecuciones.
+    """
+    os.makedirs(CARPETA_DATOS, exist_ok=True)
+
+    if voz and not filtro_disponible(ruta_ffmpeg, "flite"):
+        print("⚠️ Este FFmpeg no incluye flite, se usará un tono en lugar de voz")
+        voz = False
+
+    ruta = os.path.join(CARPETA_DATOS, f"sintetico_{segundos}s{'_voz' if voz else ''}.mp4")
+    if os.path.exists(ruta):
+        return ruta
+
+    if voz:
+        # Unas 2,5 palabras por segundo; apad rellena si la voz termina antes
+        ruta_texto = os.path.join(CARPETA_DATOS, f"guion_{segundos}s.txt")
+        palabras_por_frase = statistics.mean(len(f.split()) for f in FRASES)
+        with open(ruta_texto, 'w', encoding='utf-8') as f:
+            f.write(" ".join(FRASES[i % len(FRASES)] for i in range(int(segundos * 2.5 / palabras_por_frase) + 1)))
+        fuente_audio = "flite=textfile='{}'".format(ruta_texto.replace(os.sep, '/').replace(':', '\\:'))
+        filtros_audio = ["-af", "apad,aresample=16000"]
+    else:
+        fuente_audio = "sine=frequency=440:beep_factor=4:sample_rate=16000"
+        filtros_audio = []
+
+    print(f"🎞️ Generando video sintético de {segundos} s...")
+    comando = [
+        ruta_ffmpeg, "-hide_banner", "-nostdin", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", "testsrc2=size=160x120:rate=1",
+        "-f", "lavfi", "-i", fuente_audio,
+        *filtros_audio,
+        "-t", str(segundos),
+        "-c:v", "mpeg4", "-q:v", "31",
+        "-c:a", "aac", "-b:a", "32k",
+        ruta + ".tmp.mp4",
+    ]
+    subprocess.run(comando, check=True)
+    os.replace(ruta + ".tmp.mp4", ruta)
+    return ruta
+
+def transcripcion_sintetica(segundos):
+    """Textos de segmento como los de Whisper: uno cada 4 s, de una a tres frases"""
+    return [
+        " " + " ".join(FRASES[(i + j) % len(FRASES)] for j in range(1 + i % 3))
+        for i in range(max(1, int(segundos / 4)))
+    ]
+
+def leer_transcripcion(ruta):
+    """Textos de segmento de un SRT en inglés o de un texto con un segmento por línea"""
+    textos = []
+    with open(ruta, encoding='utf-8-sig') as f:
+        for linea in f:
+            linea = linea.strip()
+            if linea and not linea.isdigit() and "-->" not in linea:
+                textos.append(" " + linea)
+    return textos
+
+# ============================================================
+# MEDICIÓN
+# ============================================================
+
+def medir(funcion, duracion, repeticiones=1, contar=None, detalle=False):
+    """Ejecuta `funcion` varias veces y resume la etapa.
+
+    Devuelve (métricas, resultado de la última ejecución). El tiempo es
+    la mediana de las repeticiones y la memoria el mayor pico de RSS.
+    """
+    tiempos = []
+    picos = []
+    resultado = None
+    for _ in range(repeticiones):
+        gc.collect()
+        reiniciar_memoria_pico()
+        salida = contextlib.nullcontext() if detalle else contextlib.redirect_stdout(io.StringIO())
+        with salida:
+            inicio = time.perf_counter()
+            resultado = funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        picos.append(memoria_pico_mb())
+
+    segundos = statistics.median(tiempos)
+    metricas = {
+        'segundos': round(segundos, 4),
+        'segundos_min': round(min(tiempos), 4),
+        'segundos_max': round(max(tiempos), 4),
+        'rtf': round(segundos / duracion, 6) if duracion else None,
+        'memoria_pico_mb': round(max(picos), 1) if None not in picos else None,
+    }
+    if contar:
+        elementos = contar(resultado)
+        metricas['segmentos'] = elementos
+        metricas['segmentos_por_segundo'] = round(elementos / segundos, 1) if segundos else None
+    return metricas, resultado
+
+def medir_video(traductor, ruta_video, duracion, modelo, modelo_whisper, repeticiones, detalle):
+    """Mide todas las etapas del pipeline sobre un video"""
+    etapas = {}
+
+    def extraer():
+        ruta_audio = traductor.extraer_audio(ruta_video)
+        if ruta_audio is None:
+            raise RuntimeError("extraer_audio falló")
+        traductor.limpiar_archivo(ruta_audio)
+        return ruta_audio
+
+    etapas['extraer_audio'], _ = medir(extraer, duracion, repeticiones, detalle=detalle)
+    etapas['cargar_audio_memoria'], audio = medir(
+        lambda: traductor.cargar_audio_memoria(ruta_video), duracion, repeticiones, detalle=detalle
+    )
+    if audio is None:
+        raise RuntimeError("cargar_audio_memoria falló")
+
+    # Las etapas siguientes parten del mismo audio y la misma transcripción
+    etapas['transcripcion'], resultado = medir(
+        lambda: traductor.transcribir(audio, modelo_whisper, modelo),
+        duracion, repeticiones, contar=lambda r: len(r['segments']), detalle=detalle
+    )
+    segmentos = resultado['segments']
+
+    etapas['traducir_texto'], _ = medir(
+        lambda: [traductor.traducir_texto(s['text']) for s in segmentos],
+        duracion, repeticiones, contar=len, detalle=detalle
+    )
+
+    def generar():
+        ruta_srt = traductor.generar_srt(resultado, ruta_video)
+        traductor.limpiar_archivo(ruta_srt)
+        return segmentos
+
+    etapas['generar_srt'], _ = medir(generar, duracion, repeticiones, contar=len, detalle=detalle)
+
+    # formato_srt es demasiado rápido para una sola pasada: se repite
+    # hasta unas 200.000 llamadas y se informa del tiempo por pasada
+    marcas = [s['start'] for s in segmentos] + [s['end'] for s in segmentos]
+    pasadas = max(1, 200000 // max(1, len(marcas)))
+
+    def formatear():
+        for _ in range(pasadas):
+            for marca in marcas:
+                traductor.formato_srt(marca)
+        return marcas
+
+    metricas, _ = medir(formatear, duracion, repeticiones, detalle=detalle)
+    for clave in ('segundos', 'segundos_min', 'segundos_max'):
+        metricas[clave] = round(metricas[clave] / pasadas, 6)
+    metricas['rtf'] = round(metricas['segundos'] / duracion, 9)
+    metricas['llamadas_por_segundo'] = round(len(marcas) / metricas['segundos']) if metricas['segundos'] else None
+    etapas['formato_srt'] = metricas
+
+    return {'segmentos': len(segmentos), 'etapas': etapas}
+
+def modelos_a_medir(traductor, pedidos):
+    """(nombre, motor, instancia) de cada modelo Whisper a medir"""
+    modelos = []
+    for nombre in pedidos:
+        if nombre == "simulado":
+            modelos.append((nombre, MotorSimulado(), WhisperSimulado()))
+            continue
+
+        if not traductor.motor.modelo_descargado(nombre, traductor.ruta_modelos):
+            print(f"⚠️ Modelo '{nombre}' no descargado para {traductor.motor.nombre}, se omite")
+            continue
+        modelo_whisper = traductor.crear_modelo_whisper(nombre)
+        if modelo_whisper is not None:
+            modelos.append((nombre, traductor.motor, modelo_whisper))
+    return modelos
+
+def informacion_sistema(traductor):
+    version_ffmpeg = None
+    try:
+        version_ffmpeg = subprocess.run([traductor.ruta_ffmpeg, "-version"], capture_output=True,
+                                        text=True, errors="replace").stdout.splitlines()[0]
+    except Exception:
+        pass
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+        'nucleos': tp.nucleos_disponibles(),
+        'memoria_disponible_mb': tp.memoria_disponible_mb(),
+        'ffmpeg': version_ffmpeg,
+        'memoria_pico_por_etapa': reiniciar_memoria_pico(),
+    }
+
+def ejecutar_benchmark(args):
+    duraciones = DURACIONES_COMPLETAS if args.completo else [int(d) for d in args.duraciones.split(",")]
+    pedidos = [m.strip() for m in args.modelos.split(",") if m.strip()]
+    if "auto" in pedidos:
+        pedidos = ["simulado"] + MODELOS_REALES
+
+    traductor = crear_traductor(args)
+    if not traductor.ruta_ffmpeg:
+        print("❌ FFmpeg no encontrado")
+        return 1
+
+    modelos = modelos_a_medir(traductor, pedidos)
+    if not modelos:
+        print("❌ No hay modelos que medir")
+        return 1
+
+    informe = nuevo_informe(traductor, args, duraciones)
+    for duracion in duraciones:
+        ruta_video = generar_video(traductor.ruta_ffmpeg, duracion, args.voz)
+        for nombre, motor, modelo_whisper in modelos:
+            print(f"⏱️ {duracion} s | modelo {nombre} ({motor.firma()}) | traductor {traductor.tipo_traductor}")
+            traductor.motor = motor
+            medida = medir_video(traductor, ruta_video, duracion, nombre, modelo_whisper,
+                                 args.repeticiones, args.detalle)
+            informe['resultados'].append({
+                'duracion': duracion,
+                'modelo': nombre,
+                'motor': motor.firma(),
+                'traductor': traductor.tipo_traductor,
+                **medida,
+            })
+            mostrar_medida(medida)
+
+    guardar_informe(informe, args.salida)
+    return 0
+
+def crear_traductor(args):
+    with contextlib.redirect_stdout(io.StringIO()) if not args.detalle else contextlib.nullcontext():
+        return TraductorBenchmark(traductor=args.traductor, tamano_lote_traduccion=args.tamano_lote,
+                                  motor_transcripcion=args.motor)
+
+def nuevo_informe(traductor, args, duraciones):
+    return {
+        'version': VERSION_FORMATO,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'sistema': informacion_sistema(traductor),
+        'parametros': {
+            'duraciones': duraciones,
+            'repeticiones': args.repeticiones,
+            'tamano_lote_traduccion': args.tamano_lote,
+            'voz': args.voz,
+        },
+        'resultados': [],
+    }
+
+def guardar_informe(informe, salida=None):
+    salida = salida or os.path.join(
+        CARPETA_RESULTADOS, f"benchmark_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados guardados en: {salida}")
+
+def mostrar_medida(medida):
+    for etapa, m in medida['etapas'].items():
+        extra = ""
+        if 'segmentos_por_segundo' in m:
+            extra = f"  {m['segmentos_por_segundo']} seg/s"
+        elif 'llamadas_por_segundo' in m:
+            extra = f"  {m['llamadas_por_segundo']} llamadas/s"
+        print(f"   {etapa:<22} {m['segundos']:>10.4f} s  RTF {m['rtf']:<10.6f}"
+              f" pico {m['memoria_pico_mb']} MB{extra}")
+
+# ============================================================
+# COMPARACIÓN DE MOTORES
+# ============================================================
+
+def palabras(texto):
+    return re.findall(r"[\w']+", texto.lower())
+
+def concordancia_palabras(referencia, hipotesis):
+    """(concordancia, tasa de error) de dos transcripciones a nivel de palabra.
+
+    La concordancia es la proporción de palabras comunes en orden
+    (difflib); la tasa de error cuenta sustituciones, borrados e
+    inserciones respecto a la referencia, como un WER.
+    """
+    ref, hip = palabras(referencia), palabras(hipotesis)
+    if not ref and not hip:
+        return 1.0, 0.0
+    comparador = difflib.SequenceMatcher(None, ref, hip, autojunk=False)
+    errores = sum(
+        max(i2 - i1, j2 - j1)
+        for operacion, i1, i2, j1, j2 in comparador.get_opcodes() if operacion != 'equal'
+    )
+    return round(comparador.ratio(), 4), round(errores / max(1, len(ref)), 4)
+
+def comparar_motores(args):
+    """Velocidad y concordancia de cada motor sobre los mismos clips.
+
+    El primer motor de la lista es la referencia para la concordancia.
+    Cada clip se decodifica una vez y todos los motores transcriben el
+    mismo audio con el mismo modelo.
+    """
+    duraciones = DURACIONES_COMPLETAS if args.completo else [int(d) for d in args.duraciones.split(",")]
+    nombres = [m.strip() for m in args.comparar_motores.split(",") if m.strip()]
+    modelo = args.modelo_comparacion
+
+    traductor = crear_traductor(args)
+    if not traductor.ruta_ffmpeg:
+        print("❌ FFmpeg no encontrado")
+        return 1
+
+    motores = []
+    for nombre in nombres:
+        motor = tp.crear_motor(nombre, traductor.ruta_ffmpeg)
+        try:
+            descargado = motor.modelo_descargado(modelo, traductor.ruta_modelos)
+        except Exception:
+            descargado = False
+        if not descargado:
+            print(f"⚠️ {motor.firma()}: modelo '{modelo}' no disponible, se omite")
+            continue
+        motores.append(motor)
+    if len(motores) < 2:
+        print("❌ Hacen falta al menos dos motores con el modelo descargado")
+        return 1
+
+    informe = nuevo_informe(traductor, args, duraciones)
+    informe['parametros']['modelo_comparacion'] = modelo
+    clips = [(d, generar_video(traductor.ruta_ffmpeg, d, args.voz)) for d in duraciones]
+    clips += [(None, os.path.abspath(ruta)) for ruta in args.clips or []]
+
+    cargados = {}
+    for motor in motores:
+        metricas, instancia = medir(lambda: motor.cargar(modelo, traductor.ruta_modelos), None,
+                                    detalle=args.detalle)
+        cargados[motor.nombre] = (metricas, instancia)
+
+    for duracion, ruta_video in clips:
+        with contextlib.redirect_stdout(io.StringIO()):
+            audio = traductor.cargar_audio_memoria(ruta_video)
+        if audio is None:
+            print(f"⚠️ No se pudo decodificar {ruta_video}, se omite")
+            continue
+        segundos_audio = len(audio) / tp.FRECUENCIA_MUESTREO
+        duracion = duracion or round(segundos_audio)
+        print(f"🔀 {os.path.basename(ruta_video)} ({segundos_audio:.0f} s) | modelo {modelo}")
+
+        referencia = None
+        for motor in motores:
+            metricas_carga, instancia = cargados[motor.nombre]
+            etapa, resultado = medir(
+                lambda: motor.transcribir(instancia, audio, **traductor.opciones_transcripcion()),
+                segundos_audio, args.repeticiones, contar=lambda r: len(r['segments']), detalle=args.detalle
+            )
+            if referencia is None:
+                referencia = resultado['text']
+            concordancia, tasa_error = concordancia_palabras(referencia, resultado['text'])
+            informe['resultados'].append({
+                'duracion': duracion,
+                'clip': os.path.basename(ruta_video),
+                'modelo': modelo,
+                'motor': motor.firma(),
+                'traductor': "-",
+                'segmentos': len(resultado['segments']),
+                'palabras': len(palabras(resultado['text'])),
+                'concordancia': concordancia,
+                'tasa_error_palabras': tasa_error,
+                'etapas': {'carga_modelo': metricas_carga, 'transcripcion': etapa},
+            })
+            print(f"   {motor.firma():<22} {etapa['segundos']:>9.3f} s  RTF {etapa['rtf']:<9.4f}"
+                  f" pico {etapa['memoria_pico_mb']} MB  concordancia {concordancia:.1%}"
+                  f"  error {tasa_error:.1%}")
+
+    guardar_informe(informe, args.salida)
+    return 0
+
+# ============================================================
+# COMPARACIÓN DE DIVISIÓN DE ORACIONES
+# ============================================================
+
+def comparar_division(args):
+    """Velocidad y diferencias de traducción de cada división de oraciones.
+
+    La referencia es "stanza", la traducción completa de Argos. Todas las
+    divisiones traducen la misma transcripción, segmento a segmento con
+    traducir_texto y en lotes con traducir_lote (con "stanza", los lotes
+    van por la traducción por lotes de siempre, que ya divide por reglas).
+    """
+    duraciones = DURACIONES_COMPLETAS if args.completo else [int(d) for d in args.duraciones.split(",")]
+    traductor = crear_traductor(args)
+    if traductor.tipo_traductor == "simulado":
+        print("⚠️ Traductor simulado: sin stanza las tres divisiones solo difieren en el reparto de oraciones")
+
+    if args.transcripcion:
+        transcripciones = [(None, os.path.basename(args.transcripcion), leer_transcripcion(args.transcripcion))]
+    else:
+        transcripciones = [(d, f"sintetica_{d}s", transcripcion_sintetica(d)) for d in duraciones]
+
+    informe = nuevo_informe(traductor, args, duraciones)
+    divisiones = ["stanza"] + [d for d in tp.DIVISIONES_ORACIONES if d != "stanza"]
+    for duracion, nombre, textos in transcripciones:
+        print(f"✂️ {nombre} ({len(textos)} segmentos) | traductor {traductor.tipo_traductor}")
+        referencia = None
+        for division in divisiones:
+            traductor.division_oraciones = division
+            etapas = {}
+            etapas['traducir_texto'], traducciones = medir(
+                lambda: [traductor.traducir_texto(t) for t in textos],
+                duracion, args.repeticiones, contar=len, detalle=args.detalle
+            )
+            etapas['traducir_lote'], _ = medir(
+                lambda: traductor.traducir_lote(textos),
+                duracion, args.repeticiones, contar=len, detalle=args.detalle
+            )
+            if referencia is None:
+                referencia = (traducciones, etapas['traducir_texto']['segundos'])
+            distintos = sum(a.strip() != b.strip() for a, b in zip(referencia[0], traducciones))
+            concordancia, tasa_error = concordancia_palabras(" ".join(referencia[0]), " ".join(traducciones))
+            segundos = etapas['traducir_texto']['segundos']
+            aceleracion = round(referencia[1] / segundos, 2) if segundos else None
+            informe['resultados'].append({
+                'duracion': duracion,
+                'transcripcion': nombre,
+                'division_oraciones': division,
+                'traductor': traductor.tipo_traductor,
+                'segmentos': len(textos),
+                'aceleracion': aceleracion,
+                'segmentos_distintos': distintos,
+                'concordancia': concordancia,
+                'tasa_error_palabras': tasa_error,
+                'etapas': etapas,
+            })
+            print(f"   {division:<10} {segundos:>9.3f} s  x{aceleracion or 0:<6.2f}"
+                  f" lote {etapas['traducir_lote']['segundos']:.3f} s"
+                  f"  distintos {distintos}/{len(textos)}  concordancia {concordancia:.1%}")
+
+    guardar_informe(informe, args.salida)
+    return 0
+
+# ============================================================
+# COMPARACIÓN
+# ============================================================
+
+def comparar(ruta_anterior, ruta_actual, umbral=10.0, minimo=0.05):
+    """Compara dos archivos de resultados y marca las regresiones.
+
+    Una etapa empeora si tarda más de un `umbral` % y al menos `minimo`
+    segundos más que antes (por debajo de eso es ruido), o si su pico de
+    memoria crece más de un `umbral` %. Devuelve el número de regresiones.
+    """
+    with open(ruta_anterior, 'r', encoding='utf-8') as f:
+        anterior = json.load(f)
+    with open(ruta_actual, 'r', encoding='utf-8') as f:
+        actual = json.load(f)
+
+    def indexar(informe):
+        return {
+            (r['duracion'], r['modelo'], r.get('motor') or ("simulado" if r['modelo'] == "simulado" else "whisper/fp32"),
+             r['traductor'], etapa): m
+            for r in informe['resultados'] for etapa, m in r['etapas'].items()
+        }
+
+    previas = indexar(anterior)
+    nuevas = indexar(actual)
+    comunes = [clave for clave in nuevas if clave in previas]
+    if not comunes:
+        print("⚠️ Los archivos no tienen mediciones en común")
+        return 0
+
+    print(f"📊 {ruta_anterior} → {ruta_actual} (umbral {umbral:g} %)")
+    regresiones = 0
+    for clave in comunes:
+        duracion, modelo, motor, traductor, etapa = clave
+        antes, ahora = previas[clave], nuevas[clave]
+        cambio = (ahora['segundos'] / antes['segundos'] - 1) * 100 if antes['segundos'] else 0.0
+
+        problemas = []
+        if cambio > umbral and ahora['segundos'] - antes['segundos'] >= minimo:
+            problemas.append("tiempo")
+        if antes.get('memoria_pico_mb') and ahora.get('memoria_pico_mb'):
+            if (ahora['memoria_pico_mb'] / antes['memoria_pico_mb'] - 1) * 100 > umbral:
+                problemas.append("memoria")
+
+        icono = "❌" if problemas else ("✅" if cambio < -umbral else "  ")
+        print(f"{icono} {duracion:>6} s {modelo:<8} {motor:<20} {traductor:<8} {etapa:<22}"
+              f" {antes['segundos']:>10.4f} → {ahora['segundos']:>10.4f} s ({cambio:+.1f} %)"
+              f"{'  REGRESIÓN: ' + ', '.join(problemas) if problemas else ''}")
+        regresiones += bool(problemas)
+
+    if regresiones:
+        print(f"\n❌ {regresiones} regresión(es)")
+    else:
+        print("\n✅ Sin regresiones")
+    return regresiones
+
+# ============================================================
+# FUNCIÓN PRINCIPAL
+# ============================================================
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Benchmark del traductor de videos portátil")
+    parser.add_argument("--duraciones", default="60,600",
+                        help="Duraciones de los videos sintéticos en segundos (por defecto 60,600)")
+    parser.add_argument("--completo", action="store_true",
+                        help="Mide de 1 minuto a 3 horas (60,600,3600,10800)")
+    parser.add_argument("--modelos", default="auto",
+                        help="simulado, tiny, base... o auto: simulado y los reales descargados")
+    parser.add_argument("--motor", default="whisper", choices=sorted(tp.MOTORES_TRANSCRIPCION),
+                        help="Motor de transcripción para los modelos reales")
+    parser.add_argument("--comparar-motores", metavar="MOTORES",
+                        help="Compara motores (p. ej. whisper,faster-whisper) en velocidad y concordancia")
+    parser.add_argument("--modelo-comparacion", default="tiny",
+                        help="Modelo usado al comparar motores (por defecto tiny)")
+    parser.add_argument("--clips", nargs="+", metavar="VIDEO",
+                        help="Videos reales que añadir a los clips sintéticos al comparar motores")
+    parser.add_argument("--comparar-division", action="store_true",
+                        help="Compara las divisiones de oraciones (stanza, reglas, segmento) al traducir")
+    parser.add_argument("--transcripcion", metavar="ARCHIVO",
+                        help="SRT en inglés o texto (un segmento por línea) para --comparar-division")
+    parser.add_argument("--traductor", choices=["auto", "simulado", "argos"], default="auto",
+                        help="auto usa Argos si está instalado y si no el simulado")
+    parser.add_argument("--repeticiones", type=int, default=3,
+                        help="Repeticiones por etapa; se guarda la mediana (por defecto 3)")
+    parser.add_argument("--tamano-lote", type=int, default=32,
+                        help="Segmentos por lote de traducción en generar_srt")
+    parser.add_argument("--voz", action="store_true",
+                        help="Audio con voz sintetizada (filtro flite de FFmpeg) en lugar de un tono")
+    parser.add_argument("--salida", help="Archivo JSON de resultados")
+    parser.add_argument("--detalle", action="store_true",
+                        help="Muestra la salida normal del traductor durante las mediciones")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTERIOR", "ACTUAL"),
+                        help="Compara dos archivos de resultados en lugar de medir")
+    parser.add_argument("--umbral", type=float, default=10.0,
+                        help="Porcentaje de empeoramiento que cuenta como regresión (por defecto 10)")
+    parser.add_argument("--minimo", type=float, default=0.05,
+                        help="Segundos de diferencia por debajo de los cuales se ignora el cambio")
+    return parser
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+
+    print("=" * 60)
+    print("⏱️ BENCHMARK - TRADUCTOR DE VIDEOS PORTÁTIL")
+    print("=" * 60)
+
+    if args.comparar:
+        return 1 if comparar(*args.comparar, umbral=args.umbral, minimo=args.minimo) else 0
+    if args.comparar_motores:
+        return comparar_motores(args)
+    if args.comparar_division:
+        return comparar_division(args)
+    return ejecutar_benchmark(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
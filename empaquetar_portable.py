@@ -1,33 +1,61 @@
 import os
-import subprocess
 import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
 
-def main():
-    print("=" * 60)
-    print("🎁 EMPAQUETADOR - VERSIÓN CORREGIDA")
-    print("=" * 60)
+NOMBRE = "TraductorVideosPortable"
 
-    # Verificar que estamos en la carpeta correcta
-    carpeta_actual = os.getcwd()
-    print(f"\n📂 Carpeta actual: {carpeta_actual}")
+# Historial de tamaño y arranque de cada empaquetado, para comparar entre versiones
+HISTORIAL = "historial_empaquetado.jsonl"
+
+# Módulos que torch/whisper pueden arrastrar pero el traductor nunca usa
+EXCLUIR_MODULOS = [
+    "tensorboard",
+    "torch.utils.tensorboard",
+    "caffe2",
+    "triton",
+    "torchvision",
+    "torchaudio",
+    "torch.testing._internal",
+    "matplotlib",
+    "IPython",
+    "notebook",
+    "pytest",
+    "tkinter",
+]
 
-    # Buscar el archivo principal
-    archivo_principal = None
+# Partes de torch que solo sirven para compilar extensiones (relativas a la carpeta torch)
+PODA_TORCH = [
+    "include",
+    "share",
+    "test",
+    os.path.join("lib", "*.lib"),
+    os.path.join("lib", "*.a"),
+]
+
+# Carpetas de modelos: se quedan fuera del paquete, junto al ejecutable
+CARPETAS_MODELOS = ["modelos", "argos_models"]
+
+
+def buscar_archivo_principal():
     posibles_nombres = ["traductor_portable.py", "traductor_Portable.py", "TraductorPortable.py"]
 
     for nombre in posibles_nombres:
         if os.path.exists(nombre):
-            archivo_principal = nombre
-            print(f"✅ Archivo principal encontrado: {archivo_principal}")
-            break
+            print(f"✅ Archivo principal encontrado: {nombre}")
+            return nombre
+
+    print("❌ ERROR: No encuentro el archivo principal")
+    print(f"   Archivos encontrados: {os.listdir('.')}")
+    return None
 
-    if not archivo_principal:
-        print("❌ ERROR: No encuentro el archivo principal")
-        print(f"   Archivos encontrados: {os.listdir('.')}")
-        return
 
-    # Verificar ffmpeg
-    ruta_ffmpeg = None
+def buscar_ffmpeg():
     posibles_ffmpeg = [
         os.path.join("ffmpeg", "bin", "ffmpeg.exe"),
         "ffmpeg.exe",
@@ -36,28 +64,29 @@ def main():
 
     for ruta in posibles_ffmpeg:
         if os.path.exists(ruta):
-            ruta_ffmpeg = ruta
-            print(f"✅ FFmpeg encontrado: {ruta_ffmpeg}")
-            break
-
-    if not ruta_ffmpeg:
-        print("❌ No encuentro ffmpeg.exe")
-        print("   Buscando en todo el directorio...")
-        for root, dirs, files in os.walk("."):
-            if "ffmpeg.exe" in files:
-                ruta_ffmpeg = os.path.join(root, "ffmpeg.exe")
-                print(f"✅ Encontrado en: {ruta_ffmpeg}")
-                break
-        else:
-            print("❌ No se encontró ffmpeg.exe")
-            return
-
-    # Crear comando de empaquetado
+            print(f"✅ FFmpeg encontrado: {ruta}")
+            return ruta
+
+    print("❌ No encuentro ffmpeg.exe")
+    print("   Buscando en todo el directorio...")
+    for root, dirs, files in os.walk("."):
+        dirs[:] = [d for d in dirs if d not in ("build", "dist")]
+        if "ffmpeg.exe" in files:
+            ruta = os.path.join(root, "ffmpeg.exe")
+            print(f"✅ Encontrado en: {ruta}")
+            return ruta
+
+    print("❌ No se encontró ffmpeg.exe")
+    return None
+
+
+def crear_comando(archivo_principal, ruta_ffmpeg, modo):
+    """Comando de PyInstaller: "carpeta" (--onedir) o "archivo" (--onefile)"""
     comando = [
         "pyinstaller",
-        "--onefile",
-        "--name", "TraductorVideosPortable",
-        "--add-data", f"{ruta_ffmpeg};.",
+        "--onefile" if modo == "archivo" else "--onedir",
+        "--name", NOMBRE,
+        "--add-data", f"{ruta_ffmpeg}{os.pathsep}.",
         "--hidden-import", "whisper",
         "--hidden-import", "whisper.audio",
         "--hidden-import", "whisper.normalizers",
@@ -77,42 +106,265 @@ def main():
         "--hidden-import", "torch.optim",
         "--hidden-import", "torch.serialization",
         "--hidden-import", "numpy",
+        # torch lo recoge el hook de PyInstaller: --collect-all metía también
+        # cabeceras, pruebas y bibliotecas de enlace que nunca se cargan
         "--collect-all", "whisper",
         "--collect-all", "argostranslate",
-        "--collect-all", "torch",
+    ]
+    for modulo in EXCLUIR_MODULOS:
+        comando += ["--exclude-module", modulo]
+    comando += [
         "--clean",
         "--noconfirm",
         archivo_principal
     ]
+    return comando
+
+
+def ruta_ejecutable(modo):
+    nombre = NOMBRE + (".exe" if sys.platform == "win32" else "")
+    if modo == "archivo":
+        return os.path.join("dist", nombre)
+    return os.path.join("dist", NOMBRE, nombre)
+
+
+def tamano_mb(ruta, excluir=()):
+    """Tamaño de un archivo o de todo el contenido de una carpeta, en MB"""
+    if os.path.isfile(ruta):
+        return os.path.getsize(ruta) / (1024 * 1024)
+    total = 0
+    for root, dirs, files in os.walk(ruta):
+        if root == ruta:
+            dirs[:] = [d for d in dirs if d not in excluir]
+        for nombre in files:
+            try:
+                total += os.path.getsize(os.path.join(root, nombre))
+            except OSError:
+                pass
+    return total / (1024 * 1024)
+
+
+def podar_torch(carpeta):
+    """Borra de la carpeta empaquetada lo que torch no necesita en ejecución.
+
+    Devuelve los MB liberados (solo en modo carpeta: en modo archivo
+    todo está ya comprimido dentro del ejecutable).
+    """
+    candidatas = [os.path.join(carpeta, "_internal", "torch"), os.path.join(carpeta, "torch")]
+    carpeta_torch = next((c for c in candidatas if os.path.isdir(c)), None)
+    if not carpeta_torch:
+        print("⚠️ No se encontró torch dentro del paquete; no se poda nada")
+        return 0.0
+
+    liberado = 0.0
+    for patron in PODA_TORCH:
+        for ruta in glob.glob(os.path.join(carpeta_torch, patron)):
+            liberado += tamano_mb(ruta)
+            if os.path.isdir(ruta):
+                shutil.rmtree(ruta, ignore_errors=True)
+            else:
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
+    return liberado
+
+
+def copiar_modelos(destino):
+    """Copia los modelos ya descargados junto al ejecutable (fuera del paquete)"""
+    for carpeta in CARPETAS_MODELOS:
+        if os.path.isdir(carpeta):
+            shutil.copytree(carpeta, os.path.join(destino, carpeta), dirs_exist_ok=True)
+            print(f"📂 {carpeta}/ copiado junto al ejecutable ({tamano_mb(carpeta):.1f} MB)")
+
+
+def medir_arranque(exe_path, repeticiones=3):
+    """Tiempo de arranque del ejecutable hasta tener Whisper y torch importados.
+
+    La primera ejecución es la fría (recién empaquetado o tras reiniciar
+    el equipo); el resto, con los archivos ya en la caché del sistema, dan
+    la caliente (mediana). Devuelve None si el ejecutable no arranca.
+    """
+    tiempos = []
+    importacion = None
+    for _ in range(1 + repeticiones):
+        inicio = time.time()
+        try:
+            resultado = subprocess.run([exe_path, "--medir-arranque"], capture_output=True,
+                                       text=True, timeout=600)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"❌ No se pudo ejecutar {exe_path}: {e}")
+            return None
+        tiempos.append(time.time() - inicio)
+        if resultado.returncode != 0:
+            print(f"❌ El ejecutable terminó con código {resultado.returncode}")
+            for linea in (resultado.stderr or resultado.stdout).strip().split('\n')[-10:]:
+                print(linea)
+            return None
+        try:
+            importacion = json.loads(resultado.stdout.strip().split('\n')[-1])['segundos_importacion']
+        except (ValueError, KeyError, IndexError):
+            pass
+
+    return {
+        'arranque_frio_s': round(tiempos[0], 2),
+        'arranque_caliente_s': round(statistics.median(tiempos[1:]), 2) if tiempos[1:] else None,
+        'importacion_caliente_s': importacion,
+    }
 
-    print("\n⚙️ Comando a ejecutar:")
-    print(" ".join(comando))
-    print("\n🕐 Empaquetando... (esto toma varios minutos)")
 
+def version_codigo():
     try:
-        resultado = subprocess.run(comando, check=True, capture_output=True, text=True)
+        resultado = subprocess.run(["git", "describe", "--always", "--dirty"],
+                                   capture_output=True, text=True, timeout=10)
+        return resultado.stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+def registrar_historial(registro):
+    """Añade el registro al historial y devuelve el anterior del mismo modo"""
+    anterior = None
+    try:
+        with open(HISTORIAL, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    previo = json.loads(linea)
+                except ValueError:
+                    continue
+                if previo.get('modo') == registro['modo']:
+                    anterior = previo
+    except OSError:
+        pass
+
+    try:
+        with open(HISTORIAL, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar el historial: {e}")
+    return anterior
+
+
+def mostrar_informe(registro, anterior):
+    def diferencia(clave, unidad):
+        if not anterior or anterior.get(clave) is None or registro.get(clave) is None:
+            return ""
+        delta = registro[clave] - anterior[clave]
+        return f" ({delta:+.1f} {unidad} respecto a {anterior.get('version') or anterior.get('fecha')})"
+
+    print(f"\n📦 Tamaño del paquete: {registro['tamano_mb']:.1f} MB{diferencia('tamano_mb', 'MB')}")
+    if registro.get('poda_mb'):
+        print(f"✂️ Partes de torch sin usar eliminadas: {registro['poda_mb']:.1f} MB")
+    if registro.get('arranque_frio_s') is not None:
+        print(f"🧊 Arranque en frío: {registro['arranque_frio_s']:.2f} s{diferencia('arranque_frio_s', 's')}")
+    if registro.get('arranque_caliente_s') is not None:
+        print(f"🔥 Arranque en caliente: {registro['arranque_caliente_s']:.2f} s"
+              f"{diferencia('arranque_caliente_s', 's')}")
+    if registro.get('importacion_caliente_s') is not None:
+        print(f"   (de ellos, importar Whisper y torch: {registro['importacion_caliente_s']:.2f} s)")
+    print(f"📝 Historial: {HISTORIAL}")
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description=f"Empaqueta {NOMBRE} con PyInstaller")
+    parser.add_argument("--modo", choices=["carpeta", "archivo"], default="carpeta",
+                        help="carpeta: arranque rápido, se distribuye la carpeta entera (por defecto); "
+                             "archivo: un solo .exe que se descomprime en cada arranque")
+    parser.add_argument("--con-modelos", action="store_true",
+                        help="Copiar modelos/ y argos_models/ junto al ejecutable (no entran en el paquete)")
+    parser.add_argument("--repeticiones", type=int, default=3,
+                        help="Arranques en caliente a medir (por defecto: 3)")
+    parser.add_argument("--sin-medir", action="store_true",
+                        help="No medir el tiempo de arranque")
+    parser.add_argument("--solo-medir", action="store_true",
+                        help="No empaquetar: medir el paquete ya creado (p. ej. tras reiniciar, para un arranque en frío real)")
+    parser.add_argument("--sin-pausa", action="store_true",
+                        help="No esperar a Enter al terminar")
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+
+    print("=" * 60)
+    print("🎁 EMPAQUETADOR - VERSIÓN CORREGIDA")
+    print("=" * 60)
+
+    # Verificar que estamos en la carpeta correcta
+    carpeta_actual = os.getcwd()
+    print(f"\n📂 Carpeta actual: {carpeta_actual}")
+    print(f"🧩 Modo: {args.modo}")
+
+    exe_path = ruta_ejecutable(args.modo)
+    poda_mb = 0.0
+
+    if not args.solo_medir:
+        archivo_principal = buscar_archivo_principal()
+        if not archivo_principal:
+            return 1
+
+        ruta_ffmpeg = buscar_ffmpeg()
+        if not ruta_ffmpeg:
+            return 1
+
+        comando = crear_comando(archivo_principal, ruta_ffmpeg, args.modo)
+
+        print("\n⚙️ Comando a ejecutar:")
+        print(" ".join(comando))
+        print("\n🕐 Empaquetando... (esto toma varios minutos)")
+
+        try:
+            subprocess.run(comando, check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            print("\n❌ Error durante el empaquetado")
+            print("\n📋 Detalles del error:")
+            if e.stderr:
+                lineas = e.stderr.split('\n')
+                for linea in lineas[-20:]:
+                    print(linea)
+            return 1
+        except Exception as e:
+            print(f"\n❌ Error inesperado: {e}")
+            return 1
+
         print("\n✅ ¡EMPAQUETADO COMPLETADO!")
+        if args.modo == "carpeta":
+            poda_mb = podar_torch(os.path.dirname(exe_path))
 
-        exe_path = os.path.join("dist", "TraductorVideosPortable.exe")
-        if os.path.exists(exe_path):
-            tamaño = os.path.getsize(exe_path) / (1024 * 1024)
-            print(f"\n📁 Ejecutable creado: {exe_path}")
-            print(f"📦 Tamaño: {tamaño:.1f} MB")
-            print(f"\n🔍 Verifica que el traductor funcione antes de distribuir")
-        else:
-            print("\n❌ No se encontró el ejecutable")
-
-    except subprocess.CalledProcessError as e:
-        print("\n❌ Error durante el empaquetado")
-        print("\n📋 Detalles del error:")
-        if e.stderr:
-            lineas = e.stderr.split('\n')
-            for linea in lineas[-20:]:
-                print(linea)
-    except Exception as e:
-        print(f"\n❌ Error inesperado: {e}")
+    if not os.path.exists(exe_path):
+        print(f"\n❌ No se encontró el ejecutable: {exe_path}")
+        return 1
+
+    paquete = exe_path if args.modo == "archivo" else os.path.dirname(exe_path)
+    registro = {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'version': version_codigo(),
+        'modo': args.modo,
+        'solo_medicion': args.solo_medir,
+        'tamano_mb': round(tamano_mb(paquete, excluir=CARPETAS_MODELOS), 1),
+        'poda_mb': round(poda_mb, 1),
+    }
+
+    # Los modelos van junto al ejecutable, pero no cuentan como parte del paquete
+    if args.con_modelos:
+        copiar_modelos(os.path.dirname(exe_path))
+
+    if not args.sin_medir:
+        print("\n⏱️ Midiendo el arranque...")
+        medicion = medir_arranque(exe_path, max(0, args.repeticiones))
+        if medicion:
+            registro.update(medicion)
+
+    print(f"\n📁 Ejecutable: {exe_path}")
+    if args.modo == "carpeta":
+        print(f"   Distribuye la carpeta {paquete} completa (por ejemplo, comprimida en un .zip)")
+    mostrar_informe(registro, registrar_historial(registro))
+    print(f"\n🔍 Verifica que el traductor funcione antes de distribuir")
+    return 0
 
-    input("\nPresiona Enter para salir...")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    codigo = main()
+    if "--sin-pausa" not in sys.argv[1:]:
+        input("\nPresiona Enter para salir...")
+    sys.exit(codigo)
@@ -6,11 +6,30 @@ Con todas las correcciones para Argos Translate y FFmpeg
 
 import os
 import sys
+import abc
 import time
 import subprocess
-import tempfile
+import re
 import shutil
+import sqlite3
+import hashlib
+import threading
+import queue
+import types
+import importlib
+import argparse
+import json
+import difflib
+import multiprocessing
+import itertools
+import contextlib
+import math
+import gc
+import bisect
+import stat
 import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pathlib import Path
 
 # ============================================================
@@ -45,53 +64,2268 @@ def obtener_ruta_recurso(nombre_recurso):
     
     return None
 
-# Importaciones
-try:
-    import whisper
-    import argostranslate.package
-    import argostranslate.translate
-except ImportError as e:
-    print(f"❌ Error importando módulos: {e}")
-    print("   Asegúrate de tener instalados: whisper, argostranslate")
-    input("\nPresiona Enter para salir...")
-    sys.exit(1)
+# ============================================================
+# RECURSOS DEL SISTEMA
+# ============================================================
+
+MODELOS_WHISPER = ['tiny', 'base', 'small', 'medium', 'large']
+
+# Nombre con que Whisper guarda el .pt cuando no coincide con el del modelo
+ARCHIVOS_MODELOS_WHISPER = {'large': 'large-v3.pt'}
+
+# RAM aproximada por instancia de modelo (la misma que muestra el menú)
+RAM_MODELOS_MB = {'tiny': 1000, 'base': 1000, 'small': 2000, 'medium': 5000, 'large': 10000}
+
+# Millones de parámetros: el coste de cálculo crece más o menos en proporción
+PARAMETROS_MODELOS = {'tiny': 39, 'base': 74, 'small': 244, 'medium': 769, 'large': 1550}
+
+# Factor de tiempo real sin calibrar (tabla "Rendimiento Estimado" del README)
+RTF_MODELOS_ESTIMADO = {'tiny': 0.4, 'base': 0.8, 'small': 1.6, 'medium': 2.5, 'large': 3.5}
+
+EXTENSIONES_VIDEO = {
+    '.mp4', '.mkv', '.avi', '.mov', '.webm', '.m4v', '.flv', '.wmv',
+    '.mpg', '.mpeg', '.ts', '.mp3', '.wav', '.m4a', '.ogg', '.flac'
+}
+
+# Sufijo del SRT de cada idioma de destino (los demás usan su código)
+SUFIJOS_IDIOMAS = {'es': 'espanol', 'pt': 'portugues', 'fr': 'frances', 'de': 'aleman', 'it': 'italiano'}
+
+def lista_idiomas(valor):
+    """Idiomas de destino desde una lista o un texto "es,pt,fr" """
+    if isinstance(valor, str):
+        valor = valor.split(',')
+    return list(dict.fromkeys(c.strip() for c in valor if c.strip()))
+
+def segundos_de_texto(texto):
+    """Segundos desde "90", "1:30" o "01:02:03.5" (ValueError si no es válido)"""
+    partes = str(texto).strip().split(':')
+    if len(partes) > 3:
+        raise ValueError(f"Tiempo no válido: {texto}")
+    segundos = 0.0
+    for posicion, parte in enumerate(partes):
+        valor = float(parte)
+        if not math.isfinite(valor) or valor < 0:
+            raise ValueError(f"Tiempo no válido: {texto}")
+        # Con horas o minutos delante, minutos y segundos van de 0 a 59
+        if posicion > 0 and valor >= 60:
+            raise ValueError(f"Tiempo no válido: {texto}")
+        segundos = segundos * 60 + valor
+    return segundos
+
+def cuota_cpu_cgroup():
+    """Núcleos que permite la cuota de CPU del cgroup (contenedores).
+    
+    Lee cpu.max (cgroup v2) o cpu.cfs_quota_us / cpu.cfs_period_us
+    (cgroup v1). Devuelve None si no hay cuota o no se puede saber.
+    """
+    candidatos = []
+    try:
+        with open('/proc/self/cgroup') as f:
+            for linea in f:
+                partes = linea.strip().split(':', 2)
+                if len(partes) != 3:
+                    continue
+                jerarquia, controladores, ruta = partes
+                if jerarquia == '0':
+                    candidatos.append(('v2', os.path.join('/sys/fs/cgroup', ruta.lstrip('/'))))
+                elif 'cpu' in controladores.split(','):
+                    candidatos.append(('v1', os.path.join('/sys/fs/cgroup/cpu', ruta.lstrip('/'))))
+    except OSError:
+        pass
+    # Dentro de un contenedor el cgroup propio suele estar montado en la raíz
+    candidatos += [('v2', '/sys/fs/cgroup'), ('v1', '/sys/fs/cgroup/cpu')]
+    
+    for version, carpeta in candidatos:
+        try:
+            if version == 'v2':
+                with open(os.path.join(carpeta, 'cpu.max')) as f:
+                    cuota, periodo = f.read().split()[:2]
+                if cuota == 'max':
+                    return None
+            else:
+                with open(os.path.join(carpeta, 'cpu.cfs_quota_us')) as f:
+                    cuota = f.read().strip()
+                with open(os.path.join(carpeta, 'cpu.cfs_period_us')) as f:
+                    periodo = f.read().strip()
+                if int(cuota) <= 0:
+                    return None
+            return int(cuota) / int(periodo)
+        except (OSError, ValueError):
+            continue
+    return None
+
+def nucleos_disponibles():
+    """Núcleos que este proceso puede usar (afinidad y cuota del cgroup)"""
+    if hasattr(os, 'sched_getaffinity'):
+        nucleos = len(os.sched_getaffinity(0))
+    else:
+        nucleos = os.cpu_count() or 1
+    cuota = cuota_cpu_cgroup()
+    if cuota:
+        # Con más hilos que cuota, el kernel los frena a todos
+        nucleos = min(nucleos, int(cuota))
+    return max(1, nucleos)
+
+def memoria_disponible_mb():
+    """Memoria RAM disponible en MB (None si no se puede saber)"""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [
+                    ("dwLength", ctypes.c_ulong),
+                    ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong),
+                    ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong),
+                    ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong),
+                    ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+                ]
+            
+            estado = MEMORYSTATUSEX()
+            estado.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(estado))
+            return estado.ullAvailPhys / (1024 * 1024)
+        
+        with open('/proc/meminfo') as f:
+            for linea in f:
+                if linea.startswith('MemAvailable:'):
+                    return int(linea.split()[1]) / 1024
+    except Exception:
+        pass
+    return None
+
+def memoria_pico_mb():
+    """Pico de memoria residente (RSS) del proceso en MB"""
+    return _memoria_proceso_mb(pico=True)
+
+def memoria_actual_mb():
+    """Memoria residente (RSS) actual del proceso en MB (None si no se puede saber)"""
+    return _memoria_proceso_mb(pico=False)
+
+def _memoria_proceso_mb(pico):
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+            
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+            
+            contadores = PROCESS_MEMORY_COUNTERS()
+            contadores.cb = ctypes.sizeof(PROCESS_MEMORY_COUNTERS)
+            ctypes.windll.psapi.GetProcessMemoryInfo(
+                ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(contadores), contadores.cb
+            )
+            tamano = contadores.PeakWorkingSetSize if pico else contadores.WorkingSetSize
+            return tamano / (1024 * 1024)
+        
+        if os.path.exists('/proc/self/status'):
+            campo = 'VmHWM:' if pico else 'VmRSS:'
+            with open('/proc/self/status') as f:
+                for linea in f:
+                    if linea.startswith(campo):
+                        return int(linea.split()[1]) / 1024
+        
+        if not pico:
+            return None
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS lo da en bytes y Linux en KB
+        return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+    except Exception:
+        return None
+
+def reiniciar_memoria_pico():
+    """Reinicia el pico de RSS para medir una etapa (solo Linux; si no, no hace nada)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def calcular_trabajadores(modelo="base"):
+    """Número de trabajadores según núcleos y RAM libre.
+    
+    Cada trabajador tiene su propia copia del modelo Whisper y conviene
+    que tenga al menos 4 núcleos para sus hilos de torch.
+    """
+    por_nucleos = max(1, nucleos_disponibles() // 4)
+    libre = memoria_disponible_mb()
+    if libre is None:
+        return 1
+    # Se deja 1 GB para el sistema, el traductor y el audio en memoria
+    por_memoria = int((libre - 1024) // RAM_MODELOS_MB.get(modelo, 2000))
+    return max(1, min(por_nucleos, por_memoria))
+
+def listar_videos(rutas):
+    """Expande carpetas y listas .txt en una lista ordenada de videos"""
+    videos = []
+    for ruta in rutas:
+        ruta = ruta.strip().strip('"\'')
+        if os.path.isdir(ruta):
+            for nombre in sorted(os.listdir(ruta)):
+                completa = os.path.join(ruta, nombre)
+                if os.path.isfile(completa) and os.path.splitext(nombre)[1].lower() in EXTENSIONES_VIDEO:
+                    videos.append(completa)
+        elif ruta.lower().endswith('.txt') and os.path.isfile(ruta):
+            with open(ruta, 'r', encoding='utf-8') as f:
+                lineas = [l.strip() for l in f if l.strip() and not l.startswith('#')]
+            videos.extend(listar_videos(lineas))
+        else:
+            videos.append(ruta)
+    return videos
+
+# ============================================================
+# PLANIFICADOR DE HILOS
+# ============================================================
+
+class PlanificadorHilos:
+    """Reparte los núcleos entre las etapas que están en marcha.
+    
+    torch (Whisper), CTranslate2 (Argos, faster-whisper) y FFmpeg eligen
+    por su cuenta cuántos hilos usar y, cuando coinciden, se pisan. Cada
+    etapa se registra al empezar y al terminar con `etapa()`; los núcleos
+    se reparten según el peso de cada tipo de etapa (al menos 1 hilo por
+    etapa, sin pasar del total mientras haya núcleos para todas) y se
+    vuelven a repartir en cada cambio. Las etapas que pueden esperar
+    (`espera_maxima`) no arrancan mientras no quede un núcleo libre.
+    
+    Con OpenMP, torch.set_num_threads solo cambia el hilo que lo llama:
+    Whisper toma su parte en su propio hilo al empezar la etapa y cada vez
+    que llama a `ajustar_torch()`. CTranslate2 y FFmpeg fijan los suyos al
+    arrancar.
+    """
+    
+    PESOS = {'transcripcion': 4, 'traduccion': 2, 'ffmpeg': 1}
+    
+    def __init__(self, nucleos=None, al_cambiar=None):
+        self.nucleos = nucleos or nucleos_disponibles()
+        self.al_cambiar = al_cambiar
+        self.activas = {}
+        self.presupuesto = {}
+        self._contador = itertools.count()
+        self._lock = threading.Lock()
+        self._liberada = threading.Condition(self._lock)
+    
+    def repartir(self, etapas):
+        """Hilos por instancia de cada tipo de etapa para una lista de etapas activas"""
+        if not etapas:
+            return {}
+        pesos = [self.PESOS.get(e, 1) for e in etapas]
+        total = sum(pesos)
+        hilos = [max(1, self.nucleos * p // total) for p in pesos]
+        # El mínimo de 1 hilo no debe pasar del total mientras haya un núcleo por etapa
+        exceso = sum(hilos) - max(self.nucleos, len(etapas))
+        while exceso > 0:
+            mayor = max(range(len(etapas)), key=lambda i: hilos[i])
+            hilos[mayor] -= 1
+            exceso -= 1
+        # Los núcleos que sobran del redondeo, a las etapas más pesadas
+        sobrantes = self.nucleos - sum(hilos)
+        for i in sorted(range(len(etapas)), key=lambda i: -pesos[i]):
+            if sobrantes <= 0:
+                break
+            hilos[i] += 1
+            sobrantes -= 1
+        # Instancias del mismo tipo reciben lo mismo
+        return {e: min(h for e2, h in zip(etapas, hilos) if e2 == e) for e in etapas}
+    
+    def previstos(self, etapa, junto_a=()):
+        """Hilos que recibiría `etapa` si empezara ahora (más las etapas `junto_a`)"""
+        with self._lock:
+            return self.repartir(list(self.activas.values()) + list(junto_a) + [etapa])[etapa]
+    
+    @contextlib.contextmanager
+    def etapa(self, nombre, espera_maxima=0):
+        """Registra una etapa mientras dura el bloque; devuelve sus hilos.
+        
+        Con `espera_maxima` (segundos) la etapa espera a que haya menos
+        etapas activas que núcleos. Solo para etapas de las que no dependa
+        ninguna otra en marcha (decodificar el siguiente video, no la
+        entrada en vivo): pasado ese tiempo arranca igualmente.
+        """
+        identificador = next(self._contador)
+        with self._lock:
+            if espera_maxima:
+                self._liberada.wait_for(lambda: len(self.activas) < self.nucleos, timeout=espera_maxima)
+            self.activas[identificador] = nombre
+            hilos = self._rebalancear(f"inicio {nombre}")[nombre]
+        if nombre == 'transcripcion':
+            aplicar_hilos_torch(hilos)
+        try:
+            yield hilos
+        finally:
+            with self._lock:
+                del self.activas[identificador]
+                self._rebalancear(f"fin {nombre}")
+                self._liberada.notify_all()
+    
+    def ajustar_torch(self):
+        """Aplica al hilo que llama los hilos de torch que tocan ahora a la transcripción"""
+        hilos = self.presupuesto.get('transcripcion')
+        return aplicar_hilos_torch(hilos) if hilos else False
+    
+    def _rebalancear(self, motivo):
+        presupuesto = self.repartir(list(self.activas.values()))
+        self.presupuesto = presupuesto
+        if self.al_cambiar:
+            activas = {}
+            for nombre in self.activas.values():
+                activas[nombre] = activas.get(nombre, 0) + 1
+            self.al_cambiar({'motivo': motivo, 'nucleos': self.nucleos, 'activas': activas,
+                             'hilos': dict(presupuesto)})
+        return presupuesto
+
+def aplicar_hilos_torch(hilos):
+    """Hilos de torch del hilo actual (si ya está importado: no se importa solo para esto)"""
+    torch = sys.modules.get('torch')
+    if torch is None:
+        return False
+    try:
+        if torch.get_num_threads() != hilos:
+            torch.set_num_threads(hilos)
+        return True
+    except Exception:
+        return False
+
+# ============================================================
+# IMPORTACIONES DIFERIDAS
+# ============================================================
+
+# whisper y argostranslate arrastran torch y tardan segundos en importarse:
+# solo se importan cuando de verdad se van a usar.
+whisper = None
+argostranslate = None
+_lock_importaciones = threading.Lock()
+
+def importar_whisper():
+    global whisper
+    with _lock_importaciones:
+        if whisper is None:
+            try:
+                import whisper as modulo
+            except ImportError as e:
+                print(f"❌ Error importando módulos: {e}")
+                print("   Asegúrate de tener instalado: whisper")
+                raise
+            whisper = modulo
+    return whisper
+
+def importar_argostranslate():
+    """Importa Argos (ARGOS_PACKAGES_DIR debe estar definido antes)"""
+    global argostranslate
+    with _lock_importaciones:
+        if argostranslate is None:
+            try:
+                import argostranslate.package
+                import argostranslate.translate
+                modulo = sys.modules['argostranslate']
+            except ImportError as e:
+                print(f"❌ Error importando módulos: {e}")
+                print("   Asegúrate de tener instalado: argostranslate")
+                raise
+            argostranslate = modulo
+    return argostranslate
+
+# ============================================================
+# PARCHAR WHISPER PARA FFMPEG
+# ============================================================
+
+def parchear_whisper_ffmpeg(ruta_ffmpeg):
+    """Parchea Whisper para usar FFmpeg específico"""
+    if not ruta_ffmpeg or ruta_ffmpeg == "ffmpeg":
+        return False
+    
+    try:
+        importar_whisper()
+        if not hasattr(whisper.audio, '_original_load_audio'):
+            whisper.audio._original_load_audio = whisper.audio.load_audio
+        
+        def load_audio_parchada(file, sr=16000):
+            import numpy as np
+            cmd = [
+                ruta_ffmpeg,
+                "-i", file,
+                "-f", "s16le",
+                "-ac", "1",
+                "-ar", str(sr),
+                "-"
+            ]
+            try:
+                out = subprocess.run(cmd, capture_output=True, check=True).stdout
+            except subprocess.CalledProcessError as e:
+                raise RuntimeError(f"FFmpeg error: {e.stderr.decode()}") from e
+            # Una sola copia en float32 (sin flatten ni el temporal de la división)
+            audio = np.frombuffer(out, np.int16).astype(np.float32)
+            del out
+            audio /= 32768.0
+            return audio
+        
+        whisper.audio.load_audio = load_audio_parchada
+        print("✅ Whisper parchado para usar FFmpeg específico")
+        return True
+    except Exception as e:
+        print(f"⚠️ No se pudo parchear Whisper: {e}")
+        return False
+
+# ============================================================
+# SEGMENTOS DE WHISPER EN FLUJO
+# ============================================================
+
+# Whisper solo devuelve los segmentos al terminar todo el archivo. Su barra
+# de progreso se actualiza justo después de añadir los segmentos de cada
+# ventana de 30 s a `all_segments`, así que sustituimos tqdm dentro de
+# whisper.transcribe para entregar cada segmento en cuanto existe.
+_espia_segmentos = threading.local()
+
+class _BarraEspia:
+    """Barra de tqdm que además entrega los segmentos nuevos"""
+    
+    tqdm_original = None
+    
+    def __init__(self, *args, **kwargs):
+        self._barra = self.tqdm_original(*args, **kwargs)
+        self._entregados = 0
+    
+    def __enter__(self):
+        self._barra.__enter__()
+        return self
+    
+    def __exit__(self, *exc):
+        return self._barra.__exit__(*exc)
+    
+    def __getattr__(self, nombre):
+        return getattr(self._barra, nombre)
+    
+    def update(self, n=1):
+        al_segmento = getattr(_espia_segmentos, 'al_segmento', None)
+        if al_segmento:
+            segmentos = sys._getframe(1).f_locals.get('all_segments')
+            if segmentos is not None:
+                for segmento in segmentos[self._entregados:]:
+                    al_segmento(segmento)
+                self._entregados = len(segmentos)
+        return self._barra.update(n)
+
+def parchear_whisper_segmentos():
+    """Instala la barra espía en whisper.transcribe (una sola vez)"""
+    try:
+        modulo = importlib.import_module("whisper.transcribe")
+        tqdm_modulo = getattr(modulo, 'tqdm', None)
+        if tqdm_modulo is None or getattr(tqdm_modulo, 'es_espia', False):
+            return tqdm_modulo is not None
+        
+        _BarraEspia.tqdm_original = tqdm_modulo.tqdm
+        espia = types.ModuleType("tqdm")
+        espia.__dict__.update(tqdm_modulo.__dict__)
+        espia.tqdm = _BarraEspia
+        espia.es_espia = True
+        modulo.tqdm = espia
+        return True
+    except Exception as e:
+        print(f"⚠️ No se pudo seguir la transcripción en flujo: {e}")
+        return False
+
+def transcribir_con_segmentos(modelo_whisper, audio, al_segmento, **opciones):
+    """Transcribe llamando a `al_segmento` por cada segmento, en orden.
+    
+    Si Whisper no permite seguir el progreso, los segmentos se entregan
+    todos al final; el resultado es el mismo, solo sin solapamiento.
+    """
+    entregados = [0]
+    
+    def entregar(segmento):
+        entregados[0] += 1
+        al_segmento(segmento)
+    
+    parchear_whisper_segmentos()
+    _espia_segmentos.al_segmento = entregar
+    try:
+        resultado = modelo_whisper.transcribe(audio, **opciones)
+    finally:
+        _espia_segmentos.al_segmento = None
+    
+    for segmento in resultado['segments'][entregados[0]:]:
+        entregar(segmento)
+    return resultado
+
+# ============================================================
+# MODELOS WHISPER MAPEADOS EN MEMORIA
+# ============================================================
+
+_lock_construccion = threading.Lock()
+
+@contextlib.contextmanager
+def _sin_inicializar_pesos():
+    """Construye módulos de torch sin rellenar los pesos con valores aleatorios.
+    
+    torch.empty no toca la memoria hasta que se escribe en ella, así que
+    un modelo cuyos pesos se van a sustituir enseguida no llega a ocupar
+    RAM ni tiempo en inicializarse.
+    """
+    import torch.nn.init as init
+    nombres = ('kaiming_uniform_', 'uniform_', 'normal_', 'ones_', 'zeros_', 'xavier_uniform_')
+    with _lock_construccion:
+        originales = {nombre: getattr(init, nombre) for nombre in nombres}
+        try:
+            for nombre in nombres:
+                setattr(init, nombre, lambda tensor, *args, **kwargs: tensor)
+            yield
+        finally:
+            for nombre, funcion in originales.items():
+                setattr(init, nombre, funcion)
+
+class AlmacenModelosMapeados:
+    """Pesos de Whisper convertidos a un archivo plano que se mapea en memoria.
+    
+    `whisper.load_model` deserializa el .pt con pickle en memoria privada
+    de cada proceso. Aquí los pesos ya en fp32 (como se usan en CPU) se
+    guardan una vez en <carpeta>/<modelo>.pesos, con un JSON al lado con
+    las dimensiones, la posición de cada tensor y el tamaño y la fecha del
+    .pt de origen. Al cargar, cada tensor es una vista del archivo mapeado
+    (copia en escritura), así que no hay lectura previa y los procesos que
+    cargan el mismo modelo comparten las páginas de la caché del sistema.
+    Si el .pt cambia, el JSON deja de coincidir y se vuelve a convertir.
+    """
+    
+    VERSION = 1
+    ALINEACION = 64
+    
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+    
+    def rutas(self, modelo):
+        base = os.path.join(self.carpeta, modelo)
+        return base + ".pesos", base + ".json"
+    
+    @staticmethod
+    def origen(ruta_pt):
+        info = os.stat(ruta_pt)
+        return {'archivo': os.path.basename(ruta_pt), 'tamano': info.st_size, 'mtime_ns': info.st_mtime_ns}
+    
+    def indice(self, modelo, ruta_pt):
+        """Índice de la conversión si sigue valiendo para este .pt (None si no)"""
+        ruta_pesos, ruta_indice = self.rutas(modelo)
+        try:
+            with open(ruta_indice, 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+            if (indice.get('version') != self.VERSION
+                    or indice.get('origen') != self.origen(ruta_pt)
+                    or os.path.getsize(ruta_pesos) != indice.get('tamano')):
+                return None
+            return indice
+        except (OSError, ValueError):
+            return None
+    
+    def cargar(self, modelo, ruta_pt):
+        """Modelo de Whisper sobre los pesos mapeados (None si no hay conversión válida)"""
+        indice = self.indice(modelo, ruta_pt)
+        if indice is None:
+            return None
+        import numpy as np
+        import torch
+        
+        ruta_pesos, _ = self.rutas(modelo)
+        mapa = np.memmap(ruta_pesos, dtype=np.uint8, mode='c')
+        estado = {}
+        for tensor in indice['tensores']:
+            tipo = np.dtype(tensor['tipo'])
+            bytes_tensor = int(np.prod(tensor['forma'], dtype=np.int64)) * tipo.itemsize
+            vista = mapa[tensor['desplazamiento']:tensor['desplazamiento'] + bytes_tensor]
+            estado[tensor['nombre']] = torch.from_numpy(vista.view(tipo).reshape(tensor['forma']))
+        
+        with _sin_inicializar_pesos():
+            modelo_cargado = whisper.model.Whisper(whisper.model.ModelDimensions(**indice['dims']))
+        modelo_cargado.load_state_dict(estado, assign=True)
+        if indice.get('alignment_heads'):
+            modelo_cargado.set_alignment_heads(indice['alignment_heads'].encode('ascii'))
+        return modelo_cargado.eval()
+    
+    def convertir(self, modelo, modelo_cargado, ruta_pt):
+        """Guarda los pesos de un modelo ya cargado con whisper.load_model"""
+        os.makedirs(self.carpeta, exist_ok=True)
+        ruta_pesos, ruta_indice = self.rutas(modelo)
+        tensores = []
+        desplazamiento = 0
+        with open(ruta_pesos + ".tmp", 'wb') as f:
+            for nombre, tensor in modelo_cargado.state_dict().items():
+                relleno = -desplazamiento % self.ALINEACION
+                f.write(b"\0" * relleno)
+                desplazamiento += relleno
+                datos = tensor.detach().cpu().contiguous().numpy()
+                f.write(datos.data)
+                tensores.append({'nombre': nombre, 'forma': list(datos.shape), 'tipo': datos.dtype.str,
+                                 'desplazamiento': desplazamiento})
+                desplazamiento += datos.nbytes
+        alineacion = getattr(whisper, '_ALIGNMENT_HEADS', {}).get(modelo)
+        indice = {
+            'version': self.VERSION,
+            'modelo': modelo,
+            'dims': dict(vars(modelo_cargado.dims)),
+            'alignment_heads': alineacion.decode('ascii') if alineacion else None,
+            'origen': self.origen(ruta_pt),
+            'tamano': desplazamiento,
+            'tensores': tensores,
+        }
+        # Primero los pesos y después el índice: un índice válido implica pesos completos
+        os.replace(ruta_pesos + ".tmp", ruta_pesos)
+        with open(ruta_indice + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(indice, f)
+        os.replace(ruta_indice + ".tmp", ruta_indice)
+        return desplazamiento
+
+# ============================================================
+# MOTORES DE TRANSCRIPCIÓN
+# ============================================================
+
+class MotorTranscripcion(abc.ABC):
+    """Interfaz de un motor de transcripción.
+    
+    Cada motor carga y ejecuta sus modelos a su manera, pero `transcribir`
+    devuelve siempre el mismo dict que whisper.transcribe: 'text',
+    'segments' (id, start, end, text...) y 'language', y llama a
+    `al_segmento` por cada segmento en cuanto está disponible.
+    """
+    
+    nombre = None
+    tipo_calculo = None
+    
+    def __init__(self, ruta_ffmpeg=None):
+        self.ruta_ffmpeg = ruta_ffmpeg
+    
+    def firma(self):
+        """Identifica motor y precisión (forma parte de la clave de la caché)"""
+        return f"{self.nombre}/{self.tipo_calculo}"
+    
+    @abc.abstractmethod
+    def modelo_descargado(self, modelo, ruta_modelos):
+        """True si el modelo ya está en `ruta_modelos` (sin descargar nada)"""
+    
+    @abc.abstractmethod
+    def cargar(self, modelo, ruta_modelos, hilos=0):
+        """Carga una instancia nueva del modelo; `hilos` = 0 deja el valor por defecto"""
+    
+    @abc.abstractmethod
+    def transcribir(self, modelo_cargado, audio, al_segmento=None, **opciones):
+        """Resultado como el de whisper.transcribe, llamando a `al_segmento` por segmento"""
+    
+    @abc.abstractmethod
+    def cargar_audio(self, ruta):
+        """Audio de un archivo como array de NumPy mono a 16 kHz"""
+
+class MotorWhisper(MotorTranscripcion):
+    """openai-whisper sobre PyTorch en fp32 (el motor original)"""
+    
+    nombre = "whisper"
+    tipo_calculo = "fp32"
+    
+    def __init__(self, ruta_ffmpeg=None):
+        super().__init__(ruta_ffmpeg)
+        self.preparado = False
+    
+    def preparar(self):
+        """Importa Whisper y lo parchea para el FFmpeg configurado (una vez)"""
+        if not self.preparado:
+            importar_whisper()
+            if self.ruta_ffmpeg and self.ruta_ffmpeg != "ffmpeg":
+                parchear_whisper_ffmpeg(self.ruta_ffmpeg)
+            self.preparado = True
+    
+    def modelo_descargado(self, modelo, ruta_modelos):
+        return os.path.exists(self.ruta_checkpoint(modelo, ruta_modelos))
+    
+    def cargar(self, modelo, ruta_modelos, hilos=0):
+        self.preparar()
+        if hilos:
+            try:
+                import torch
+                torch.set_num_threads(hilos)
+            except Exception:
+                pass
+        os.environ["WHISPER_CACHE_DIR"] = ruta_modelos
+        
+        # Los pesos convertidos se mapean en memoria en lugar de leer el .pt
+        almacen = AlmacenModelosMapeados(os.path.join(ruta_modelos, "mapeados"))
+        ruta_pt = self.ruta_checkpoint(modelo, ruta_modelos)
+        if os.path.exists(ruta_pt):
+            try:
+                modelo_cargado = almacen.cargar(modelo, ruta_pt)
+                if modelo_cargado is not None:
+                    return modelo_cargado
+            except Exception as e:
+                print(f"⚠️ No se pudo usar el modelo mapeado ({e}); se carga el original")
+        
+        modelo_cargado = whisper.load_model(modelo, device="cpu", download_root=ruta_modelos)
+        if os.path.exists(ruta_pt):
+            try:
+                tamano = almacen.convertir(modelo, modelo_cargado, ruta_pt)
+                print(f"💾 Modelo '{modelo}' convertido para cargarse mapeado en memoria "
+                      f"({tamano / (1024 * 1024):.0f} MB)")
+            except Exception as e:
+                # En Windows no se puede reemplazar un archivo que otro proceso tiene mapeado
+                print(f"⚠️ No se pudo convertir el modelo para mapearlo: {e}")
+        return modelo_cargado
+    
+    @staticmethod
+    def ruta_checkpoint(modelo, ruta_modelos):
+        """Ruta del .pt que descarga Whisper ('large' se guarda como large-v3.pt)"""
+        url = getattr(whisper, '_MODELS', {}).get(modelo)
+        nombre = os.path.basename(url) if url else ARCHIVOS_MODELOS_WHISPER.get(modelo, f"{modelo}.pt")
+        return os.path.join(ruta_modelos, nombre)
+    
+    def transcribir(self, modelo_cargado, audio, al_segmento=None, **opciones):
+        if al_segmento:
+            return transcribir_con_segmentos(modelo_cargado, audio, al_segmento, **opciones)
+        return modelo_cargado.transcribe(audio, **opciones)
+    
+    def cargar_audio(self, ruta):
+        self.preparar()
+        return whisper.audio.load_audio(ruta)
+
+class MotorFasterWhisper(MotorTranscripcion):
+    """faster-whisper (CTranslate2) con pesos cuantizados a int8 en CPU.
+    
+    Los modelos convertidos se guardan en modelos/faster-whisper/. Los
+    segmentos salen de un generador, así que se entregan en flujo sin
+    necesidad de parches.
+    """
+    
+    nombre = "faster-whisper"
+    # Opciones de whisper.transcribe que faster-whisper llama de otra forma o no tiene
+    OPCIONES_RENOMBRADAS = {'logprob_threshold': 'log_prob_threshold'}
+    OPCIONES_IGNORADAS = ('fp16', 'verbose')
+    
+    def __init__(self, ruta_ffmpeg=None, tipo_calculo="int8"):
+        super().__init__(ruta_ffmpeg)
+        self.tipo_calculo = tipo_calculo
+    
+    @staticmethod
+    def importar():
+        try:
+            import faster_whisper
+        except ImportError:
+            print("❌ Error importando módulos: faster_whisper")
+            print("   Asegúrate de tener instalado: faster-whisper")
+            raise
+        return faster_whisper
+    
+    @staticmethod
+    def carpeta_modelos(ruta_modelos):
+        return os.path.join(ruta_modelos, "faster-whisper")
+    
+    def modelo_descargado(self, modelo, ruta_modelos):
+        try:
+            from faster_whisper.utils import download_model
+            download_model(modelo, local_files_only=True, cache_dir=self.carpeta_modelos(ruta_modelos))
+            return True
+        except Exception:
+            return False
+    
+    def cargar(self, modelo, ruta_modelos, hilos=0):
+        faster_whisper = self.importar()
+        parametros = dict(device="cpu", compute_type=self.tipo_calculo, cpu_threads=hilos or 0,
+                          download_root=self.carpeta_modelos(ruta_modelos))
+        try:
+            # Sin red si el modelo ya está en disco
+            return faster_whisper.WhisperModel(modelo, local_files_only=True, **parametros)
+        except Exception:
+            print(f"⬇️ Descargando modelo '{modelo}' para faster-whisper (solo la primera vez)...")
+            return faster_whisper.WhisperModel(modelo, **parametros)
+    
+    def transcribir(self, modelo_cargado, audio, al_segmento=None, **opciones):
+        # whisper.transcribe decodifica en modo voraz por defecto; igual aquí
+        parametros = {'beam_size': 1}
+        for clave, valor in opciones.items():
+            if clave not in self.OPCIONES_IGNORADAS:
+                parametros[self.OPCIONES_RENOMBRADAS.get(clave, clave)] = valor
+        
+        generador, info = modelo_cargado.transcribe(audio, **parametros)
+        segmentos = []
+        for s in generador:
+            segmento = {
+                'id': len(segmentos),
+                'seek': s.seek,
+                'start': round(s.start, 3),
+                'end': round(s.end, 3),
+                'text': s.text,
+                'tokens': list(s.tokens),
+                'temperature': s.temperature,
+                'avg_logprob': s.avg_logprob,
+                'compression_ratio': s.compression_ratio,
+                'no_speech_prob': s.no_speech_prob,
+            }
+            segmentos.append(segmento)
+            if al_segmento:
+                al_segmento(segmento)
+        
+        return {
+            'text': "".join(s['text'] for s in segmentos),
+            'segments': segmentos,
+            'language': info.language,
+        }
+    
+    def cargar_audio(self, ruta):
+        return self.importar().decode_audio(ruta, sampling_rate=FRECUENCIA_MUESTREO)
+
+MOTORES_TRANSCRIPCION = {
+    MotorWhisper.nombre: MotorWhisper,
+    MotorFasterWhisper.nombre: MotorFasterWhisper,
+}
+
+def crear_motor(nombre="whisper", ruta_ffmpeg=None):
+    if nombre not in MOTORES_TRANSCRIPCION:
+        raise ValueError(f"Motor de transcripción desconocido: {nombre}")
+    return MOTORES_TRANSCRIPCION[nombre](ruta_ffmpeg=ruta_ffmpeg)
+
+# ============================================================
+# TRANSCRIPCIÓN EN PARALELO POR VENTANAS
+# ============================================================
+
+FRECUENCIA_MUESTREO = 16000
+
+# Motor y modelo cargados una sola vez en cada proceso trabajador
+_motor_trabajador = None
+_modelo_trabajador = None
+
+def _inicializar_trabajador_transcripcion(motor, modelo, ruta_modelos, hilos):
+    global _motor_trabajador, _modelo_trabajador
+    _motor_trabajador = crear_motor(motor)
+    _modelo_trabajador = _motor_trabajador.cargar(modelo, ruta_modelos, hilos)
+
+def _transcribir_ventana(desplazamiento, audio, opciones):
+    """Transcribe una ventana y devuelve sus segmentos en tiempo global"""
+    resultado = _motor_trabajador.transcribir(_modelo_trabajador, audio, **opciones)
+    segmentos = []
+    for segmento in resultado['segments']:
+        segmento = dict(segmento)
+        segmento['start'] = round(segmento['start'] + desplazamiento, 3)
+        segmento['end'] = round(segmento['end'] + desplazamiento, 3)
+        segmentos.append(segmento)
+    return segmentos
+
+def dividir_en_ventanas(total_muestras, ventana=600, solape=10):
+    """Devuelve (inicio, fin) en muestras de ventanas solapadas"""
+    tam = int(ventana * FRECUENCIA_MUESTREO)
+    paso = tam - int(solape * FRECUENCIA_MUESTREO)
+    if paso <= 0:
+        raise ValueError("El solape debe ser menor que la ventana")
+    ventanas = []
+    inicio = 0
+    while True:
+        fin = min(inicio + tam, total_muestras)
+        ventanas.append((inicio, fin))
+        if fin >= total_muestras:
+            return ventanas
+        inicio += paso
+
+def _textos_similares(a, b):
+    a, b = normalizar_texto(a).lower(), normalizar_texto(b).lower()
+    if not a or not b:
+        return a == b
+    return a in b or b in a or difflib.SequenceMatcher(None, a, b).ratio() > 0.8
+
+class UnionVentanas:
+    """Une los segmentos de ventanas solapadas, en orden.
+    
+    De cada solape se toma la mitad de cada ventana (corte en el punto
+    medio) y se descartan los segmentos repetidos que Whisper produce a
+    ambos lados del corte.
+    """
+    
+    def __init__(self, ventanas):
+        self.cortes = [
+            (inicio_sig + fin) / 2 / FRECUENCIA_MUESTREO
+            for (_, fin), (inicio_sig, _) in zip(ventanas, ventanas[1:])
+        ]
+        self.segmentos = []
+    
+    def agregar(self, indice, segmentos):
+        """Añade los segmentos de la ventana `indice` y devuelve los aceptados"""
+        desde = self.cortes[indice - 1] if indice > 0 else float('-inf')
+        hasta = self.cortes[indice] if indice < len(self.cortes) else float('inf')
+        aceptados = []
+        for segmento in segmentos:
+            if not desde <= segmento['start'] < hasta:
+                continue
+            previo = self.segmentos[-1] if self.segmentos else None
+            if (previo and segmento['start'] < previo['end']
+                    and _textos_similares(segmento['text'], previo['text'])):
+                continue
+            segmento['id'] = len(self.segmentos)
+            self.segmentos.append(segmento)
+            aceptados.append(segmento)
+        return aceptados
+
+# ============================================================
+# DECODIFICACIÓN POR LOTES (VARIOS CLIPS A LA VEZ)
+# ============================================================
+
+def cortes_en_silencios(audio, ventana=30.0, margen=5.0):
+    """(inicio, fin) en muestras de ventanas consecutivas de hasta `ventana` s.
+    
+    Cada corte se hace en la décima de segundo más silenciosa de los
+    últimos `margen` segundos de la ventana, para no partir palabras.
+    """
+    import numpy as np
+    tam = int(ventana * FRECUENCIA_MUESTREO)
+    trama = FRECUENCIA_MUESTREO // 10
+    ventanas = []
+    inicio = 0
+    while len(audio) - inicio > tam:
+        desde = inicio + tam - int(margen * FRECUENCIA_MUESTREO)
+        tramas = audio[desde:desde + int(margen * FRECUENCIA_MUESTREO)].reshape(-1, trama)
+        fin = desde + int(np.square(tramas).mean(axis=1).argmin()) * trama + trama // 2
+        ventanas.append((inicio, fin))
+        inicio = fin
+    if len(audio) > inicio or not ventanas:
+        ventanas.append((inicio, len(audio)))
+    return ventanas
+
+class DecodificadorPorLotes:
+    """Decodifica juntas ventanas de 30 s de uno o varios audios.
+    
+    `transcribir` (desde cualquier hilo) corta el audio en ventanas
+    independientes, calcula su espectrograma y las deja en una cola; un
+    único hilo las agrupa en lotes de hasta `tamano_lote` y llama a
+    `whisper.decode` con todas a la vez, que aprovecha mucho mejor la CPU
+    que una ventana tras otra. Los segmentos vuelven a cada solicitud con
+    sus tiempos globales y en orden. A diferencia de `transcribe`, cada
+    ventana no se condiciona con el texto de la anterior; las que salen
+    repetitivas o con poca confianza se decodifican otra vez, solas,
+    subiendo la temperatura como hace `transcribe`.
+    """
+    
+    TEMPERATURAS = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+    
+    def __init__(self, modelo_whisper, tamano_lote=8, espera=0.05, planificador=None, metricas=None):
+        self.modelo = modelo_whisper
+        self.tamano_lote = max(1, tamano_lote)
+        self.espera = espera
+        self.planificador = planificador
+        self.metricas = metricas
+        self.cola = queue.Queue(maxsize=2 * self.tamano_lote)
+        self.aparcadas = []
+        self.tokenizadores = {}
+        self.hilo = threading.Thread(target=self._bucle, name="whisper-lotes", daemon=True)
+        self.hilo.start()
+    
+    def transcribir(self, audio, al_segmento=None, language=None, task="transcribe", **opciones):
+        """Mismo formato que whisper.transcribe; `al_segmento` recibe cada segmento en orden"""
+        ventanas = cortes_en_silencios(audio)
+        resultados = queue.Queue()
+        
+        def enviar():
+            try:
+                for indice, (inicio, fin) in enumerate(ventanas):
+                    mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio[inicio:fin]),
+                                                      n_mels=self.modelo.dims.n_mels)
+                    self.cola.put(((language, task), mel, inicio / FRECUENCIA_MUESTREO,
+                                   (fin - inicio) / FRECUENCIA_MUESTREO, indice, resultados))
+            except Exception as e:
+                resultados.put((None, e))
+        
+        threading.Thread(target=enviar, name="whisper-lotes-envio", daemon=True).start()
+        
+        segmentos = []
+        terminadas = {}
+        siguiente = 0
+        for _ in ventanas:
+            indice, segmentos_ventana = resultados.get()
+            if isinstance(segmentos_ventana, Exception):
+                raise segmentos_ventana
+            terminadas[indice] = segmentos_ventana
+            # Se entrega en orden: una ventana puede terminar antes que la anterior
+            while siguiente in terminadas:
+                for segmento in terminadas.pop(siguiente):
+                    segmento['id'] = len(segmentos)
+                    segmentos.append(segmento)
+                    if al_segmento:
+                        al_segmento(segmento)
+                siguiente += 1
+        
+        return {'text': "".join(s['text'] for s in segmentos), 'segments': segmentos, 'language': language}
+    
+    def _siguiente_lote(self):
+        """Ventanas con las mismas opciones: espera la primera y junta las que lleguen enseguida"""
+        pendientes = self.aparcadas or [self.cola.get()]
+        self.aparcadas = []
+        limite = time.monotonic() + self.espera
+        while len(pendientes) < self.tamano_lote:
+            try:
+                pendientes.append(self.cola.get(timeout=max(0.0, limite - time.monotonic())))
+            except queue.Empty:
+                break
+        clave = pendientes[0][0]
+        lote = []
+        for ventana in pendientes:
+            if ventana[0] == clave and len(lote) < self.tamano_lote:
+                lote.append(ventana)
+            else:
+                self.aparcadas.append(ventana)
+        return clave, lote
+    
+    def _bucle(self):
+        while True:
+            clave, lote = self._siguiente_lote()
+            inicio = time.perf_counter()
+            etapa = self.planificador.etapa('transcripcion') if self.planificador else contextlib.nullcontext()
+            try:
+                with etapa:
+                    segmentos = self._decodificar(clave, lote)
+                for (_, _, _, _, indice, resultados), segmentos_ventana in zip(lote, segmentos):
+                    resultados.put((indice, segmentos_ventana))
+            except Exception as e:
+                for _, _, _, _, indice, resultados in lote:
+                    resultados.put((indice, e))
+                continue
+            if self.metricas:
+                self.metricas.registrar('decodificacion_lote', time.perf_counter() - inicio,
+                                        segundos_audio=sum(v[3] for v in lote), ventanas=len(lote),
+                                        solicitudes=len({id(v[5]) for v in lote}))
+    
+    def _decodificar(self, clave, lote):
+        import torch
+        language, task = clave
+        mels = torch.stack([mel for _, mel, _, _, _, _ in lote])
+        opciones = whisper.DecodingOptions(language=language, task=task, fp16=False, temperature=0.0)
+        resultados = whisper.decode(self.modelo, mels, opciones)
+        
+        segmentos = []
+        for (_, mel, inicio, duracion, _, _), resultado in zip(lote, resultados):
+            temperaturas = iter(self.TEMPERATURAS[1:])
+            while self._repetir(resultado):
+                temperatura = next(temperaturas, None)
+                if temperatura is None:
+                    break
+                resultado = whisper.decode(self.modelo, mel, whisper.DecodingOptions(
+                    language=language, task=task, fp16=False, temperature=temperatura))
+            if resultado.no_speech_prob > 0.6 and resultado.avg_logprob < -1.0:
+                segmentos.append([])
+            else:
+                segmentos.append(self._segmentos(resultado, inicio, duracion, clave))
+        return segmentos
+    
+    @staticmethod
+    def _repetir(resultado):
+        """Los mismos umbrales con los que transcribe sube la temperatura"""
+        if resultado.no_speech_prob > 0.6 and resultado.avg_logprob < -1.0:
+            return False
+        return resultado.compression_ratio > 2.4 or resultado.avg_logprob < -1.0
+    
+    def _segmentos(self, resultado, inicio, duracion, clave):
+        """Segmentos con tiempo global a partir de las marcas de tiempo de los tokens"""
+        if clave not in self.tokenizadores:
+            self.tokenizadores[clave] = whisper.tokenizer.get_tokenizer(
+                self.modelo.is_multilingual, num_languages=self.modelo.num_languages,
+                language=clave[0], task=clave[1])
+        tokenizador = self.tokenizadores[clave]
+        
+        segmentos = []
+        texto = []
+        desde = 0.0
+        
+        def cerrar(hasta):
+            if texto and tokenizador.decode(texto).strip():
+                segmentos.append({
+                    'id': 0,
+                    'seek': int(inicio * 100),
+                    'start': round(inicio + min(desde, duracion), 3),
+                    'end': round(inicio + min(max(hasta, desde), duracion), 3),
+                    'text': tokenizador.decode(texto),
+                    'tokens': list(texto),
+                    'temperature': resultado.temperature,
+                    'avg_logprob': resultado.avg_logprob,
+                    'compression_ratio': resultado.compression_ratio,
+                    'no_speech_prob': resultado.no_speech_prob,
+                })
+            texto.clear()
+        
+        for token in resultado.tokens:
+            if token >= tokenizador.timestamp_begin:
+                tiempo = (token - tokenizador.timestamp_begin) * 0.02
+                if texto:
+                    cerrar(tiempo)
+                desde = tiempo
+            else:
+                texto.append(token)
+        cerrar(duracion)
+        return segmentos
+
+# ============================================================
+# DETECCIÓN DE VOZ (FILTRO PREVIO A WHISPER)
+# ============================================================
+
+def detectar_voz(audio, margen_db=12.0, minimo_db=-55.0, fondo_maximo_db=-50.0, voz_minima=0.25,
+                 silencio_minimo=0.6, relleno=0.3):
+    """Tramos (inicio, fin) en muestras donde hay voz, por energía en tramas de 30 ms.
+    
+    Una trama tiene voz si su energía supera en `margen_db` al ruido de
+    fondo y a `minimo_db`. El fondo es el percentil 10, pero nunca más de
+    `fondo_maximo_db`: una música continua no pasa por ruido. Primero se
+    unen los tramos separados por menos de `silencio_minimo` s (el habla
+    entrecortada queda en un solo tramo), luego se descartan los de menos
+    de `voz_minima` s y se amplían `relleno` s por cada lado para no
+    comerse el principio y el final de las palabras. Es un detector de
+    actividad, no de habla: la música alta cuenta como voz.
+    """
+    import numpy as np
+    trama = FRECUENCIA_MUESTREO * 30 // 1000
+    total = len(audio) // trama
+    if total == 0:
+        return []
+    energia = 10 * np.log10(np.square(audio[:total * trama].reshape(total, trama)).mean(axis=1) + 1e-10)
+    fondo = min(float(np.percentile(energia, 10)), fondo_maximo_db)
+    umbral = max(fondo + margen_db, minimo_db)
+    activo = np.concatenate(([0], (energia > umbral).astype(np.int8), [0]))
+    cambios = np.flatnonzero(np.diff(activo))
+    
+    por_segundo = 1000 / 30
+    unidos = []
+    for inicio, fin in zip(cambios[::2], cambios[1::2]):
+        if unidos and inicio - unidos[-1][1] < silencio_minimo * por_segundo:
+            unidos[-1][1] = fin
+        else:
+            unidos.append([inicio, fin])
+    
+    tramos = []
+    for inicio, fin in unidos:
+        if fin - inicio < voz_minima * por_segundo:
+            continue
+        inicio = max(0, inicio - int(relleno * por_segundo))
+        fin = min(total, fin + int(relleno * por_segundo))
+        if tramos and inicio <= tramos[-1][1]:
+            tramos[-1][1] = fin
+        else:
+            tramos.append([inicio, fin])
+    
+    tramos = [(inicio * trama, fin * trama) for inicio, fin in tramos]
+    if tramos and tramos[-1][1] == total * trama:
+        # El resto que no llena una trama va con el último tramo
+        tramos[-1] = (tramos[-1][0], len(audio))
+    return tramos
+
+class MapaTiempos:
+    """Pasa tiempos del audio con solo los tramos de voz a los del original"""
+    
+    def __init__(self, tramos):
+        self.inicios_recorte = []
+        self.inicios_original = []
+        acumulado = 0
+        for inicio, fin in tramos:
+            self.inicios_recorte.append(acumulado / FRECUENCIA_MUESTREO)
+            self.inicios_original.append(inicio / FRECUENCIA_MUESTREO)
+            acumulado += fin - inicio
+    
+    def original(self, segundo, final=False):
+        # Un final justo en la unión de dos tramos pertenece al primero
+        buscar = bisect.bisect_left if final else bisect.bisect_right
+        indice = max(0, buscar(self.inicios_recorte, segundo) - 1)
+        return self.inicios_original[indice] + segundo - self.inicios_recorte[indice]
+    
+    def segmento(self, segmento):
+        return dict(segmento, start=round(self.original(segmento['start']), 3),
+                    end=round(self.original(segmento['end'], final=True), 3))
+
+# ============================================================
+# AUDIO POR BLOQUES Y TRANSCRIPCIÓN EN VIVO
+# ============================================================
+
+class FuenteAudio:
+    """Audio de FFmpeg (PCM mono a 16 kHz) leído por bloques mientras se decodifica.
+    
+    Un hilo vacía la salida de FFmpeg en una cola de bloques float32 y
+    anota cuándo llegó cada uno, para medir la latencia en vivo. La
+    entrada puede ser un archivo (también uno que aún se está
+    escribiendo, con `-follow 1`), "-" para la entrada estándar, una
+    tubería con nombre o una URL de FFmpeg (udp://, rtp://, srt://...).
+    """
+    
+    def __init__(self, ruta_ffmpeg, entrada, opciones_entrada=(), opciones_salida=("-vn",),
+                 segundos_bloque=0.5, hilos=0, maximo_bloques=0):
+        comando = [ruta_ffmpeg, "-hide_banner", "-loglevel", "error", "-threads", str(hilos)]
+        if entrada != "-":
+            comando.append("-nostdin")
+        comando += list(opciones_entrada) + ["-i", entrada] + list(opciones_salida) + [
+            "-f", "s16le",
+            "-acodec", "pcm_s16le",
+            "-ac", "1",
+            "-ar", "16000",
+            "-"
+        ]
+        self.proceso = subprocess.Popen(
+            comando,
+            stdin=None if entrada == "-" else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        self.bytes_bloque = int(segundos_bloque * 16000) * 2
+        # Con `maximo_bloques` FFmpeg se frena cuando la cola está llena (memoria acotada)
+        self.cola = queue.Queue(maxsize=maximo_bloques)
+        self.muestras = 0
+        self.llegadas = ([], [])   # (segundo de audio, instante de llegada)
+        self.error = None
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._leer, name="fuente-audio", daemon=True)
+        self._hilo.start()
+    
+    def _leer(self):
+        import numpy as np
+        
+        resto = b""
+        try:
+            while True:
+                datos = self.proceso.stdout.read1(self.bytes_bloque)
+                if not datos:
+                    break
+                datos = resto + datos
+                # Un bloque puede cortar una muestra de 16 bits por la mitad
+                corte = len(datos) - len(datos) % 2
+                datos, resto = datos[:corte], datos[corte:]
+                if not datos:
+                    continue
+                bloque = np.frombuffer(datos, np.int16).astype(np.float32)
+                bloque /= 32768.0
+                self.muestras += len(bloque)
+                self.llegadas[0].append(self.muestras / 16000)
+                self.llegadas[1].append(time.monotonic())
+                if not self._poner(bloque):
+                    break
+        finally:
+            if self._parar.is_set() and self.proceso.poll() is None:
+                self.proceso.kill()
+            codigo = self.proceso.wait()
+            error = self.proceso.stderr.read().decode(errors="replace").strip()
+            if codigo and not self.muestras and not self._parar.is_set():
+                self.error = error[:200] or f"FFmpeg terminó con código {codigo}"
+            self._poner(None)
+    
+    def _poner(self, elemento):
+        """Encola sin quedarse bloqueado en una cola llena si nadie la va a vaciar"""
+        while not self._parar.is_set():
+            try:
+                self.cola.put(elemento, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def llegada(self, segundo):
+        """Instante (time.monotonic) en que llegó el audio del segundo indicado"""
+        indice = bisect.bisect_left(self.llegadas[0], segundo)
+        if indice >= len(self.llegadas[1]):
+            return time.monotonic()
+        return self.llegadas[1][indice]
+    
+    def cerrar(self):
+        """Detiene FFmpeg y el hilo lector, aunque la cola esté llena y nadie la lea"""
+        self._parar.set()
+        if self.proceso.poll() is None:
+            self.proceso.terminate()
+        self._hilo.join(timeout=5)
+        if self._hilo.is_alive():
+            self.proceso.kill()
+            self.proceso.wait()
+
+class TranscripcionDeslizante:
+    """Transcribe audio que va llegando con una ventana deslizante.
+    
+    Cada `paso` segundos de audio nuevo se vuelve a transcribir la
+    ventana pendiente (como mucho unos `ventana` segundos, el contexto de
+    Whisper). Un segmento se da por terminado cuando Whisper ya ha
+    empezado el siguiente o cuando acaba al menos `margen` segundos antes
+    del final del audio recibido; entonces se entrega con su tiempo
+    global y la ventana avanza hasta su final. Así la latencia queda
+    acotada por el paso, el margen y lo que tarde una pasada.
+    """
+    
+    def __init__(self, motor, modelo_whisper, opciones, ventana=30.0, paso=1.0, margen=1.0):
+        import numpy as np
+        
+        self.motor = motor
+        self.modelo_whisper = modelo_whisper
+        self.opciones = dict(opciones, verbose=None)   # sin barra de progreso en cada pasada
+        self.ventana = ventana
+        self.paso = paso
+        self.margen = margen
+        self.pendiente = np.zeros(0, np.float32)
+        # Bloques recibidos que aún no se han unido a `pendiente` (se unen en cada pasada)
+        self.recibidos = []
+        self.inicio = 0.0
+        self.contexto = ""
+        self.entregados = 0
+        self.pasadas = 0
+    
+    def procesar(self, fuente, al_segmento):
+        """Consume la fuente hasta el final; llama a `al_segmento` con cada segmento terminado"""
+        nuevas = 0
+        terminado = False
+        while not terminado:
+            try:
+                bloques = [fuente.cola.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            # Todo lo que haya llegado mientras se transcribía entra en la misma pasada
+            while True:
+                try:
+                    bloques.append(fuente.cola.get_nowait())
+                except queue.Empty:
+                    break
+            if any(b is None for b in bloques):
+                terminado = True
+                bloques = [b for b in bloques if b is not None]
+            if bloques:
+                self.recibidos.extend(bloques)
+                nuevas += sum(len(b) for b in bloques)
+            if nuevas >= self.paso * 16000:
+                nuevas = 0
+                self.pasada(al_segmento)
+        self.terminar(al_segmento)
+    
+    def terminar(self, al_segmento):
+        """Entrega todo lo pendiente (fin de la entrada o interrupción)"""
+        self._unir()
+        if len(self.pendiente) >= 0.3 * 16000:
+            self.pasada(al_segmento, final=True)
+    
+    def _unir(self):
+        # Una sola copia por pasada, no una por bloque recibido
+        if self.recibidos:
+            import numpy as np
+            self.pendiente = np.concatenate([self.pendiente] + self.recibidos)
+            self.recibidos = []
+    
+    def pasada(self, al_segmento, final=False):
+        self._unir()
+        duracion = len(self.pendiente) / 16000
+        opciones = dict(self.opciones)
+        if self.contexto:
+            # Lo ya entregado da contexto sin volver a transcribirlo
+            opciones['initial_prompt'] = self.contexto
+        resultado = self.motor.transcribir(self.modelo_whisper, self.pendiente, **opciones)
+        self.pasadas += 1
+        segmentos = [s for s in resultado['segments'] if s['text'].strip()]
+        
+        # La ventana está llena: hay que avanzar aunque no haya un final claro
+        lleno = duracion >= self.ventana
+        if final:
+            terminados = segmentos
+        else:
+            terminados = segmentos[:-1]
+            if segmentos and (segmentos[-1]['end'] <= duracion - self.margen or (lleno and not terminados)):
+                terminados = segmentos
+        
+        for segmento in terminados:
+            fin = min(segmento['end'], duracion)
+            al_segmento({
+                'id': self.entregados,
+                'start': round(self.inicio + max(0.0, segmento['start']), 3),
+                'end': round(self.inicio + fin, 3),
+                'text': segmento['text'],
+            })
+            self.entregados += 1
+            self.contexto = (self.contexto + segmento['text'])[-200:]
+        
+        if terminados:
+            corte = min(terminados[-1]['end'], duracion)
+        elif lleno:
+            # Nada que entregar en toda la ventana (silencio): se descarta lo antiguo
+            corte = duracion - self.margen
+        else:
+            return
+        self.pendiente = self.pendiente[int(corte * 16000):]
+        self.inicio += corte
+
+class AudioEnFlujo:
+    """Audio de un archivo que se decodifica por partes mientras se transcribe.
+    
+    Ocupa el lugar del array de NumPy para las entradas largas: nunca se
+    tiene el audio entero en memoria. `abrir_fuente(desde)` arranca un
+    FuenteAudio con la cola acotada a partir del segundo indicado y
+    TranscripcionDeslizante lo transcribe por ventanas fijas.
+    
+    La huella (para la caché y los puntos de control) sale de `identidad`
+    (archivo, tamaño, fecha de modificación y recorte) y no del audio:
+    calcularla sobre el audio obligaría a decodificar entero un archivo de
+    horas solo para buscarlo en la caché. A cambio, el mismo audio en otro
+    archivo, o leído en memoria, no comparte la entrada de la caché. Sin
+    `identidad` se decodifica en flujo una vez y coincide con la huella
+    del mismo audio en memoria.
+    """
+    
+    def __init__(self, abrir_fuente, duracion, desde=0.0, identidad=None):
+        self.abrir_fuente = abrir_fuente
+        self.duracion = duracion
+        self.desde = desde
+        self.identidad = identidad
+        self._huella = None
+    
+    def __len__(self):
+        return int(max(0.0, (self.duracion or 0.0) - self.desde) * FRECUENCIA_MUESTREO)
+    
+    def recortar(self, segundos):
+        """El mismo audio a partir de `segundos` más adelante (para reanudar)"""
+        return AudioEnFlujo(self.abrir_fuente, self.duracion, self.desde + segundos, self.identidad)
+    
+    def abrir(self):
+        return self.abrir_fuente(self.desde)
+    
+    def huella(self):
+        if self._huella is None and self.identidad is not None:
+            contenido = json.dumps(dict(self.identidad, desde=self.desde), sort_keys=True)
+            self._huella = "archivo:" + hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+        if self._huella is None:
+            h = hashlib.sha256()
+            fuente = self.abrir()
+            try:
+                while True:
+                    bloque = fuente.cola.get()
+                    if bloque is None:
+                        break
+                    h.update(memoryview(bloque).cast('B'))
+            finally:
+                fuente.cerrar()
+            if fuente.error:
+                raise RuntimeError(fuente.error)
+            self._huella = h.hexdigest()
+        return self._huella
+
+# ============================================================
+# TRADUCCIÓN POR LOTES (CTRANSLATE2)
+# ============================================================
+
+_FIN_DE_ORACION = re.compile(
+    r'(?<!\bMr\.)(?<!\bMrs\.)(?<!\bMs\.)(?<!\bDr\.)(?<!\bSt\.)(?<!\bvs\.)'
+    r'(?:(?<=[.!?…])|(?<=[.!?…]["\')\]]))\s+(?=["\'(¿¡]?[A-Z0-9])'
+)
+
+def dividir_oraciones(texto):
+    """Divide un texto en oraciones con reglas simples de puntuación"""
+    texto = texto.strip()
+    if not texto:
+        return []
+    return [o.strip() for o in _FIN_DE_ORACION.split(texto) if o.strip()]
+
+# Cómo se parte cada segmento antes de traducirlo: el pipeline de Argos (stanza,
+# por defecto), reglas de puntuación o el segmento de Whisper entero como una oración
+DIVISIONES_ORACIONES = ('stanza', 'reglas', 'segmento')
+
+class TraductorLotes:
+    """Envía muchos segmentos a CTranslate2 en una sola llamada.
+    
+    Reutiliza el paquete y el traductor CTranslate2 que ya cargó Argos,
+    pero agrupa las oraciones de varios segmentos en un único
+    translate_batch en lugar de una llamada completa por segmento.
+    Las oraciones se separan con `dividir_oraciones` o se toma cada
+    segmento como una sola ("segmento"); nunca pasa por stanza.
+    """
+    
+    def __init__(self, traduccion_argos, max_lote=32, hilos=0, division='reglas'):
+        # Argos envuelve la traducción real en CachedTranslation
+        traduccion = traduccion_argos
+        while hasattr(traduccion, 'underlying'):
+            traduccion = traduccion.underlying
+        
+        self.pkg = getattr(traduccion, 'pkg', None)
+        if self.pkg is None or not hasattr(self.pkg, 'tokenizer'):
+            raise ValueError("La traducción de Argos no expone un paquete CTranslate2")
+        
+        if getattr(traduccion, 'translator', None) is None:
+            import ctranslate2
+            ruta_modelo = str(Path(self.pkg.package_path) / "model")
+            # Se guarda en Argos para no cargar el modelo dos veces
+            traduccion.translator = ctranslate2.Translator(ruta_modelo, device="cpu",
+                                                           inter_threads=1, intra_threads=hilos)
+        
+        self.translator = traduccion.translator
+        self.prefijo = getattr(self.pkg, 'target_prefix', '') or ''
+        self.max_lote = max_lote
+        self.division = division
+    
+    def oraciones(self, texto):
+        if self.division == 'segmento':
+            texto = texto.strip()
+            return [texto] if texto else []
+        return dividir_oraciones(texto)
+    
+    def traducir(self, textos):
+        """Devuelve una traducción por texto, o None si ese texto falló"""
+        oraciones = []
+        rangos = []
+        for texto in textos:
+            partes = self.oraciones(texto)
+            rangos.append((len(oraciones), len(oraciones) + len(partes)))
+            oraciones.extend(partes)
+        
+        if not oraciones:
+            return [texto.strip() for texto in textos]
+        
+        tokens = [self.pkg.tokenizer.encode(o) for o in oraciones]
+        prefijos = [[self.prefijo]] * len(tokens) if self.prefijo else None
+        
+        # Mismos parámetros que apply_packaged_translation de Argos
+        resultados = self.translator.translate_batch(
+            tokens,
+            target_prefix=prefijos,
+            replace_unknowns=True,
+            max_batch_size=self.max_lote,
+            beam_size=4,
+            num_hypotheses=1,
+            length_penalty=0.2,
+        )
+        
+        traducciones = []
+        for texto, (desde, hasta) in zip(textos, rangos):
+            if desde == hasta:
+                traducciones.append(texto.strip())
+                continue
+            try:
+                tokens_traducidos = []
+                for r in resultados[desde:hasta]:
+                    tokens_traducidos += r.hypotheses[0]
+                valor = self.pkg.tokenizer.decode(tokens_traducidos)
+                if self.prefijo and valor.startswith(self.prefijo):
+                    valor = valor[len(self.prefijo):]
+                valor = valor.strip()
+                traducciones.append(valor or None)
+            except Exception:
+                traducciones.append(None)
+        
+        return traducciones
+
+# ============================================================
+# MEMORIA DE TRADUCCIONES
+# ============================================================
+
+def normalizar_texto(texto):
+    """Normaliza espacios para que textos equivalentes compartan clave"""
+    return " ".join(texto.split())
+
+class MemoriaTraducciones:
+    """Memoria de traducciones persistente (SQLite) con una LRU en proceso.
+    
+    Las claves combinan el texto normalizado, el par de idiomas y la
+    versión del modelo, así que actualizar el paquete de Argos invalida
+    las traducciones antiguas sin tener que borrar el archivo.
+    """
+    
+    def __init__(self, ruta, max_entradas=200000, max_lru=5000):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self.max_lru = max_lru
+        self.lru = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self._pendientes = 0
+        self._lock = threading.Lock()
+        
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self.conexion.execute(
+            "CREATE TABLE IF NOT EXISTS traducciones ("
+            " clave TEXT PRIMARY KEY,"
+            " par TEXT NOT NULL,"
+            " texto TEXT NOT NULL,"
+            " traduccion TEXT NOT NULL,"
+            " ultimo_uso REAL NOT NULL)"
+        )
+        self.conexion.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ultimo_uso ON traducciones (ultimo_uso)"
+        )
+        self.conexion.commit()
+    
+    @staticmethod
+    def clave(texto, par, version):
+        contenido = f"{par}|{version}|{normalizar_texto(texto)}"
+        return hashlib.sha1(contenido.encode('utf-8')).hexdigest()
+    
+    def obtener(self, clave):
+        """Devuelve la traducción guardada o None"""
+        with self._lock:
+            traduccion = self.lru.get(clave)
+            if traduccion is None:
+                fila = self.conexion.execute(
+                    "SELECT traduccion FROM traducciones WHERE clave = ?", (clave,)
+                ).fetchone()
+                if fila is None:
+                    self.fallos += 1
+                    return None
+                traduccion = fila[0]
+                self._recordar(clave, traduccion)
+            else:
+                self.lru.move_to_end(clave)
+            
+            self.conexion.execute(
+                "UPDATE traducciones SET ultimo_uso = ? WHERE clave = ?", (time.time(), clave)
+            )
+            self._marcar_pendiente()
+            self.aciertos += 1
+            return traduccion
+    
+    def guardar_traduccion(self, clave, par, texto, traduccion):
+        with self._lock:
+            self._recordar(clave, traduccion)
+            self.conexion.execute(
+                "INSERT OR REPLACE INTO traducciones VALUES (?, ?, ?, ?, ?)",
+                (clave, par, normalizar_texto(texto), traduccion, time.time())
+            )
+            self._marcar_pendiente()
+    
+    def guardar(self):
+        """Confirma los cambios pendientes y aplica el límite de tamaño"""
+        with self._lock:
+            self._recortar()
+            self.conexion.commit()
+            self._pendientes = 0
+    
+    def cerrar(self):
+        self.guardar()
+        self.conexion.close()
+    
+    def _recordar(self, clave, traduccion):
+        self.lru[clave] = traduccion
+        self.lru.move_to_end(clave)
+        while len(self.lru) > self.max_lru:
+            self.lru.popitem(last=False)
+    
+    def _marcar_pendiente(self):
+        self._pendientes += 1
+        if self._pendientes >= 500:
+            self._recortar()
+            self.conexion.commit()
+            self._pendientes = 0
+    
+    def _recortar(self):
+        total = self.conexion.execute("SELECT COUNT(*) FROM traducciones").fetchone()[0]
+        if total <= self.max_entradas:
+            return
+        # Se libera un 10% extra para no recortar en cada escritura
+        sobrantes = total - int(self.max_entradas * 0.9)
+        self.conexion.execute(
+            "DELETE FROM traducciones WHERE clave IN ("
+            " SELECT clave FROM traducciones ORDER BY ultimo_uso LIMIT ?)",
+            (sobrantes,)
+        )
+        self.lru.clear()
+
+# ============================================================
+# CACHÉ DE TRANSCRIPCIONES
+# ============================================================
+
+def huella_audio(audio):
+    """SHA-256 del audio decodificado (array de NumPy o ruta a un WAV)"""
+    if isinstance(audio, AudioEnFlujo):
+        return audio.huella()
+    h = hashlib.sha256()
+    if isinstance(audio, str):
+        with open(audio, 'rb') as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(bloque)
+    else:
+        h.update(memoryview(audio).cast('B'))
+    return h.hexdigest()
+
+def duracion_audio(audio):
+    """Segundos de audio (array de NumPy a 16 kHz, ruta a un WAV o AudioEnFlujo)"""
+    if isinstance(audio, str):
+        import wave
+        try:
+            with wave.open(audio, 'rb') as wav:
+                return wav.getnframes() / wav.getframerate()
+        except (OSError, EOFError, wave.Error):
+            return None
+    return len(audio) / FRECUENCIA_MUESTREO
+
+def _json_por_defecto(objeto):
+    # Valores de NumPy que Whisper deja en los segmentos
+    if hasattr(objeto, 'item'):
+        return objeto.item()
+    if hasattr(objeto, 'tolist'):
+        return objeto.tolist()
+    return str(objeto)
+
+class CacheTranscripciones:
+    """Transcripciones guardadas por contenido (huella del audio + modelo + opciones).
+    
+    Cada entrada es un JSON en <carpeta>/<2 primeros caracteres>/<clave>.json.
+    Al leer una entrada se actualiza su fecha, y al superar el límite se
+    borran primero las usadas hace más tiempo.
+    """
+    
+    def __init__(self, carpeta, limite_mb=4096):
+        self.carpeta = carpeta
+        self.limite_mb = limite_mb
+        os.makedirs(carpeta, exist_ok=True)
+    
+    @staticmethod
+    def clave(huella, modelo, opciones):
+        contenido = json.dumps({'audio': huella, 'modelo': modelo, 'opciones': opciones}, sort_keys=True)
+        return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+    
+    def _ruta(self, clave):
+        return os.path.join(self.carpeta, clave[:2], f"{clave}.json")
+    
+    def obtener(self, clave):
+        """Devuelve el resultado de Whisper guardado, o None"""
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                entrada = json.load(f)
+            os.utime(ruta)
+            return entrada['resultado']
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def guardar(self, clave, resultado, huella, modelo, opciones):
+        ruta = self._ruta(clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        entrada = {
+            'clave': clave,
+            'huella_audio': huella,
+            'modelo': modelo,
+            'opciones': opciones,
+            'creado': time.time(),
+            'resultado': resultado,
+        }
+        temporal = ruta + ".tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(entrada, f, ensure_ascii=False, default=_json_por_defecto)
+        os.replace(temporal, ruta)
+        self.purgar()
+    
+    def entradas(self):
+        """Lista (ruta, tamaño, fecha de último uso), de la más antigua a la más reciente"""
+        lista = []
+        for raiz, _, archivos in os.walk(self.carpeta):
+            for nombre in archivos:
+                if nombre.endswith('.json'):
+                    ruta = os.path.join(raiz, nombre)
+                    try:
+                        info = os.stat(ruta)
+                    except OSError:
+                        continue
+                    lista.append((ruta, info.st_size, info.st_mtime))
+        return sorted(lista, key=lambda e: e[2])
+    
+    def purgar(self, limite_mb=None):
+        """Borra las entradas menos usadas hasta quedar bajo el límite"""
+        limite = (self.limite_mb if limite_mb is None else limite_mb) * 1024 * 1024
+        entradas = self.entradas()
+        total = sum(tamano for _, tamano, _ in entradas)
+        borradas = 0
+        for ruta, tamano, _ in entradas:
+            if total <= limite:
+                break
+            try:
+                os.remove(ruta)
+                total -= tamano
+                borradas += 1
+            except OSError:
+                pass
+        return borradas
 
 # ============================================================
-# PARCHAR WHISPER PARA FFMPEG
+# PUNTOS DE CONTROL (REANUDAR)
 # ============================================================
 
-def parchear_whisper_ffmpeg(ruta_ffmpeg):
-    """Parchea Whisper para usar FFmpeg específico"""
-    if not ruta_ffmpeg or ruta_ffmpeg == "ffmpeg":
-        return False
+class PuntoControl:
+    """Avance de un video guardado en disco para poder reanudarlo.
     
-    try:
-        if not hasattr(whisper.audio, '_original_load_audio'):
-            whisper.audio._original_load_audio = whisper.audio.load_audio
+    Es un JSON por línea: una cabecera con la clave del audio y el
+    modelo, y después cada segmento transcrito y cada subtítulo
+    traducido (en cada idioma) en cuanto existen. Si la clave no coincide, se empieza de
+    cero. Una línea cortada por un cierre brusco simplemente se ignora.
+    """
+    
+    def __init__(self, ruta, clave):
+        self.ruta = ruta
+        self.clave = clave
+        self.segmentos = []
+        self.traducciones = {}   # idioma -> {número: texto}
+        self._lock = threading.Lock()
         
-        def load_audio_parchada(file, sr=16000):
-            import numpy as np
-            cmd = [
-                ruta_ffmpeg,
-                "-i", file,
-                "-f", "s16le",
-                "-ac", "1",
-                "-ar", str(sr),
-                "-"
-            ]
+        if not self._cargar():
+            with open(ruta, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'tipo': 'cabecera', 'clave': clave}) + "\n")
+        self.archivo = open(ruta, 'a', encoding='utf-8')
+    
+    def _cargar(self):
+        try:
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                lineas = f.readlines()
+        except OSError:
+            return False
+        
+        registros = []
+        for linea in lineas:
             try:
-                out = subprocess.run(cmd, capture_output=True, check=True).stdout
-            except subprocess.CalledProcessError as e:
-                raise RuntimeError(f"FFmpeg error: {e.stderr.decode()}") from e
-            return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+                registros.append(json.loads(linea))
+            except ValueError:
+                continue
+        if not registros or registros[0].get('tipo') != 'cabecera' or registros[0].get('clave') != self.clave:
+            return False
         
-        whisper.audio.load_audio = load_audio_parchada
-        print("✅ Whisper parchado para usar FFmpeg específico")
+        for registro in registros[1:]:
+            if registro.get('tipo') == 'segmento':
+                self.segmentos.append(registro['segmento'])
+            elif registro.get('tipo') == 'traduccion':
+                idioma = registro.get('idioma', 'es')
+                self.traducciones.setdefault(idioma, {})[registro['numero']] = registro['texto']
         return True
-    except Exception as e:
-        print(f"⚠️ No se pudo parchear Whisper: {e}")
+    
+    def desplazamiento(self):
+        """Segundo del audio hasta el que ya hay transcripción"""
+        return self.segmentos[-1]['end'] if self.segmentos else 0.0
+    
+    def _escribir(self, registro):
+        with self._lock:
+            self.archivo.write(json.dumps(registro, ensure_ascii=False, default=_json_por_defecto) + "\n")
+            self.archivo.flush()
+    
+    def agregar_segmento(self, segmento):
+        self.segmentos.append(segmento)
+        self._escribir({'tipo': 'segmento', 'segmento': {
+            k: segmento[k] for k in ('id', 'start', 'end', 'text') if k in segmento
+        }})
+    
+    def agregar_traduccion(self, numero, texto, idioma="es"):
+        self.traducciones.setdefault(idioma, {})[numero] = texto
+        self._escribir({'tipo': 'traduccion', 'idioma': idioma, 'numero': numero, 'texto': texto})
+    
+    def cerrar(self, completado=False):
+        """Cierra el archivo; si el video terminó, el punto de control sobra"""
+        self.archivo.close()
+        if completado:
+            try:
+                os.remove(self.ruta)
+            except OSError:
+                pass
+
+# ============================================================
+# SUBTÍTULOS INCREMENTALES
+# ============================================================
+
+def formato_tiempo(segundos, separador=','):
+    """HH:MM:SS,mmm (SRT) o HH:MM:SS.mmm (WebVTT)"""
+    horas = int(segundos // 3600)
+    minutos = int((segundos % 3600) // 60)
+    segs = int(segundos % 60)
+    milisegundos = int((segundos - int(segundos)) * 1000)
+    return f"{horas:02d}:{minutos:02d}:{segs:02d}{separador}{milisegundos:03d}"
+
+class SubtitulosIncrementales:
+    """SRT (y opcionalmente WebVTT) que crece mientras se procesa el video.
+    
+    Los subtítulos terminados se acumulan en memoria y cada publicación
+    reescribe el archivo completo en un temporal que luego se renombra
+    sobre el definitivo: un reproductor que recargue el archivo ve
+    siempre subtítulos completos, nunca uno a medio escribir. Para no
+    reescribir un archivo largo a cada lote, se publica como mucho una
+    vez por `intervalo` segundos (el primer subtítulo, en cuanto existe).
+    """
+    
+    def __init__(self, ruta_srt, ruta_vtt=None, intervalo=1.0):
+        self.rutas = {ruta_srt: []}
+        self.ruta_vtt = ruta_vtt
+        if ruta_vtt:
+            self.rutas[ruta_vtt] = ["WEBVTT\n\n"]
+        self.ruta_srt = ruta_srt
+        self.intervalo = intervalo
+        self.subtitulos = 0
+        self.publicados = 0
+        self._ultima = 0.0
+        self.publicar()
+    
+    def agregar(self, numero, inicio, fin, texto):
+        self.rutas[self.ruta_srt].append(
+            f"{numero}\n{formato_tiempo(inicio)} --> {formato_tiempo(fin)}\n{texto}\n\n"
+        )
+        if self.ruta_vtt:
+            self.rutas[self.ruta_vtt].append(
+                f"{numero}\n{formato_tiempo(inicio, '.')} --> {formato_tiempo(fin, '.')}\n{texto}\n\n"
+            )
+        self.subtitulos += 1
+    
+    def actualizar(self):
+        """Publica los subtítulos nuevos si ha pasado el intervalo; True si se publicaron"""
+        if self.subtitulos == self.publicados:
+            return False
+        if self.publicados and time.monotonic() - self._ultima < self.intervalo:
+            return False
+        return self.publicar()
+    
+    def publicar(self, final=False):
+        """Reemplaza los archivos por su versión actual; False si alguno sigue pendiente"""
+        publicado = True
+        for ruta, partes in self.rutas.items():
+            publicado = self._reemplazar(ruta, "".join(partes), intentos=5 if final else 1) and publicado
+        if publicado:
+            self.publicados = self.subtitulos
+            self._ultima = time.monotonic()
+        return publicado
+    
+    @staticmethod
+    def _reemplazar(ruta, contenido, intentos=1):
+        temporal = ruta + ".tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(contenido)
+        for intento in range(intentos):
+            try:
+                os.replace(temporal, ruta)
+                return True
+            except PermissionError:
+                # En Windows falla mientras otro programa tiene el archivo abierto
+                if intento + 1 < intentos:
+                    time.sleep(0.2)
+        if intentos > 1:
+            # Última publicación: mejor escribir en el sitio que perder el resultado
+            with open(ruta, 'w', encoding='utf-8') as f:
+                f.write(contenido)
+            os.remove(temporal)
+            return True
         return False
 
+# ============================================================
+# MÉTRICAS DE EJECUCIÓN
+# ============================================================
+
+class MetricasEjecucion:
+    """Registro estructurado de cada etapa del proceso.
+    
+    Cada etapa terminada (carga del modelo, extracción, decodificación,
+    transcripción, traducción, escritura del SRT) se añade como una línea
+    JSON al registro de ejecuciones, con su duración, los segundos de
+    audio procesados, el factor de tiempo real y la memoria: el pico de
+    la etapa (RSS muestreado mientras dura, las etapas se solapan entre
+    hilos y el pico del sistema no se puede reiniciar para cada una) y el
+    pico del proceso hasta ese momento. Los totales por etapa se pueden
+    exportar además como archivo de texto de Prometheus (para el
+    textfile collector de node_exporter).
+    """
+    
+    def __init__(self, ruta_registro=None, ruta_prometheus=None):
+        self.ruta_registro = ruta_registro
+        self.ruta_prometheus = ruta_prometheus
+        self.id_ejecucion = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.totales = {}
+        self.llamadas_traduccion = 0
+        self.caracteres_traduccion = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Pico de RSS de cada etapa abierta, actualizado por un hilo de muestreo
+        self._picos_etapas = {}
+        self._ids_etapas = itertools.count()
+        self._muestreo = threading.Condition()
+        self._hilo_muestreo = None
+        
+        for ruta in (ruta_registro, ruta_prometheus):
+            if ruta:
+                os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    
+    @contextlib.contextmanager
+    def contexto(self, **datos):
+        """Datos (video, modelo) que se añaden a las etapas de este hilo"""
+        anterior = self.contexto_actual()
+        self._local.contexto = dict(anterior, **datos)
+        try:
+            yield
+        finally:
+            self._local.contexto = anterior
+    
+    def contexto_actual(self):
+        return getattr(self._local, 'contexto', {})
+    
+    def contar_traduccion(self, caracteres, llamadas=1):
+        """Una llamada real al traductor (los aciertos de la memoria no cuentan)"""
+        with self._lock:
+            self.llamadas_traduccion += llamadas
+            self.caracteres_traduccion += caracteres
+        # También por hilo, para atribuirlas a la etapa que las hizo
+        self._local.llamadas = getattr(self._local, 'llamadas', 0) + llamadas
+        self._local.caracteres = getattr(self._local, 'caracteres', 0) + caracteres
+    
+    def traducciones_hilo(self):
+        """(llamadas, caracteres) traducidos hasta ahora por este hilo"""
+        return getattr(self._local, 'llamadas', 0), getattr(self._local, 'caracteres', 0)
+    
+    @contextlib.contextmanager
+    def etapa(self, nombre, **datos):
+        """Mide el bloque como una etapa.
+        
+        El dict devuelto admite completar datos dentro del bloque, como
+        `segundos_audio` o `estado` ('error' si la etapa falló sin excepción).
+        """
+        registro = dict(datos)
+        inicio = time.perf_counter()
+        try:
+            with self.pico_memoria(registro):
+                yield registro
+        except BaseException:
+            registro['estado'] = 'error'
+            raise
+        finally:
+            self.registrar(nombre, time.perf_counter() - inicio, **registro)
+    
+    @contextlib.contextmanager
+    def pico_memoria(self, registro):
+        """Muestrea el RSS mientras dura el bloque y deja el máximo en registro['memoria_pico_mb'].
+        
+        Si el mismo registro se usa en varios bloques (una etapa que se
+        mide a trozos), se queda el mayor de todos.
+        """
+        identificador = self._abrir_muestreo()
+        try:
+            yield
+        finally:
+            pico = self._cerrar_muestreo(identificador)
+            if pico and pico > (registro.get('memoria_pico_mb') or 0):
+                registro['memoria_pico_mb'] = pico
+    
+    def _abrir_muestreo(self):
+        identificador = next(self._ids_etapas)
+        with self._muestreo:
+            self._picos_etapas[identificador] = memoria_actual_mb() or 0.0
+            if self._hilo_muestreo is None:
+                self._hilo_muestreo = threading.Thread(target=self._muestrear, name="muestreo-memoria",
+                                                       daemon=True)
+                self._hilo_muestreo.start()
+            self._muestreo.notify()
+        return identificador
+    
+    def _cerrar_muestreo(self, identificador):
+        """Pico de RSS (MB) de la etapa desde que se abrió"""
+        actual = memoria_actual_mb() or 0.0
+        with self._muestreo:
+            pico = max(self._picos_etapas.pop(identificador), actual)
+        return round(pico, 1) or None
+    
+    def _muestrear(self, intervalo=0.1):
+        while True:
+            with self._muestreo:
+                while not self._picos_etapas:
+                    self._muestreo.wait()
+            actual = memoria_actual_mb()
+            if actual is None:
+                return   # Sin forma de leer el RSS: solo queda el pico del proceso
+            with self._muestreo:
+                for identificador, pico in self._picos_etapas.items():
+                    if actual > pico:
+                        self._picos_etapas[identificador] = actual
+            time.sleep(intervalo)
+    
+    def evento(self, nombre, **datos):
+        """Añade al registro algo que no es una etapa (p. ej. un reparto de hilos)"""
+        registro = {
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'ejecucion': self.id_ejecucion,
+            'evento': nombre,
+            **datos,
+        }
+        if self.ruta_registro:
+            with self._lock:
+                self._escribir_registro(registro)
+        return registro
+    
+    def _escribir_registro(self, registro):
+        try:
+            with open(self.ruta_registro, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(registro, ensure_ascii=False, default=_json_por_defecto) + "\n")
+        except OSError as e:
+            print(f"⚠️ No se pudo escribir el registro de métricas: {e}")
+    
+    def registrar(self, nombre, segundos, segundos_audio=None, estado='ok', memoria_pico_mb=None, **datos):
+        """Añade al registro una etapa ya medida (`memoria_pico_mb`: pico de la etapa, si se conoce)"""
+        rtf = segundos / segundos_audio if segundos_audio else None
+        registro = {
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'ejecucion': self.id_ejecucion,
+            'etapa': nombre,
+            **self.contexto_actual(),
+            **datos,
+            'estado': estado,
+            'segundos': round(segundos, 3),
+            'segundos_audio': round(segundos_audio, 3) if segundos_audio else None,
+            'rtf': round(rtf, 4) if rtf is not None else None,
+            'memoria_pico_mb': memoria_pico_mb,
+            'memoria_pico_proceso_mb': round(_memoria_proceso_mb(pico=True) or 0, 1) or None,
+        }
+        
+        with self._lock:
+            total = self.totales.setdefault(nombre, {
+                'ejecuciones': 0, 'errores': 0, 'segundos': 0.0, 'segundos_audio': 0.0, 'rtf': None,
+            })
+            total['ejecuciones'] += 1
+            total['errores'] += estado != 'ok'
+            total['segundos'] += segundos
+            total['segundos_audio'] += segundos_audio or 0.0
+            if rtf is not None:
+                total['rtf'] = rtf
+            
+            if self.ruta_registro:
+                self._escribir_registro(registro)
+            if self.ruta_prometheus:
+                self._escribir_prometheus()
+        return registro
+    
+    def texto_prometheus(self):
+        """Totales en el formato de texto de Prometheus"""
+        with self._lock:
+            return self._texto_prometheus()
+    
+    def _texto_prometheus(self):
+        lineas = []
+        
+        def metrica(nombre, tipo, ayuda, valores):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for etiquetas, valor in valores:
+                valor = int(valor) if float(valor).is_integer() else round(valor, 6)
+                texto = ",".join(f'{k}="{v}"' for k, v in etiquetas.items())
+                lineas.append(f"{nombre}{{{texto}}} {valor}" if texto else f"{nombre} {valor}")
+        
+        etapas = sorted(self.totales.items())
+        metrica("traductor_etapa_ejecuciones_total", "counter", "Etapas terminadas",
+                [({'etapa': e, 'estado': 'ok'}, t['ejecuciones'] - t['errores']) for e, t in etapas]
+                + [({'etapa': e, 'estado': 'error'}, t['errores']) for e, t in etapas])
+        metrica("traductor_etapa_segundos_total", "counter", "Tiempo dedicado a cada etapa",
+                [({'etapa': e}, t['segundos']) for e, t in etapas])
+        metrica("traductor_etapa_audio_segundos_total", "counter", "Segundos de audio procesados por etapa",
+                [({'etapa': e}, t['segundos_audio']) for e, t in etapas])
+        metrica("traductor_etapa_rtf", "gauge", "Factor de tiempo real de la última ejecución de la etapa",
+                [({'etapa': e}, t['rtf']) for e, t in etapas if t['rtf'] is not None])
+        metrica("traductor_traduccion_llamadas_total", "counter", "Llamadas al traductor",
+                [({}, self.llamadas_traduccion)])
+        metrica("traductor_traduccion_caracteres_total", "counter", "Caracteres enviados al traductor",
+                [({}, self.caracteres_traduccion)])
+        metrica("traductor_memoria_pico_bytes", "gauge", "Pico de memoria residente del proceso",
+                [({}, (memoria_pico_mb() or 0) * 1024 * 1024)])
+        return "\n".join(lineas) + "\n"
+    
+    def _escribir_prometheus(self):
+        # El collector puede leer en cualquier momento: se reemplaza de golpe
+        temporal = self.ruta_prometheus + ".tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                f.write(self._texto_prometheus())
+            os.replace(temporal, self.ruta_prometheus)
+        except OSError as e:
+            print(f"⚠️ No se pudo escribir el archivo de Prometheus: {e}")
+
+# ============================================================
+# PERFIL DE RENDIMIENTO (SELECCIÓN AUTOMÁTICA DE MODELO)
+# ============================================================
+
+class PerfilRendimiento:
+    """Velocidad y memoria de cada modelo medidas en esta máquina.
+    
+    Se calibra una vez transcribiendo un fragmento corto con cada modelo
+    descargado y guarda, por motor, el factor de tiempo real (segundos de
+    cálculo por segundo de audio), la memoria que ocupa el modelo y lo que
+    tarda en cargar, además del ritmo de la decodificación y de la
+    traducción. Los modelos sin medir se extrapolan desde el medido más
+    cercano según su número de parámetros.
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.datos = self._cargar()
+    
+    def _cargar(self):
+        try:
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            if datos.get('version') == self.VERSION:
+                return datos
+        except (OSError, ValueError):
+            pass
+        return {'version': self.VERSION, 'etapas': {}, 'modelos': {}}
+    
+    def guardar(self):
+        temporal = self.ruta + ".tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(self.datos, f, indent=2)
+            os.replace(temporal, self.ruta)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el perfil de rendimiento: {e}")
+    
+    def calibrado(self, firma):
+        return bool(self.datos['modelos'].get(firma))
+    
+    def registrar_modelo(self, firma, modelo, **medida):
+        medida['fecha'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.datos['modelos'].setdefault(firma, {})[modelo] = medida
+    
+    def registrar_etapa(self, etapa, **medida):
+        medida['fecha'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.datos['etapas'][etapa] = medida
+    
+    def rtf_modelo(self, firma, modelo):
+        """(factor de tiempo real, medido) del modelo con este motor"""
+        medidas = self.datos['modelos'].get(firma, {})
+        if modelo in medidas:
+            return medidas[modelo]['rtf'], True
+        if medidas:
+            referencia = min(medidas, key=lambda m: abs(
+                PARAMETROS_MODELOS[m] - PARAMETROS_MODELOS[modelo]))
+            escala = PARAMETROS_MODELOS[modelo] / PARAMETROS_MODELOS[referencia]
+            return medidas[referencia]['rtf'] * escala, False
+        return RTF_MODELOS_ESTIMADO[modelo], False
+    
+    def estimar(self, firma, modelo, duracion, en_paralelo=True, procesos=1, idiomas=1):
+        """Tiempo total y memoria previstos para un video de `duracion` segundos"""
+        rtf, medido = self.rtf_modelo(firma, modelo)
+        medida = self.datos['modelos'].get(firma, {}).get(modelo, {})
+        etapas = self.datos['etapas']
+        
+        transcripcion = duracion * rtf / max(1, procesos)
+        traduccion = duracion * etapas.get('traduccion', {}).get('rtf', 0) * idiomas
+        decodificacion = duracion * etapas.get('decodificacion', {}).get('rtf', 0)
+        # Con traducción en paralelo solo cuenta la etapa más lenta
+        proceso = max(transcripcion, traduccion) if en_paralelo else transcripcion + traduccion
+        
+        memoria_modelo = medida.get('memoria_mb') or RAM_MODELOS_MB[modelo]
+        audio_mb = duracion * 16000 * 4 / (1024 * 1024)   # float32 a 16 kHz
+        return {
+            'modelo': modelo,
+            'rtf': rtf,
+            'medido': medido,
+            'segundos': medida.get('segundos_carga', 0) + decodificacion + proceso,
+            'memoria_mb': memoria_modelo * max(1, procesos) + audio_mb,
+        }
+    
+    def elegir(self, firma, duracion, memoria_max_mb, plazo=None, **opciones):
+        """El modelo más preciso que cabe en `memoria_max_mb` y termina antes de `plazo`.
+        
+        Si ninguno cumple el plazo se elige el más rápido que cabe en
+        memoria (y si ni siquiera cabe ninguno, tiny). La estimación
+        devuelta lleva `cumple` a False en esos casos.
+        """
+        estimaciones = [self.estimar(firma, m, duracion, **opciones) for m in MODELOS_WHISPER]
+        caben = [e for e in estimaciones if e['memoria_mb'] <= memoria_max_mb]
+        a_tiempo = [e for e in caben if plazo is None or e['segundos'] <= plazo]
+        if a_tiempo:
+            return dict(a_tiempo[-1], cumple=True)
+        return dict(min(caben or estimaciones[:1], key=lambda e: e['segundos']), cumple=False)
+
 # ============================================================
 # CLASE PRINCIPAL
 # ============================================================
@@ -99,28 +2333,133 @@ def parchear_whisper_ffmpeg(ruta_ffmpeg):
 class TraductorPortatil:
     """Traductor local con soporte para rutas con espacios"""
     
-    def __init__(self):
+    def __init__(self, tamano_lote_traduccion=32, usar_memoria_traducciones=True,
+                 audio_en_memoria=True, traduccion_en_paralelo=True, tamano_cola=64,
+                 procesos_transcripcion=1, ventana_transcripcion=600, prueba_traduccion=False,
+                 usar_cache_transcripciones=True, limite_cache_mb=4096, puntos_control=True,
+                 registrar_metricas=True, ruta_metricas=None, ruta_prometheus=None,
+                 motor_transcripcion="whisper", nucleos=None, idiomas=("es",), generar_vtt=False,
+                 recorte_inicio=0.0, recorte_duracion=None, pista_audio=None, lote_whisper=1,
+                 filtro_voz=False, duracion_en_flujo=3600, division_oraciones="stanza"):
         print("📚 Inicializando traductor portátil...")
+        inicio = time.time()
         self.ruta_base = obtener_ruta_base()
+        if registrar_metricas and not ruta_metricas:
+            ruta_metricas = os.path.join(self.ruta_base, "metricas", "ejecuciones.jsonl")
+        self.metricas = MetricasEjecucion(ruta_metricas if registrar_metricas else None, ruta_prometheus)
+        self.planificador = PlanificadorHilos(nucleos, al_cambiar=lambda reparto: self.metricas.evento('hilos', **reparto))
+        cuota = cuota_cpu_cgroup()
+        print(f"🧮 Núcleos disponibles: {self.planificador.nucleos}"
+              + (f" (cuota del contenedor: {cuota:g})" if cuota else ""))
+        self.metricas.evento('nucleos', nucleos=self.planificador.nucleos, cuota_cgroup=cuota,
+                             logicos=os.cpu_count())
         self.ruta_modelos = os.path.join(self.ruta_base, "modelos")
         self.ruta_ffmpeg = None
         self.modelo_whisper = None
-        self.traductor = None
+        self.nombre_modelo_whisper = None
+        # Un traductor de Argos por idioma de destino, todos desde la misma transcripción
+        self.idiomas = list(dict.fromkeys(idiomas)) or ["es"]
+        self.traductores = {}
+        self.traductores_lotes = {}
+        self.versiones_traduccion = {}
         self.traductor_listo = False
+        self.tamano_lote_traduccion = tamano_lote_traduccion
+        # 'stanza' traduce los textos sueltos con translate() de Argos, como siempre;
+        # 'reglas' y 'segmento' los mandan también directamente a CTranslate2
+        self.division_oraciones = division_oraciones
+        self.generar_vtt = generar_vtt
+        self.intervalo_publicacion = 1.0
+        # Fragmento y pista de audio a procesar (los tiempos del SRT siguen siendo los del original)
+        self.recorte_inicio = recorte_inicio
+        self.recorte_duracion = recorte_duracion
+        self.pista_audio = pista_audio
+        # Quitar los tramos sin voz antes de Whisper (DETECCIÓN DE VOZ)
+        self.filtro_voz = filtro_voz
+        # Audio más largo que esto (s) se decodifica por ventanas al transcribir (None = nunca)
+        self.duracion_en_flujo = duracion_en_flujo
+        self.ventana_flujo = 300
+        self.memoria = None
+        self.audio_en_memoria = audio_en_memoria
+        self.traduccion_en_paralelo = traduccion_en_paralelo
+        self.tamano_cola = tamano_cola
+        self.procesos_transcripcion = procesos_transcripcion
+        self.ventana_transcripcion = ventana_transcripcion
+        self._pool_transcripcion = None
+        # Ventanas de 30 s que Whisper decodifica juntas (de uno o varios videos)
+        self.lote_whisper = lote_whisper
+        self._decodificadores = {}
+        self._lock_decodificadores = threading.Lock()
+        self._config_pool = None
+        self.prueba_traduccion = prueba_traduccion
+        self.ruta_manifiesto = os.path.join(self.ruta_base, ".arranque.json")
+        self.manifiesto = self.leer_manifiesto()
+        self.perfil = PerfilRendimiento(os.path.join(self.ruta_base, "perfil_rendimiento.json"))
         
         # Crear carpetas necesarias
         os.makedirs(self.ruta_modelos, exist_ok=True)
         os.makedirs(os.path.join(self.ruta_base, "argos_models"), exist_ok=True)
         
+        if usar_memoria_traducciones:
+            self.abrir_memoria_traducciones()
+        
+        self.puntos_control = puntos_control
+        self.cache_transcripciones = None
+        if usar_cache_transcripciones:
+            self.cache_transcripciones = CacheTranscripciones(
+                os.path.join(self.ruta_base, "cache_transcripciones"), limite_cache_mb
+            )
+        
         # Configurar FFmpeg
         self.configurar_ffmpeg()
-        
-        # Parchear Whisper
-        if self.ruta_ffmpeg and self.ruta_ffmpeg != "ffmpeg":
-            parchear_whisper_ffmpeg(self.ruta_ffmpeg)
+        self.motor = crear_motor(motor_transcripcion, self.ruta_ffmpeg)
         
         # Inicializar traductor (VERSIÓN CORREGIDA)
         self.inicializar_traductor()
+        
+        # Whisper se importa y se parchea al cargar el primer modelo
+        self.guardar_manifiesto()
+        self.tiempo_arranque = time.time() - inicio
+        self.metricas.registrar('arranque', self.tiempo_arranque, traductor_listo=self.traductor_listo)
+        print(f"⏱️ Inicio completado en {self.tiempo_arranque:.2f} segundos")
+    
+    # ------------------------------------------------------------
+    # MANIFIESTO DE ARRANQUE
+    # ------------------------------------------------------------
+    
+    def leer_manifiesto(self):
+        """Estado resuelto en el último arranque (FFmpeg y paquetes de Argos)"""
+        try:
+            with open(self.ruta_manifiesto, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+    
+    def guardar_manifiesto(self):
+        try:
+            with open(self.ruta_manifiesto, 'w', encoding='utf-8') as f:
+                json.dump(self.manifiesto, f, indent=2)
+        except Exception:
+            pass
+    
+    @staticmethod
+    def firma_archivo(ruta):
+        """Tamaño y fecha de modificación: cambian si el archivo cambia"""
+        try:
+            info = os.stat(ruta)
+            return [info.st_size, info.st_mtime]
+        except OSError:
+            return None
+    
+    def firma_paquetes_argos(self):
+        """Firma de argos_models/: cambia al instalar o borrar paquetes"""
+        carpeta = os.path.join(self.ruta_base, "argos_models")
+        try:
+            return sorted(
+                [entrada.name, entrada.stat().st_mtime]
+                for entrada in os.scandir(carpeta) if entrada.is_dir()
+            )
+        except OSError:
+            return None
     
     # ------------------------------------------------------------
     # CONFIGURACIÓN FFMPEG
@@ -129,6 +2468,26 @@ class TraductorPortatil:
     def configurar_ffmpeg(self):
         """Busca y configura FFmpeg en el sistema"""
         print("🔧 Configurando FFmpeg...")
+        
+        # Si el FFmpeg del último arranque no ha cambiado, no hace falta buscarlo
+        guardado = self.manifiesto.get('ffmpeg') or {}
+        resuelto = shutil.which(guardado['ruta']) if guardado.get('ruta') else None
+        if resuelto and self.firma_archivo(resuelto) == guardado.get('firma'):
+            self.ruta_ffmpeg = guardado['ruta']
+            print(f"✅ FFmpeg (en caché): {self.ruta_ffmpeg}")
+            if self.ruta_ffmpeg != "ffmpeg":
+                os.environ["PATH"] = os.path.dirname(self.ruta_ffmpeg) + os.pathsep + os.environ.get("PATH", "")
+                os.environ["FFMPEG_BINARY"] = self.ruta_ffmpeg
+            return
+        
+        self.buscar_ffmpeg()
+        if self.ruta_ffmpeg:
+            self.manifiesto['ffmpeg'] = {
+                'ruta': self.ruta_ffmpeg,
+                'firma': self.firma_archivo(shutil.which(self.ruta_ffmpeg) or self.ruta_ffmpeg),
+            }
+    
+    def buscar_ffmpeg(self):
         self.ruta_ffmpeg = obtener_ruta_recurso("ffmpeg.exe")
         
         if self.ruta_ffmpeg and os.path.exists(self.ruta_ffmpeg):
@@ -151,297 +2510,1483 @@ class TraductorPortatil:
     # ------------------------------------------------------------
     
     def inicializar_traductor(self):
-        """Configura el traductor de idiomas local con instalación forzada"""
-        print("📖 Configurando traductor inglés-español...")
+        """Configura los traductores locales (inglés → cada idioma) con instalación forzada"""
+        print(f"📖 Configurando traductor inglés → {', '.join(self.idiomas)}...")
         
-        # Configurar carpeta de modelos de Argos
+        # Configurar carpeta de modelos de Argos (antes de importarlo: Argos
+        # lee esta variable al importarse)
         argos_data = os.path.join(self.ruta_base, "argos_models")
         os.environ["ARGOS_PACKAGES_DIR"] = argos_data
+        # CTranslate2 fija sus hilos al crear el traductor: los que le tocan
+        # mientras Whisper transcribe y se traduce a los demás idiomas
+        os.environ.setdefault("ARGOS_INTRA_THREADS", str(self.hilos_traduccion()))
+        os.environ.setdefault("ARGOS_INTER_THREADS", "1")
         
         try:
-            # Actualizar índice
-            print("   Actualizando índice de paquetes...")
-            argostranslate.package.update_package_index()
+            importar_argostranslate()
             
-            # ✅ CORREGIDO: get_installed_packages está en package
-            paquetes_instalados = argostranslate.package.get_installed_packages()
-            print(f"   Paquetes instalados: {len(paquetes_instalados)}")
-            
-            # Verificar si inglés-español ya está instalado
-            instalado = False
-            for p in paquetes_instalados:
-                if hasattr(p, 'from_code') and hasattr(p, 'to_code'):
-                    if p.from_code == "en" and p.to_code == "es":
-                        instalado = True
-                        print(f"   ✅ Modelo encontrado: {p}")
-                        break
+            pares = [f"en-{codigo}" for codigo in self.idiomas]
+            firma = self.firma_paquetes_argos()
+            guardado = self.manifiesto.get('argos') or {}
+            if guardado.get('firma') == firma and all(par in guardado.get('pares', []) for par in pares):
+                # Nada ha cambiado en argos_models/ desde el último arranque
+                faltan = []
+                print(f"   ✅ Modelos {', '.join(pares)} ya instalados (en caché)")
+            else:
+                # ✅ CORREGIDO: get_installed_packages está en package
+                paquetes_instalados = argostranslate.package.get_installed_packages()
+                print(f"   Paquetes instalados: {len(paquetes_instalados)}")
+                
+                # Verificar qué pares ya están instalados
+                instalados = set()
+                for p in paquetes_instalados:
+                    if hasattr(p, 'from_code') and hasattr(p, 'to_code'):
+                        instalados.add(f"{p.from_code}-{p.to_code}")
+                for par in pares:
+                    if par in instalados:
+                        print(f"   ✅ Modelo {par} ya instalado")
+                faltan = [par for par in pares if par not in instalados]
             
-            if not instalado:
-                print("   ⚠️ Modelo inglés-español NO instalado")
-                print("   📥 Descargando e instalando modelo...")
+            if faltan:
+                print(f"   ⚠️ Modelos NO instalados: {', '.join(faltan)}")
+                print("   📥 Descargando e instalando modelos...")
                 
-                # Obtener paquetes disponibles
-                paquetes = argostranslate.package.get_available_packages()
-                paquete_es = None
+                # Solo hace falta el índice (y la red) cuando hay que descargar
+                print("   Actualizando índice de paquetes...")
+                argostranslate.package.update_package_index()
                 
-                for p in paquetes:
-                    if p.from_code == "en" and p.to_code == "es":
-                        paquete_es = p
-                        print(f"   ✅ Paquete encontrado: {p}")
-                        break
+                # Obtener paquetes disponibles
+                disponibles = {f"{p.from_code}-{p.to_code}": p
+                               for p in argostranslate.package.get_available_packages()}
                 
-                if paquete_es:
-                    print(f"   Descargando desde: {paquete_es}")
-                    ruta_paquete = paquete_es.download()
-                    print(f"   Instalando desde: {ruta_paquete}")
-                    argostranslate.package.install_from_path(ruta_paquete)
-                    print("   ✅ Modelo instalado correctamente")
-                else:
-                    print("   ❌ No se encontró paquete de traducción")
-                    self.traductor_listo = False
-                    return
-            else:
-                print("   ✅ Modelo inglés-español ya instalado")
+                for par in faltan:
+                    paquete = disponibles.get(par)
+                    if paquete:
+                        print(f"   Descargando desde: {paquete}")
+                        ruta_paquete = paquete.download()
+                        print(f"   Instalando desde: {ruta_paquete}")
+                        argostranslate.package.install_from_path(ruta_paquete)
+                        print(f"   ✅ Modelo {par} instalado correctamente")
+                    else:
+                        print(f"   ❌ No se encontró paquete de traducción {par}")
             
             # ✅ CORREGIDO: Obtener idiomas instalados (translate)
-            print("   Obteniendo traductor...")
-            installed_languages = argostranslate.translate.get_installed_languages()
+            print("   Obteniendo traductores...")
+            installed_languages = {lang.code: lang for lang in argostranslate.translate.get_installed_languages()}
+            from_lang = installed_languages.get("en")
             
-            from_lang = None
-            to_lang = None
-            
-            for lang in installed_languages:
-                if lang.code == "en":
-                    from_lang = lang
-                if lang.code == "es":
-                    to_lang = lang
+            for codigo in self.idiomas:
+                to_lang = installed_languages.get(codigo)
+                traductor = from_lang.get_translation(to_lang) if from_lang and to_lang else None
+                if traductor:
+                    self.traductores[codigo] = traductor
+                    self.versiones_traduccion[codigo] = self.obtener_version_modelo(traductor)
+                else:
+                    print(f"   ❌ No se pudo obtener el traductor en-{codigo}")
             
-            if from_lang and to_lang:
-                self.traductor = from_lang.get_translation(to_lang)
+            self.traductor_listo = bool(self.traductores)
+            if self.traductor_listo:
+                self.manifiesto['argos'] = {'firma': self.firma_paquetes_argos(),
+                                            'pares': [f"en-{codigo}" for codigo in self.traductores]}
+                print(f"   ✅ Traductor listo para usar ({', '.join(self.traductores)})")
                 
-                if self.traductor:
-                    self.traductor_listo = True
-                    print("   ✅ Traductor listo para usar")
-                    
-                    # PRUEBA DE TRADUCCIÓN
-                    prueba = "Hello world"
-                    try:
-                        traduccion = self.traductor.translate(prueba)
-                        print(f"   📝 Prueba: '{prueba}' → '{traduccion}'")
-                        if traduccion == prueba:
-                            print("   ⚠️ ADVERTENCIA: La traducción devolvió el mismo texto")
-                        else:
-                            print("   ✅ Traducción funcionando correctamente")
-                    except Exception as e:
-                        print(f"   ❌ Error en prueba: {e}")
-                else:
-                    print("   ❌ No se pudo obtener el traductor")
-                    self.traductor_listo = False
+                if self.prueba_traduccion:
+                    self.probar_traductor()
             else:
                 print("   ❌ No se encontraron los idiomas instalados")
-                self.traductor_listo = False
                 
         except Exception as e:
             print(f"❌ Error configurando traductor: {e}")
             traceback.print_exc()
             self.traductor_listo = False
     
+    def hilos_traduccion(self):
+        """Hilos de cada traductor mientras Whisper y los demás idiomas trabajan a la vez"""
+        return self.planificador.previstos(
+            'traduccion', junto_a=['transcripcion'] + ['traduccion'] * (len(self.idiomas) - 1)
+        )
+    
+    def probar_traductor(self):
+        """Traducción de prueba para diagnosticar los traductores"""
+        prueba = "Hello world"
+        for codigo, traductor in self.traductores.items():
+            try:
+                traduccion = traductor.translate(prueba)
+                print(f"   📝 Prueba en-{codigo}: '{prueba}' → '{traduccion}'")
+                if traduccion == prueba:
+                    print("   ⚠️ ADVERTENCIA: La traducción devolvió el mismo texto")
+                else:
+                    print("   ✅ Traducción funcionando correctamente")
+            except Exception as e:
+                print(f"   ❌ Error en prueba: {e}")
+    
+    @staticmethod
+    def obtener_version_modelo(traduccion):
+        """Versión del paquete de Argos detrás de una traducción"""
+        while hasattr(traduccion, 'underlying'):
+            traduccion = traduccion.underlying
+        pkg = getattr(traduccion, 'pkg', None)
+        return getattr(pkg, 'package_version', None) or "desconocida"
+    
+    def abrir_memoria_traducciones(self):
+        """Abre la memoria de traducciones junto a argos_models/"""
+        ruta = os.path.join(self.ruta_base, "argos_models", "memoria_traducciones.sqlite3")
+        try:
+            self.memoria = MemoriaTraducciones(ruta)
+        except Exception as e:
+            print(f"⚠️ Memoria de traducciones no disponible: {e}")
+            self.memoria = None
+    
     # ------------------------------------------------------------
     # CARGA DE MODELO WHISPER
     # ------------------------------------------------------------
     
     def cargar_modelo_whisper(self, modelo="base"):
         """Carga el modelo de Whisper"""
-        print(f"🎤 Cargando modelo Whisper '{modelo}'...")
+        modelo_whisper = self.crear_modelo_whisper(modelo)
+        if modelo_whisper is None:
+            return False
+        self.modelo_whisper = modelo_whisper
+        self.nombre_modelo_whisper = modelo
+        return True
+    
+    def crear_modelo_whisper(self, modelo="base", instancias=1):
+        """Carga una instancia nueva del modelo de Whisper (None si falla).
+        
+        `instancias` es cuántos modelos transcribirán a la vez (modo lote),
+        para los motores que fijan sus hilos al cargar el modelo.
+        """
+        print(f"🎤 Cargando modelo Whisper '{modelo}' ({self.motor.firma()})...")
         inicio = time.time()
         
-        try:
-            os.environ["WHISPER_CACHE_DIR"] = self.ruta_modelos
-            self.modelo_whisper = whisper.load_model(
-                modelo, 
-                device="cpu",
-                download_root=self.ruta_modelos
-            )
-            print(f"✅ Modelo Whisper cargado en {time.time()-inicio:.1f} segundos")
-            return True
-        except Exception as e:
-            print(f"❌ Error cargando modelo: {e}")
-            traceback.print_exc()
+        with self.metricas.etapa('carga_modelo', modelo=modelo, motor=self.motor.firma()) as registro:
+            try:
+                junto_a = ['transcripcion'] * (instancias - 1)
+                if self.traduccion_en_paralelo:
+                    junto_a.append('traduccion')
+                hilos = self.planificador.previstos('transcripcion', junto_a=junto_a)
+                registro['hilos'] = hilos
+                modelo_whisper = self.motor.cargar(modelo, self.ruta_modelos, hilos)
+                print(f"✅ Modelo Whisper cargado en {time.time()-inicio:.1f} segundos")
+                return modelo_whisper
+            except Exception as e:
+                registro['estado'] = 'error'
+                print(f"❌ Error cargando modelo: {e}")
+                traceback.print_exc()
+                return None
+    
+    # ------------------------------------------------------------
+    # SELECCIÓN AUTOMÁTICA DE MODELO
+    # ------------------------------------------------------------
+    
+    def calibrar_rendimiento(self, ruta_muestra, modelos=None, segundos=30):
+        """Mide la velocidad y la memoria de cada modelo con un fragmento real.
+        
+        Por defecto mide los modelos ya descargados (para no descargar
+        gigas solo por calibrar); los demás se extrapolan. Devuelve False
+        si no se pudo medir nada.
+        """
+        print(f"\n📏 Calibrando rendimiento con los primeros {segundos} s de: {os.path.basename(ruta_muestra)}")
+        inicio = time.time()
+        audio = self.cargar_audio_memoria(ruta_muestra, duracion_maxima=segundos)
+        if audio is None:
+            return False
+        duracion = duracion_audio(audio)
+        if duracion < 5:
+            print("❌ La muestra es demasiado corta para calibrar")
+            return False
+        self.perfil.registrar_etapa('decodificacion', rtf=(time.time() - inicio) / duracion)
+        
+        if not modelos:
+            modelos = [m for m in MODELOS_WHISPER if self.motor.modelo_descargado(m, self.ruta_modelos)]
+        if not modelos:
+            print("   ℹ️ No hay modelos descargados: se mide 'tiny' (se descargará)")
+            modelos = ['tiny']
+        
+        opciones = self.opciones_transcripcion()
+        firma = self.motor.firma()
+        textos = []
+        # De menor a mayor: así el pico de memoria solo sube aunque no se pueda reiniciar
+        for modelo in sorted(modelos, key=MODELOS_WHISPER.index):
+            gc.collect()
+            antes = memoria_actual_mb()
+            reiniciar_memoria_pico()
+            
+            inicio = time.time()
+            modelo_whisper = self.crear_modelo_whisper(modelo)
+            if modelo_whisper is None:
+                continue
+            segundos_carga = time.time() - inicio
+            
+            inicio = time.time()
+            with self.planificador.etapa('transcripcion'):
+                resultado = self.motor.transcribir(modelo_whisper, audio, **opciones)
+            rtf = (time.time() - inicio) / duracion
+            
+            pico = memoria_pico_mb()
+            memoria = round(pico - antes) or None if pico and antes and pico > antes else None
+            del modelo_whisper
+            gc.collect()
+            
+            self.perfil.registrar_modelo(firma, modelo, rtf=round(rtf, 6), memoria_mb=memoria,
+                                         segundos_carga=round(segundos_carga, 2),
+                                         nucleos=self.planificador.nucleos)
+            textos = [s['text'].strip() for s in resultado['segments'] if s['text'].strip()] or textos
+            print(f"   {modelo:<6}  RTF {rtf:.2f}  carga {segundos_carga:.1f} s"
+                  + (f"  memoria {memoria} MB" if memoria else ""))
+        
+        if not self.perfil.calibrado(firma):
             return False
+        
+        if textos and self.traductor_listo:
+            # Ritmo por idioma: con varios idiomas se comparten los mismos núcleos
+            inicio = time.time()
+            for idioma in self.traductores:
+                self._traducir_lote_sin_memoria(textos, idioma)
+            self.perfil.registrar_etapa('traduccion',
+                                        rtf=(time.time() - inicio) / duracion / len(self.traductores))
+        
+        self.perfil.guardar()
+        print(f"✅ Perfil de rendimiento guardado en: {self.perfil.ruta}")
+        return True
+    
+    def modelo_automatico(self, ruta_video, memoria_max_mb=None, plazo=None, duracion=None):
+        """Elige el modelo más preciso que cabe en memoria y termina a tiempo.
+        
+        `plazo` son segundos (por defecto, la duración del video: no ir
+        más lento que el tiempo real). Si no hay perfil para el motor
+        actual, se calibra primero con el propio video.
+        """
+        if duracion is None:
+            duracion = self.duracion_a_procesar(ruta_video)
+        if not duracion:
+            print("⚠️ No se pudo saber la duración del video: se usa 'base'")
+            return 'base'
+        
+        if not self.perfil.calibrado(self.motor.firma()):
+            self.calibrar_rendimiento(ruta_video)
+        
+        libre = memoria_disponible_mb()
+        limite = libre - 1024 if libre else RAM_MODELOS_MB['small']
+        if memoria_max_mb:
+            limite = min(limite, memoria_max_mb)
+        if plazo is None:
+            plazo = duracion
+        
+        eleccion = self.perfil.elegir(self.motor.firma(), duracion, limite, plazo,
+                                      en_paralelo=self.traduccion_en_paralelo,
+                                      procesos=self.procesos_transcripcion, idiomas=len(self.idiomas))
+        print(f"\n🤖 Selección automática: modelo '{eleccion['modelo']}'")
+        print(f"   Video: {duracion / 60:.1f} min | memoria para el modelo: {limite / 1024:.1f} GB"
+              f" | plazo: {plazo / 60:.1f} min")
+        fin = time.strftime('%H:%M', time.localtime(time.time() + eleccion['segundos']))
+        print(f"   ⏱️ Previsto: {eleccion['segundos'] / 60:.1f} min (terminaría hacia las {fin}),"
+              f" ~{eleccion['memoria_mb'] / 1024:.1f} GB"
+              + ("" if eleccion['medido'] else " (velocidad estimada, modelo sin calibrar)"))
+        if not eleccion['cumple']:
+            print("   ⚠️ Ningún modelo cumple el plazo y la memoria: se usa el más rápido que cabe")
+        self.metricas.evento('seleccion_modelo', video=ruta_video, duracion=duracion, limite_memoria_mb=limite,
+                             plazo=plazo, **eleccion)
+        return eleccion['modelo']
     
     # ------------------------------------------------------------
     # TRADUCCIÓN
     # ------------------------------------------------------------
     
-    def traducir_texto(self, texto):
-        """Traduce texto de inglés a español"""
-        if not self.traductor_listo or not self.traductor:
+    def traducir_texto(self, texto, idioma=None):
+        """Traduce texto de inglés al idioma indicado (por defecto, el primero)"""
+        idioma = idioma or self.idiomas[0]
+        clave = self._clave_memoria(texto, idioma)
+        if clave:
+            traduccion = self.memoria.obtener(clave)
+            if traduccion is not None:
+                return traduccion
+        
+        resultado = self._traducir_lote_sin_memoria([texto], idioma)[0]
+        if clave and resultado != texto:
+            self.memoria.guardar_traduccion(clave, f"en-{idioma}", texto, resultado)
+        return resultado
+    
+    def _clave_memoria(self, texto, idioma):
+        if not self.memoria or idioma not in self.traductores or not texto.strip():
+            return None
+        version = self.versiones_traduccion[idioma]
+        if self.division_oraciones != 'stanza':
+            # Otra división puede dar otra traducción: no mezclarlas en la memoria
+            version = f"{version}+{self.division_oraciones}"
+        return MemoriaTraducciones.clave(texto, f"en-{idioma}", version)
+    
+    def _traducir_sin_memoria(self, texto, idioma):
+        traductor = self.traductores.get(idioma)
+        if not traductor:
             if len(texto) > 30:
                 print(f"   ⚠️ Traductor no disponible, texto sin traducir: {texto[:30]}...")
             return texto
         
         try:
-            resultado = self.traductor.translate(texto)
-            if resultado == texto and len(texto) > 30:
-                print(f"   ⚠️ Traducción devolvió mismo texto: {texto[:30]}...")
-            return resultado
+            self.metricas.contar_traduccion(len(texto))
+            resultado = traductor.translate(texto)
+            if resultado == texto and len(texto) > 30:
+                print(f"   ⚠️ Traducción devolvió mismo texto: {texto[:30]}...")
+            return resultado
+        except Exception as e:
+            print(f"   ❌ Error traduciendo: {e}")
+            return texto
+    
+    def obtener_traductor_lotes(self, idioma=None):
+        """Prepara (una sola vez por idioma) el traductor por lotes si Argos lo permite"""
+        idioma = idioma or self.idiomas[0]
+        if self.traductores_lotes.get(idioma) is None:
+            try:
+                self.traductores_lotes[idioma] = TraductorLotes(
+                    self.traductores[idioma], max(1, self.tamano_lote_traduccion),
+                    hilos=self.hilos_traduccion(), division=self.division_oraciones
+                )
+            except Exception as e:
+                print(f"   ⚠️ Traducción por lotes en-{idioma} no disponible ({e}), "
+                      f"se traducirá segmento a segmento")
+                self.traductores_lotes[idioma] = False
+        if self.traductores_lotes[idioma]:
+            # La división puede cambiar entre trabajos del servidor
+            self.traductores_lotes[idioma].division = self.division_oraciones
+        return self.traductores_lotes[idioma] or None
+    
+    def traducir_lote(self, textos, idioma=None):
+        """Traduce varios textos en una sola llamada, conservando el orden"""
+        idioma = idioma or self.idiomas[0]
+        textos = list(textos)
+        resultados = [None] * len(textos)
+        claves = [self._clave_memoria(t, idioma) for t in textos]
+        
+        # Primero la memoria: solo se traduce lo que no se ha visto antes
+        pendientes = []
+        for i, clave in enumerate(claves):
+            if clave:
+                resultados[i] = self.memoria.obtener(clave)
+            if resultados[i] is None:
+                pendientes.append(i)
+        
+        if pendientes:
+            nuevos = self._traducir_lote_sin_memoria([textos[i] for i in pendientes], idioma)
+            for i, traduccion in zip(pendientes, nuevos):
+                resultados[i] = traduccion
+                if claves[i] and traduccion != textos[i]:
+                    self.memoria.guardar_traduccion(claves[i], f"en-{idioma}", textos[i], traduccion)
+        
+        return resultados
+    
+    def _traducir_lote_sin_memoria(self, textos, idioma=None):
+        idioma = idioma or self.idiomas[0]
+        if idioma not in self.traductores:
+            return [self._traducir_sin_memoria(t, idioma) for t in textos]
+        if self.division_oraciones == 'stanza' and (self.tamano_lote_traduccion <= 1 or len(textos) <= 1):
+            return [self._traducir_sin_memoria(t, idioma) for t in textos]
+        
+        traductor_lotes = self.obtener_traductor_lotes(idioma)
+        if not traductor_lotes:
+            return [self._traducir_sin_memoria(t, idioma) for t in textos]
+        
+        try:
+            self.metricas.contar_traduccion(sum(len(t) for t in textos))
+            traducciones = traductor_lotes.traducir(textos)
+        except Exception as e:
+            print(f"   ⚠️ Error en lote de {len(textos)} segmentos ({e}), traduciendo uno a uno...")
+            traducciones = [None] * len(textos)
+        
+        # Los segmentos que fallaron en el lote se traducen individualmente
+        return [
+            traduccion if traduccion is not None else self._traducir_sin_memoria(texto, idioma)
+            for texto, traduccion in zip(textos, traducciones)
+        ]
+    
+    # ------------------------------------------------------------
+    # EXTRACCIÓN DE AUDIO
+    # ------------------------------------------------------------
+    
+    def obtener_duracion(self, ruta_video):
+        """Duración del video en segundos (None si no se puede saber)"""
+        if not self.ruta_ffmpeg:
+            return None
+        
+        carpeta, nombre = os.path.split(self.ruta_ffmpeg)
+        ruta_ffprobe = os.path.join(carpeta, nombre.replace("ffmpeg", "ffprobe"))
+        if ruta_ffprobe != self.ruta_ffmpeg and (os.path.exists(ruta_ffprobe) or not carpeta):
+            try:
+                salida = subprocess.run(
+                    [ruta_ffprobe, "-v", "error", "-show_entries", "format=duration",
+                     "-of", "default=noprint_wrappers=1:nokey=1", ruta_video],
+                    capture_output=True, text=True, check=True, timeout=60
+                ).stdout.strip()
+                return float(salida)
+            except Exception:
+                pass
+        
+        # Sin ffprobe: FFmpeg imprime "Duration: HH:MM:SS.xx" al abrir la entrada
+        try:
+            salida = subprocess.run(
+                [self.ruta_ffmpeg, "-hide_banner", "-nostdin", "-i", ruta_video],
+                capture_output=True, text=True, errors="replace", timeout=60
+            ).stderr
+            coincidencia = re.search(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)", salida)
+            if coincidencia:
+                horas, minutos, segundos = coincidencia.groups()
+                return int(horas) * 3600 + int(minutos) * 60 + float(segundos)
+        except Exception:
+            pass
+        return None
+    
+    def duracion_a_procesar(self, ruta_video):
+        """Segundos que se van a procesar, teniendo en cuenta el recorte"""
+        duracion = self.obtener_duracion(ruta_video)
+        if duracion is None:
+            return self.recorte_duracion
+        duracion = max(0.0, duracion - (self.recorte_inicio or 0))
+        return min(duracion, self.recorte_duracion) if self.recorte_duracion else duracion
+    
+    def argumentos_recorte(self, duracion_maxima=None, desplazamiento=0.0):
+        """Argumentos de FFmpeg (antes de -i, después de -i) para el recorte y la pista.
+        
+        El inicio va antes de -i para que FFmpeg salte directamente a ese
+        punto sin leer ni decodificar lo anterior; solo se demultiplexa la
+        pista de audio elegida (nunca el video, los subtítulos ni los datos).
+        """
+        entrada = []
+        inicio = (self.recorte_inicio or 0.0) + desplazamiento
+        if inicio:
+            entrada += ["-ss", f"{inicio:.3f}"]
+        salida = ["-vn", "-sn", "-dn"]
+        if self.pista_audio is not None:
+            salida += ["-map", f"0:a:{self.pista_audio}"]
+        recorte = max(0.001, self.recorte_duracion - desplazamiento) if self.recorte_duracion else None
+        duraciones = [d for d in (recorte, duracion_maxima) if d]
+        if duraciones:
+            salida += ["-t", f"{min(duraciones):.3f}"]
+        return entrada, salida
+    
+    def timeout_ffmpeg(self, ruta_video):
+        """Timeout proporcional a la duración, para no cortar videos largos"""
+        duracion = self.duracion_a_procesar(ruta_video)
+        if duracion is None:
+            return None
+        return max(300, duracion)
+    
+    def obtener_audio(self, ruta_video):
+        """Audio listo para transcribir: en flujo si es largo, si no entero en memoria"""
+        if self.usar_audio_en_flujo(ruta_video):
+            return self.abrir_audio_en_flujo(ruta_video)
+        return self.cargar_audio_memoria(ruta_video)
+    
+    def usar_audio_en_flujo(self, ruta_video):
+        if (self.duracion_en_flujo is None or self.procesos_transcripcion > 1 or self.decodifica_por_lotes()
+                or self.filtro_voz):
+            # Las ventanas en paralelo, los lotes y el filtro de voz trabajan con el audio entero
+            return False
+        duracion = self.duracion_a_procesar(ruta_video)
+        return duracion is not None and duracion > self.duracion_en_flujo
+    
+    def abrir_audio_en_flujo(self, ruta_video):
+        """AudioEnFlujo del video: FFmpeg decodifica solo lo que la transcripción va pidiendo"""
+        if not self.ruta_ffmpeg:
+            print("❌ FFmpeg no disponible")
+            return None
+        duracion = self.duracion_a_procesar(ruta_video)
+        
+        def abrir_fuente(desde):
+            entrada, salida = self.argumentos_recorte(desplazamiento=desde)
+            # Cola de 4 bloques de 5 s: lo que FFmpeg adelanta a Whisper
+            return FuenteAudio(self.ruta_ffmpeg, ruta_video, entrada, salida, segundos_bloque=5.0,
+                               hilos=1, maximo_bloques=4)
+        
+        identidad = None
+        try:
+            estado = os.stat(ruta_video)
+            identidad = {
+                'archivo': os.path.abspath(ruta_video),
+                'tamano': estado.st_size,
+                'modificado': estado.st_mtime_ns,
+                'recorte_inicio': self.recorte_inicio,
+                'recorte_duracion': self.recorte_duracion,
+                'pista_audio': self.pista_audio,
+            }
+        except OSError:
+            pass   # Tubería o URL: la huella se calcula sobre el audio
+        
+        print(f"🔊 Audio largo ({duracion / 60:.0f} min): se decodificará por ventanas de "
+              f"{self.ventana_flujo} s mientras se transcribe")
+        return AudioEnFlujo(abrir_fuente, duracion, identidad=identidad)
+    
+    def cargar_audio_memoria(self, ruta_video, duracion_maxima=None):
+        """Decodifica el audio directamente a un array de NumPy.
+        
+        FFmpeg lee el video original y envía PCM s16le por stdout, sin
+        copias temporales del video ni WAV intermedio en disco. Con
+        `duracion_maxima` solo se decodifican los primeros segundos.
+        """
+        # Nadie espera a esta decodificación mientras tiene núcleos: puede aguardar uno libre
+        with self.planificador.etapa('ffmpeg', espera_maxima=60) as hilos, \
+                self.metricas.etapa('decodificacion', video=ruta_video, hilos=hilos) as registro:
+            audio = self._cargar_audio_memoria(ruta_video, hilos, duracion_maxima)
+            if audio is None:
+                registro['estado'] = 'error'
+            else:
+                registro['segundos_audio'] = duracion_audio(audio)
+        return audio
+    
+    def _cargar_audio_memoria(self, ruta_video, hilos=0, duracion_maxima=None):
+        print("🔊 Decodificando audio en memoria...")
+        
+        if not self.ruta_ffmpeg:
+            print("❌ FFmpeg no disponible")
+            return None
+        
+        import numpy as np
+        
+        entrada, salida = self.argumentos_recorte(duracion_maxima)
+        comando = [
+            self.ruta_ffmpeg,
+            "-hide_banner",
+            "-nostdin",
+            "-loglevel", "error",
+            "-threads", str(hilos),
+            *entrada,
+            "-i", ruta_video,
+            *salida,
+            "-f", "s16le",
+            "-acodec", "pcm_s16le",
+            "-ac", "1",
+            "-ar", "16000",
+            "-"
+        ]
+        
+        try:
+            proceso = subprocess.run(comando, capture_output=True, check=True)
+        except subprocess.CalledProcessError as e:
+            error = e.stderr.decode(errors="replace") if e.stderr else 'Desconocido'
+            print(f"❌ Error en FFmpeg: {error[:200]}")
+            return None
         except Exception as e:
-            print(f"   ❌ Error traduciendo: {e}")
-            return texto
-    
-    # ------------------------------------------------------------
-    # EXTRACCIÓN DE AUDIO
-    # ------------------------------------------------------------
+            print(f"❌ Error inesperado: {e}")
+            return None
+        
+        if not proceso.stdout:
+            print("❌ El video no contiene audio")
+            return None
+        
+        audio = np.frombuffer(proceso.stdout, np.int16).astype(np.float32)
+        del proceso
+        audio /= 32768.0
+        print(f"✅ Audio decodificado: {len(audio) / 16000:.1f} segundos")
+        return audio
     
     def extraer_audio(self, ruta_video):
         """Extrae audio usando FFmpeg"""
+        with self.planificador.etapa('ffmpeg', espera_maxima=60) as hilos, \
+                self.metricas.etapa('extraccion', video=ruta_video, hilos=hilos) as registro:
+            ruta_audio = self._extraer_audio(ruta_video, hilos)
+            if ruta_audio is None:
+                registro['estado'] = 'error'
+            else:
+                registro['segundos_audio'] = duracion_audio(ruta_audio)
+        return ruta_audio
+    
+    def _extraer_audio(self, ruta_video, hilos=0):
         print("🔊 Extrayendo audio del video...")
         
         if not self.ruta_ffmpeg:
             print("❌ FFmpeg no disponible")
             return None
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            try:
-                nombre_temp_video = "video_temp.mp4"
-                ruta_temp_video = os.path.join(temp_dir, nombre_temp_video)
-                print(f"📁 Copiando video a carpeta temporal...")
-                shutil.copy2(ruta_video, ruta_temp_video)
-                
-                audio_temp = os.path.join(temp_dir, "audio_temp.wav")
-                comando = [
-                    self.ruta_ffmpeg,
-                    "-i", ruta_temp_video,
-                    "-vn",
-                    "-acodec", "pcm_s16le",
-                    "-ar", "16000",
-                    "-ac", "1",
-                    "-y",
-                    audio_temp
-                ]
-                
-                print(f"⚙️ Ejecutando FFmpeg...")
-                subprocess.run(comando, check=True, capture_output=True, text=True, timeout=300)
-                
-                if os.path.exists(audio_temp):
-                    tamaño = os.path.getsize(audio_temp) / (1024*1024)
-                    print(f"✅ Audio extraído: {tamaño:.2f} MB")
-                    
-                    ruta_final_audio = os.path.join(
-                        os.path.dirname(ruta_video),
-                        os.path.basename(ruta_video).rsplit('.', 1)[0] + '_temp_audio.wav'
-                    )
-                    shutil.copy2(audio_temp, ruta_final_audio)
-                    print(f"✅ Audio guardado en: {ruta_final_audio}")
-                    return ruta_final_audio
-                else:
-                    print("❌ No se generó el archivo de audio")
-                    return None
-                    
-            except subprocess.TimeoutExpired:
-                print("❌ Timeout en FFmpeg")
-                return None
-            except subprocess.CalledProcessError as e:
-                print(f"❌ Error en FFmpeg: {e.stderr[:200] if e.stderr else 'Desconocido'}")
-                return None
-            except Exception as e:
-                print(f"❌ Error inesperado: {e}")
+        # FFmpeg lee el video original (las rutas con espacios van como
+        # argumento aparte) y escribe el WAV directamente junto al video
+        ruta_final_audio = os.path.join(
+            os.path.dirname(ruta_video),
+            os.path.basename(ruta_video).rsplit('.', 1)[0] + '_temp_audio.wav'
+        )
+        try:
+            entrada, salida = self.argumentos_recorte()
+            comando = [
+                self.ruta_ffmpeg,
+                "-nostdin",
+                "-threads", str(hilos),
+                *entrada,
+                "-i", ruta_video,
+                *salida,
+                "-acodec", "pcm_s16le",
+                "-ar", "16000",
+                "-ac", "1",
+                "-y",
+                ruta_final_audio
+            ]
+            
+            print(f"⚙️ Ejecutando FFmpeg...")
+            subprocess.run(comando, check=True, capture_output=True, text=True,
+                           timeout=self.timeout_ffmpeg(ruta_video))
+            
+            if os.path.exists(ruta_final_audio):
+                tamaño = os.path.getsize(ruta_final_audio) / (1024*1024)
+                print(f"✅ Audio extraído: {tamaño:.2f} MB")
+                print(f"✅ Audio guardado en: {ruta_final_audio}")
+                return ruta_final_audio
+            else:
+                print("❌ No se generó el archivo de audio")
                 return None
+                
+        except subprocess.TimeoutExpired:
+            print("❌ Timeout en FFmpeg")
+            self.limpiar_archivo(ruta_final_audio)
+            return None
+        except subprocess.CalledProcessError as e:
+            print(f"❌ Error en FFmpeg: {e.stderr[-200:] if e.stderr else 'Desconocido'}")
+            self.limpiar_archivo(ruta_final_audio)
+            return None
+        except Exception as e:
+            print(f"❌ Error inesperado: {e}")
+            return None
     
     # ------------------------------------------------------------
     # PROCESAMIENTO PRINCIPAL
     # ------------------------------------------------------------
     
-    def procesar_video(self, ruta_video, modelo="base"):
-        """Procesa un video completo"""
+    def procesar_video(self, ruta_video, modelo="base", audio=None, modelo_whisper=None,
+                       al_progreso=None):
+        """Procesa un video completo.
+        
+        `audio` permite pasar el audio ya decodificado (p. ej. precargado
+        en modo lote) y `modelo_whisper` usar una instancia distinta de
+        la compartida, como hace cada trabajador del modo lote.
+        `al_progreso` recibe un dict por cada evento de progreso.
+        """
+        ruta_video = os.path.abspath(ruta_video)
+        if modelo_whisper is None and self.modelo_whisper and self.procesos_transcripcion <= 1:
+            # El modelo ya cargado es el que se usará, aunque se pida otro nombre
+            modelo = self.nombre_modelo_whisper or modelo
+        
+        inicio = time.perf_counter()
+        
+        def notificar(evento):
+            # Tiempo hasta el primer subtítulo publicado (lo que espera quien mira)
+            if evento.get('evento') == 'subtitulos' and 'segundos_primer_subtitulo' not in registro:
+                registro['segundos_primer_subtitulo'] = round(time.perf_counter() - inicio, 3)
+                print(f"⚡ Primer subtítulo disponible a los {registro['segundos_primer_subtitulo']:.1f} segundos")
+            if al_progreso:
+                al_progreso(evento)
+        
+        with self.metricas.contexto(video=ruta_video, modelo=modelo), \
+                self.metricas.etapa('video') as registro:
+            srt_path = self._procesar_video(ruta_video, modelo, audio, modelo_whisper, notificar, registro)
+            if not srt_path:
+                registro['estado'] = 'error'
+        return srt_path
+    
+    def _procesar_video(self, ruta_video, modelo, audio, modelo_whisper, al_progreso, registro):
+        notificar = al_progreso or (lambda evento: None)
         
         print("\n" + "="*60)
         print("🎬 INICIANDO PROCESAMIENTO")
         print("="*60)
         
-        ruta_video = os.path.abspath(ruta_video)
         print(f"📹 Video: {ruta_video}")
         
         if not os.path.exists(ruta_video):
             print(f"❌ No existe el video")
             return None
         
-        if not self.modelo_whisper:
-            if not self.cargar_modelo_whisper(modelo):
-                return None
-        
-        audio_path = self.extraer_audio(ruta_video)
-        if not audio_path:
+        audio_path = None
+        if audio is None:
+            if self.usar_audio_en_flujo(ruta_video):
+                audio = self.abrir_audio_en_flujo(ruta_video)
+            elif self.audio_en_memoria:
+                audio = self.cargar_audio_memoria(ruta_video)
+            else:
+                audio = audio_path = self.extraer_audio(ruta_video)
+        if audio is None:
             return None
+        registro['segundos_audio'] = duracion_audio(audio)
+        notificar({'evento': 'audio_listo'})
+        
+        # Si este mismo audio ya se transcribió con este modelo, no hace falta Whisper
+        entrada_cache = None
+        if self.cache_transcripciones:
+            entrada_cache = self.entrada_cache_transcripcion(audio, modelo)
+            resultado = self.cache_transcripciones.obtener(entrada_cache['clave'])
+            if resultado is not None:
+                print(f"♻️ Transcripción recuperada de la caché ({len(resultado['segments'])} segmentos)")
+                notificar({'evento': 'transcripcion_completada', 'segmentos': len(resultado['segments']),
+                           'cache': True})
+                srt_path = self.generar_srt(resultado, ruta_video, notificar)
+                self.limpiar_archivo(audio_path)
+                return srt_path
+        
+        if modelo_whisper is None and self.procesos_transcripcion <= 1:
+            if not self.modelo_whisper:
+                if not self.cargar_modelo_whisper(modelo):
+                    self.limpiar_archivo(audio_path)
+                    return None
+            modelo_whisper = self.modelo_whisper
+        
+        punto_control = None
+        if self.puntos_control:
+            if entrada_cache is None:
+                entrada_cache = self.entrada_cache_transcripcion(audio, modelo)
+            punto_control = self.abrir_punto_control(ruta_video, entrada_cache['clave'])
+        
+        srt_path = None
+        try:
+            if self.traduccion_en_paralelo:
+                srt_path = self.transcribir_y_traducir(audio, ruta_video, modelo_whisper, modelo, notificar,
+                                                       entrada_cache=entrada_cache, punto_control=punto_control)
+            else:
+                srt_path = self.transcribir_y_generar(audio, ruta_video, modelo_whisper, modelo, notificar,
+                                                      entrada_cache=entrada_cache, punto_control=punto_control)
+        finally:
+            if punto_control:
+                punto_control.cerrar(completado=srt_path is not None)
+            self.limpiar_archivo(audio_path)
         
+        return srt_path
+    
+    def ruta_punto_control(self, ruta_video):
+        return os.path.splitext(self.ruta_srt(ruta_video))[0] + ".progreso.jsonl"
+    
+    def abrir_punto_control(self, ruta_video, clave):
+        try:
+            punto_control = PuntoControl(self.ruta_punto_control(ruta_video), clave)
+        except OSError as e:
+            print(f"⚠️ No se pudo crear el punto de control: {e}")
+            return None
+        if punto_control.segmentos:
+            print(f"⏯️ Reanudando desde {self.formato_srt(punto_control.desplazamiento())}: "
+                  f"{len(punto_control.segmentos)} segmentos transcritos, "
+                  f"{sum(map(len, punto_control.traducciones.values()))} subtítulos traducidos")
+        return punto_control
+    
+    def transcribir_y_generar(self, audio, ruta_video, modelo_whisper, modelo="base", al_progreso=None,
+                              entrada_cache=None, punto_control=None):
+        """Transcribe todo el audio y después genera el SRT (sin solapamiento)"""
+        notificar = al_progreso or (lambda evento: None)
         print("📝 Transcribiendo audio...")
         inicio = time.time()
         
         try:
-            resultado = self.modelo_whisper.transcribe(
-                audio_path,
-                language="en",
-                task="transcribe",
-                fp16=False,
-                verbose=False
-            )
+            resultado = self.transcribir(audio, modelo_whisper, modelo, entrada_cache=entrada_cache,
+                                         punto_control=punto_control)
             print(f"✅ Transcripción completada en {time.time()-inicio:.1f} segundos")
             print(f"   Se encontraron {len(resultado['segments'])} segmentos")
+            notificar({'evento': 'transcripcion_completada', 'segmentos': len(resultado['segments'])})
         except Exception as e:
             print(f"❌ Error transcribiendo: {e}")
             traceback.print_exc()
-            self.limpiar_archivo(audio_path)
             return None
         
         print("🔄 Generando subtítulos traducidos...")
-        srt_path = self.generar_srt(resultado, ruta_video)
-        self.limpiar_archivo(audio_path)
+        return self.generar_srt(resultado, ruta_video, notificar, punto_control=punto_control)
+    
+    def opciones_transcripcion(self):
+        """Opciones de Whisper; también forman parte de la clave de la caché"""
+        opciones = dict(language="en", task="transcribe", fp16=False, verbose=False)
+        return opciones
+    
+    def entrada_cache_transcripcion(self, audio, modelo):
+        """Clave de la caché para este audio, modelo y opciones"""
+        opciones = self.opciones_transcripcion()
+        if self.motor.nombre != MotorWhisper.nombre:
+            # Otro motor da otra transcripción del mismo audio
+            opciones['motor'] = self.motor.firma()
+        if self.procesos_transcripcion > 1:
+            # Las ventanas cambian dónde corta Whisper los segmentos
+            opciones['ventana'] = self.ventana_transcripcion
+        elif self.decodifica_por_lotes():
+            # Ventanas de 30 s sin el texto anterior como contexto
+            opciones['ventanas'] = 'independientes'
+        if self.filtro_voz:
+            opciones['filtro_voz'] = 'energia'
+        huella = huella_audio(audio)
+        return {
+            'clave': CacheTranscripciones.clave(huella, modelo, opciones),
+            'huella': huella,
+            'modelo': modelo,
+            'opciones': opciones,
+        }
+    
+    def transcribir(self, audio, modelo_whisper, modelo="base", al_segmento=None, entrada_cache=None,
+                    punto_control=None):
+        """Transcribe con la estrategia configurada.
         
-        return srt_path
+        Llama a `al_segmento` por cada segmento final, en orden, en cuanto
+        está disponible. Con `entrada_cache` el resultado se guarda en la
+        caché de transcripciones. Con `punto_control` cada segmento se
+        guarda al momento y, si ya había segmentos, solo se transcribe el
+        audio que falta.
+        """
+        duracion = duracion_audio(audio)
+        if duracion and punto_control and punto_control.segmentos:
+            duracion = max(0.0, duracion - punto_control.desplazamiento())
+        
+        # Con decodificación por lotes los hilos se reservan por lote, no por video
+        planificada = (contextlib.nullcontext() if self.decodifica_por_lotes()
+                       else self.planificador.etapa('transcripcion'))
+        with planificada as hilos, \
+                self.metricas.etapa('transcripcion', segundos_audio=duracion, motor=self.motor.firma(),
+                                    procesos=self.procesos_transcripcion, hilos=hilos) as registro:
+            resultado = self._transcribir(audio, modelo_whisper, modelo, al_segmento, entrada_cache,
+                                          punto_control)
+            registro['segmentos'] = len(resultado['segments'])
+        return resultado
+    
+    def _transcribir(self, audio, modelo_whisper, modelo, al_segmento, entrada_cache, punto_control):
+        opciones = self.opciones_transcripcion()
+        segmentos = []
+        desplazamiento = 0.0
+        
+        if punto_control and punto_control.segmentos:
+            if isinstance(audio, str):
+                audio = self.motor.cargar_audio(audio)
+            desplazamiento = punto_control.desplazamiento()
+            if isinstance(audio, AudioEnFlujo):
+                audio = audio.recortar(desplazamiento)
+            else:
+                audio = audio[int(desplazamiento * FRECUENCIA_MUESTREO):]
+            # Whisper sigue condicionado por el texto previo, como si no se hubiera cortado
+            opciones['initial_prompt'] = " ".join(s['text'].strip() for s in punto_control.segmentos[-5:]) or None
+            for segmento in punto_control.segmentos:
+                segmentos.append(segmento)
+                if al_segmento:
+                    al_segmento(segmento)
+        
+        # Whisper solo recibe los tramos con voz; los tiempos vuelven al audio original
+        mapa = None
+        if self.filtro_voz:
+            if isinstance(audio, str):
+                audio = self.motor.cargar_audio(audio)
+            audio, mapa = self.filtrar_voz(audio)
+        
+        def entregar(segmento):
+            # Se llama desde el hilo de Whisper: ahí es donde cuenta un nuevo reparto
+            self.planificador.ajustar_torch()
+            if mapa:
+                segmento = dict(mapa.segmento(segmento), id=len(segmentos))
+            if desplazamiento:
+                segmento = dict(segmento, id=len(segmentos),
+                                start=round(segmento['start'] + desplazamiento, 3),
+                                end=round(segmento['end'] + desplazamiento, 3))
+            segmentos.append(segmento)
+            if punto_control:
+                punto_control.agregar_segmento(segmento)
+            if al_segmento:
+                al_segmento(segmento)
+        
+        en_flujo = al_segmento or punto_control or mapa
+        if (desplazamiento or mapa) and len(audio) < FRECUENCIA_MUESTREO // 10:
+            resultado = {'text': "", 'segments': [], 'language': opciones['language']}
+        elif isinstance(audio, AudioEnFlujo):
+            resultado = self.transcribir_audio_en_flujo(audio, modelo_whisper, entregar if en_flujo else None,
+                                                        **opciones)
+        elif self.procesos_transcripcion > 1:
+            resultado = self.transcribir_en_paralelo(audio, modelo, entregar if en_flujo else None, **opciones)
+        elif self.decodifica_por_lotes():
+            if isinstance(audio, str):
+                audio = self.motor.cargar_audio(audio)
+            opciones.pop('initial_prompt', None)
+            resultado = self.decodificador_por_lotes(modelo_whisper).transcribir(
+                audio, entregar if en_flujo else None, **opciones)
+        else:
+            resultado = self.motor.transcribir(modelo_whisper, audio, entregar if en_flujo else None, **opciones)
+        
+        if en_flujo:
+            resultado = dict(resultado, segments=segmentos, text="".join(s['text'] for s in segmentos))
+        
+        if mapa and not resultado['segments']:
+            # Un resultado vacío tras el filtro puede ser un fallo de la detección: no se guarda
+            entrada_cache = None
+        if entrada_cache and self.cache_transcripciones:
+            try:
+                self.cache_transcripciones.guardar(
+                    entrada_cache['clave'], resultado, entrada_cache['huella'],
+                    entrada_cache['modelo'], entrada_cache['opciones']
+                )
+            except Exception as e:
+                print(f"⚠️ No se pudo guardar la transcripción en caché: {e}")
+        return resultado
+    
+    def transcribir_audio_en_flujo(self, audio, modelo_whisper, al_segmento=None, **opciones):
+        """Transcribe un AudioEnFlujo por ventanas fijas, con la memoria de audio acotada.
+        
+        Cada ventana continúa donde terminó el último segmento completo de
+        la anterior y recibe su texto como contexto (initial_prompt).
+        """
+        contexto = opciones.pop('initial_prompt', None)
+        transcripcion = TranscripcionDeslizante(self.motor, modelo_whisper, opciones,
+                                                ventana=self.ventana_flujo, paso=self.ventana_flujo, margen=2.0)
+        transcripcion.contexto = (contexto or "")[-200:]
+        segmentos = []
+        
+        def recoger(segmento):
+            segmentos.append(segmento)
+            if al_segmento:
+                al_segmento(segmento)
+        
+        fuente = audio.abrir()
+        try:
+            transcripcion.procesar(fuente, recoger)
+        finally:
+            fuente.cerrar()
+        if fuente.error:
+            raise RuntimeError(f"FFmpeg: {fuente.error}")
+        return {'text': "".join(s['text'] for s in segmentos), 'segments': segmentos,
+                'language': opciones.get('language')}
+    
+    def filtrar_voz(self, audio):
+        """Audio con solo los tramos de voz y su MapaTiempos (None si no se quita nada).
+        
+        Si no se encuentra voz, o casi nada en un audio largo, es más
+        probable que falle la detección que el audio esté vacío: se
+        transcribe entero.
+        """
+        import numpy as np
+        duracion = duracion_audio(audio)
+        with self.metricas.etapa('deteccion_voz', segundos_audio=duracion) as registro:
+            tramos = detectar_voz(audio)
+            voz = sum(fin - inicio for inicio, fin in tramos) / FRECUENCIA_MUESTREO
+            registro.update(tramos=len(tramos), segundos_voz=round(voz, 3),
+                            segundos_omitidos=round(duracion - voz, 3))
+        
+        if tramos == [(0, len(audio))]:
+            return audio, None
+        if not tramos or (duracion >= 60 and voz < 0.02 * duracion):
+            print(f"⚠️ Filtro de voz: solo {voz:.1f} de {duracion:.1f} segundos con voz, se transcribe el audio completo")
+            self.metricas.evento('filtro_voz_descartado', segundos_voz=round(voz, 3), segundos_audio=round(duracion, 3))
+            return audio, None
+        porcentaje = 100 * (duracion - voz) / duracion if duracion else 0
+        print(f"🔇 Sin voz: se omiten {duracion - voz:.1f} de {duracion:.1f} segundos ({porcentaje:.0f}%), "
+              f"{len(tramos)} tramos con voz")
+        return np.concatenate([audio[inicio:fin] for inicio, fin in tramos]), MapaTiempos(tramos)
+    
+    def transcribir_en_paralelo(self, audio, modelo, al_segmento=None, **opciones):
+        """Reparte ventanas solapadas del audio entre varios procesos"""
+        if isinstance(audio, str):
+            audio = self.motor.cargar_audio(audio)
+        
+        ventanas = dividir_en_ventanas(len(audio), self.ventana_transcripcion)
+        procesos = min(self.procesos_transcripcion, len(ventanas))
+        print(f"   🧩 {len(ventanas)} ventanas de {self.ventana_transcripcion} s en {procesos} procesos")
+        
+        pool = self.obtener_pool_transcripcion(modelo)
+        union = UnionVentanas(ventanas)
+        futuros = [
+            pool.submit(_transcribir_ventana, inicio / FRECUENCIA_MUESTREO, audio[inicio:fin], opciones)
+            for inicio, fin in ventanas
+        ]
+        # Las ventanas se unen en orden, así los segmentos salen en cuanto su ventana termina
+        for indice, futuro in enumerate(futuros):
+            for segmento in union.agregar(indice, futuro.result()):
+                if al_segmento:
+                    al_segmento(segmento)
+        
+        return {
+            'text': "".join(s['text'] for s in union.segmentos),
+            'segments': union.segmentos,
+            'language': opciones.get('language'),
+        }
+    
+    def decodifica_por_lotes(self):
+        """Si la transcripción pasa por DecodificadorPorLotes (solo openai-whisper)"""
+        return (self.lote_whisper > 1 and self.procesos_transcripcion <= 1
+                and self.motor.nombre == MotorWhisper.nombre)
+    
+    def decodificador_por_lotes(self, modelo_whisper):
+        """Decodificador compartido por todos los videos que usan esta instancia del modelo"""
+        with self._lock_decodificadores:
+            decodificador = self._decodificadores.get(id(modelo_whisper))
+            if decodificador is None:
+                decodificador = DecodificadorPorLotes(modelo_whisper, self.lote_whisper,
+                                                      planificador=self.planificador, metricas=self.metricas)
+                self._decodificadores[id(modelo_whisper)] = decodificador
+            return decodificador
+    
+    def obtener_pool_transcripcion(self, modelo):
+        """Pool de procesos con el modelo ya cargado; se reutiliza entre videos"""
+        config = (self.motor.nombre, modelo, self.procesos_transcripcion)
+        if self._pool_transcripcion is not None and self._config_pool != config:
+            self.cerrar_pool_transcripcion()
+        
+        if self._pool_transcripcion is None:
+            hilos = max(1, self.planificador.nucleos // self.procesos_transcripcion)
+            # spawn evita heredar hilos de torch y de traducción a mitad de estado
+            self._pool_transcripcion = ProcessPoolExecutor(
+                max_workers=self.procesos_transcripcion,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_inicializar_trabajador_transcripcion,
+                initargs=(self.motor.nombre, modelo, self.ruta_modelos, hilos)
+            )
+            self._config_pool = config
+        return self._pool_transcripcion
+    
+    def cerrar_pool_transcripcion(self):
+        if self._pool_transcripcion is not None:
+            self._pool_transcripcion.shutdown()
+            self._pool_transcripcion = None
+            self._config_pool = None
+    
+    def transcribir_y_traducir(self, audio, ruta_video, modelo_whisper, modelo="base", al_progreso=None,
+                               entrada_cache=None, punto_control=None):
+        """Transcribe y traduce a la vez, unidos por una cola acotada.
+        
+        Whisper (productor) deja cada segmento en la cola en cuanto lo
+        termina y un hilo (consumidor) los traduce y escribe el SRT, de
+        modo que la traducción se solapa con la transcripción.
+        """
+        print("📝 Transcribiendo y traduciendo en paralelo...")
+        inicio = time.time()
+        cola = queue.Queue(maxsize=self.tamano_cola)
+        fin_de_cola = threading.Event()
+        estado = {'srt_path': None, 'error': None}
+        contexto = self.metricas.contexto_actual()
+        
+        def consumidor():
+            try:
+                lotes = self._segmentos_de_cola(cola, fin_de_cola)
+                with self.metricas.contexto(**contexto):
+                    estado['srt_path'] = self.escribir_srt(lotes, ruta_video, al_progreso=al_progreso,
+                                                           punto_control=punto_control)
+            except Exception as e:
+                estado['error'] = e
+                # Vaciar la cola para que Whisper no se quede bloqueado
+                while not fin_de_cola.is_set():
+                    if cola.get() is None:
+                        fin_de_cola.set()
+        
+        hilo = threading.Thread(target=consumidor, name="traduccion-srt", daemon=True)
+        hilo.start()
+        
+        entregados = [0]
+        
+        def entregar(segmento):
+            entregados[0] += 1
+            cola.put(segmento)
+        
+        try:
+            resultado = self.transcribir(audio, modelo_whisper, modelo, al_segmento=entregar,
+                                         entrada_cache=entrada_cache, punto_control=punto_control)
+            print(f"✅ Transcripción completada en {time.time()-inicio:.1f} segundos")
+            print(f"   Se encontraron {len(resultado['segments'])} segmentos")
+            if al_progreso:
+                al_progreso({'evento': 'transcripcion_completada', 'segmentos': len(resultado['segments'])})
+        except Exception as e:
+            print(f"❌ Error transcribiendo: {e}")
+            traceback.print_exc()
+            cola.put(None)
+            hilo.join()
+            if entregados[0]:
+                # Lo ya traducido queda publicado; el punto de control permite completarlo
+                print(f"   ⚠️ Subtítulos parciales conservados ({entregados[0]} segmentos)")
+            else:
+                for idioma in self.idiomas:
+                    self.limpiar_archivo(self.ruta_srt(ruta_video, idioma))
+                    self.limpiar_archivo(os.path.splitext(self.ruta_srt(ruta_video, idioma))[0] + ".vtt")
+            return None
+        
+        cola.put(None)
+        hilo.join()
+        
+        if estado['error']:
+            print(f"❌ Error generando subtítulos: {estado['error']}")
+            return None
+        return estado['srt_path']
+    
+    def _segmentos_de_cola(self, cola, fin_de_cola):
+        """Agrupa en lotes los segmentos disponibles en la cola, hasta el fin (None)"""
+        tamano_lote = max(1, self.tamano_lote_traduccion)
+        while True:
+            segmento = cola.get()
+            if segmento is None:
+                fin_de_cola.set()
+                return
+            lote = [segmento]
+            # Se traduce lo que ya haya llegado sin esperar a llenar el lote
+            while len(lote) < tamano_lote:
+                try:
+                    siguiente = cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    fin_de_cola.set()
+                    yield lote
+                    return
+                lote.append(siguiente)
+            yield lote
+    
+    # ------------------------------------------------------------
+    # PROCESAMIENTO POR LOTES
+    # ------------------------------------------------------------
+    
+    def procesar_lote(self, rutas, modelo="base", trabajadores=0, omitir_existentes=False):
+        """Procesa muchos videos sin interacción, reutilizando los modelos.
+        
+        Cada trabajador carga su modelo Whisper una sola vez (Whisper no
+        admite decodificar en paralelo con la misma instancia) y comparte
+        el traductor. El audio de los siguientes videos se decodifica
+        mientras los actuales se transcriben.
+        """
+        videos = list(dict.fromkeys(os.path.abspath(v) for v in listar_videos(rutas)))
+        if omitir_existentes:
+            # Un SRT con su punto de control al lado está a medias: no se omite
+            videos = [v for v in videos
+                      if not all(os.path.exists(self.ruta_srt(v, idioma)) for idioma in self.idiomas)
+                      or os.path.exists(self.ruta_punto_control(v))]
+        if not videos:
+            print("⚠️ No hay videos que procesar")
+            return []
+        
+        trabajadores = max(1, min(trabajadores or calcular_trabajadores(modelo), len(videos)))
+        if self.decodifica_por_lotes():
+            # Un solo modelo: cada trabajador le envía las ventanas de su video y se decodifican juntas
+            trabajadores = max(trabajadores, min(self.lote_whisper, len(videos)))
+        print(f"\n📦 Modo lote: {len(videos)} videos, {trabajadores} trabajador(es), modelo '{modelo}'")
+        
+        if self.procesos_transcripcion > 1:
+            # Los modelos viven en el pool de procesos de transcripción
+            modelos = [None] * trabajadores
+        elif self.decodifica_por_lotes():
+            modelos = [self.crear_modelo_whisper(modelo)] * trabajadores
+            if modelos[0] is None:
+                return []
+            print(f"   🧮 Whisper decodifica hasta {self.lote_whisper} ventanas de 30 s a la vez")
+        else:
+            modelos = [self.crear_modelo_whisper(modelo, instancias=trabajadores) for _ in range(trabajadores)]
+            if any(m is None for m in modelos):
+                return []
+        
+        # Los núcleos se reparten entre trabajadores, traducción y FFmpeg
+        # según lo que esté en marcha en cada momento (PlanificadorHilos)
+        
+        if self.tamano_lote_traduccion > 1:
+            for idioma in self.traductores:
+                self.obtener_traductor_lotes(idioma)
+        
+        # La cola acotada limita cuántos audios precargados hay en memoria
+        cola_trabajos = queue.Queue(maxsize=trabajadores)
+        resumen = []
+        lock_resumen = threading.Lock()
+        extractor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="extraccion")
+        
+        def precargar():
+            for indice, ruta in enumerate(videos):
+                futuro = None
+                if self.audio_en_memoria and os.path.exists(ruta):
+                    futuro = extractor.submit(self.obtener_audio, ruta)
+                cola_trabajos.put((indice, ruta, futuro))
+            for _ in range(trabajadores):
+                cola_trabajos.put(None)
+        
+        def trabajador(modelo_whisper):
+            while True:
+                trabajo = cola_trabajos.get()
+                if trabajo is None:
+                    return
+                indice, ruta, futuro = trabajo
+                inicio = time.time()
+                entrada = {'video': ruta, 'srt': None, 'error': None}
+                try:
+                    audio = futuro.result() if futuro else None
+                    if futuro and audio is None:
+                        entrada['error'] = "No se pudo extraer el audio"
+                    else:
+                        entrada['srt'] = self.procesar_video(
+                            ruta, modelo, audio=audio, modelo_whisper=modelo_whisper
+                        )
+                        if not entrada['srt']:
+                            entrada['error'] = "Error durante el procesamiento"
+                        elif len(self.idiomas) > 1:
+                            entrada['srt_idiomas'] = {i: self.ruta_srt(ruta, i) for i in self.idiomas}
+                except Exception as e:
+                    traceback.print_exc()
+                    entrada['error'] = str(e)
+                entrada['segundos'] = round(time.time() - inicio, 1)
+                with lock_resumen:
+                    resumen.append((indice, entrada))
+        
+        hilo_precarga = threading.Thread(target=precargar, name="precarga-audio", daemon=True)
+        hilo_precarga.start()
+        hilos = [
+            threading.Thread(target=trabajador, args=(m,), name=f"trabajador-{i+1}", daemon=True)
+            for i, m in enumerate(modelos)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        extractor.shutdown()
+        
+        resumen = [entrada for _, entrada in sorted(resumen, key=lambda par: par[0])]
+        self.mostrar_resumen_lote(resumen)
+        return resumen
+    
+    def mostrar_resumen_lote(self, resumen):
+        print("\n" + "="*60)
+        print("📋 RESUMEN DEL LOTE")
+        print("="*60)
+        for entrada in resumen:
+            nombre = os.path.basename(entrada['video'])
+            if entrada['error']:
+                print(f"❌ {nombre} ({entrada['segundos']:.1f} s): {entrada['error']}")
+            else:
+                print(f"✅ {nombre} ({entrada['segundos']:.1f} s) → {entrada['srt']}")
+        fallos = sum(1 for e in resumen if e['error'])
+        print(f"\n📊 {len(resumen) - fallos} correctos, {fallos} con errores")
+    
+    # ------------------------------------------------------------
+    # MODO EN VIVO
+    # ------------------------------------------------------------
+    
+    def procesar_en_vivo(self, entrada, modelo="base", ruta_salida=None, tiempo_real=False, espera=10,
+                         paso=1.0, ventana=30.0):
+        """Subtítulos mientras la grabación o la emisión sigue en marcha.
+        
+        `entrada` es un archivo que puede estar creciendo (se espera
+        `espera` segundos sin datos nuevos antes de terminar), "-" para la
+        entrada estándar, una tubería o una URL de FFmpeg. Con
+        `tiempo_real` un archivo terminado se lee a su velocidad natural
+        (-re), para probar el modo en vivo sin una emisión real. Los
+        subtítulos se publican según se traducen en `ruta_salida` (por
+        defecto, junto al archivo de entrada).
+        """
+        es_archivo = entrada != "-" and os.path.exists(entrada)
+        opciones_entrada, opciones_salida = self.argumentos_recorte()
+        if tiempo_real:
+            opciones_entrada += ["-re"]
+        elif es_archivo and not stat.S_ISFIFO(os.stat(entrada).st_mode):
+            # Seguir leyendo al llegar al final mientras el archivo crezca
+            opciones_entrada += ["-follow", "1", "-rw_timeout", str(int(espera * 1000000))]
+        if not ruta_salida:
+            ruta_salida = (os.path.abspath(entrada) if es_archivo
+                           else os.path.abspath(f"en_vivo_{time.strftime('%Y%m%d-%H%M%S')}"))
+        
+        if not self.ruta_ffmpeg:
+            print("❌ FFmpeg no disponible")
+            return None
+        if self.nombre_modelo_whisper != modelo and not self.cargar_modelo_whisper(modelo):
+            return None
+        
+        print("\n" + "="*60)
+        print("🔴 MODO EN VIVO")
+        print("="*60)
+        print(f"📡 Entrada: {entrada}")
+        print(f"📁 Subtítulos: {self.ruta_srt(ruta_salida)}")
+        print("   (Ctrl+C para terminar)")
+        
+        latencias = []
+        cola = queue.Queue()
+        fin_de_cola = threading.Event()
+        estado = {'error': None}
+        contexto = self.metricas.contexto_actual()
+        
+        def al_progreso(evento):
+            if evento.get('evento') == 'subtitulos':
+                # Desde que llegó el audio del final del subtítulo hasta que se publicó
+                latencia = time.monotonic() - fuente.llegada(evento['hasta'])
+                latencias.append(latencia)
+                print(f"   🟢 {self.formato_srt(evento['hasta'])} publicado con {latencia:.1f} s de retraso")
+        
+        def consumidor():
+            try:
+                with self.metricas.contexto(**contexto):
+                    self.escribir_srt(self._segmentos_de_cola(cola, fin_de_cola), ruta_salida,
+                                      al_progreso=al_progreso)
+            except Exception as e:
+                estado['error'] = e
+                while not fin_de_cola.is_set():
+                    if cola.get() is None:
+                        fin_de_cola.set()
+        
+        intervalo_previo = self.intervalo_publicacion
+        self.intervalo_publicacion = 0   # en vivo cada subtítulo se publica en cuanto existe
+        hilo = threading.Thread(target=consumidor, name="traduccion-srt", daemon=True)
+        hilo.start()
+        
+        with self.planificador.etapa('ffmpeg') as hilos_ffmpeg, \
+                self.planificador.etapa('transcripcion'), \
+                self.metricas.etapa('en_vivo', entrada=entrada, modelo=modelo, motor=self.motor.firma(),
+                                    paso=paso, ventana=ventana) as registro:
+            fuente = FuenteAudio(self.ruta_ffmpeg, entrada, opciones_entrada, opciones_salida, hilos=hilos_ffmpeg)
+            transcripcion = TranscripcionDeslizante(self.motor, self.modelo_whisper,
+                                                    self.opciones_transcripcion(), ventana, paso)
+            try:
+                transcripcion.procesar(fuente, cola.put)
+            except KeyboardInterrupt:
+                print("\n⏹️ Terminando el modo en vivo...")
+                fuente.cerrar()
+                transcripcion.terminar(cola.put)
+            finally:
+                fuente.cerrar()
+                cola.put(None)
+                hilo.join()
+                self.intervalo_publicacion = intervalo_previo
+            
+            registro['segundos_audio'] = fuente.muestras / 16000
+            registro['pasadas'] = transcripcion.pasadas
+            registro['segmentos'] = transcripcion.entregados
+            if latencias:
+                ordenadas = sorted(latencias)
+                registro['latencia_media'] = round(sum(latencias) / len(latencias), 3)
+                registro['latencia_p95'] = round(ordenadas[int(0.95 * (len(ordenadas) - 1))], 3)
+                registro['latencia_max'] = round(ordenadas[-1], 3)
+                print(f"📊 Latencia: media {registro['latencia_media']:.1f} s, "
+                      f"p95 {registro['latencia_p95']:.1f} s, máxima {registro['latencia_max']:.1f} s")
+            if fuente.error or estado['error']:
+                registro['estado'] = 'error'
+                print(f"❌ Error en modo en vivo: {fuente.error or estado['error']}")
+                return None
+        return self.ruta_srt(ruta_salida)
     
     # ------------------------------------------------------------
     # GENERACIÓN DE SRT
     # ------------------------------------------------------------
     
-    def generar_srt(self, resultado, ruta_video):
-        """Genera archivo SRT con traducción"""
+    def ruta_srt(self, ruta_video, idioma=None):
         nombre_base = os.path.splitext(ruta_video)[0]
-        srt_path = f"{nombre_base}_espanol.srt"
+        idioma = idioma or self.idiomas[0]
+        return f"{nombre_base}_{SUFIJOS_IDIOMAS.get(idioma, idioma)}.srt"
+    
+    def generar_srt(self, resultado, ruta_video, al_progreso=None, punto_control=None):
+        """Genera archivo SRT con traducción"""
+        segmentos = resultado['segments']
+        tamano_lote = max(1, self.tamano_lote_traduccion)
+        lotes = (segmentos[i:i + tamano_lote] for i in range(0, len(segmentos), tamano_lote))
+        return self.escribir_srt(lotes, ruta_video, total=len(segmentos), al_progreso=al_progreso,
+                                 punto_control=punto_control)
+    
+    def escribir_srt(self, lotes, ruta_video, total=None, al_progreso=None, punto_control=None):
+        """Traduce y escribe en los SRT lotes de segmentos según llegan.
+        
+        Se escribe un SRT por idioma de destino (y un WebVTT si
+        `generar_vtt`). Cada lote se traduce a todos los idiomas a la vez
+        (un traductor de Argos por idioma) y los subtítulos terminados se
+        publican enseguida de forma atómica (SubtitulosIncrementales).
+        Devuelve la ruta del SRT del primer idioma.
+        """
+        idiomas = self.idiomas
+        rutas = {idioma: self.ruta_srt(ruta_video, idioma) for idioma in idiomas}
+        aciertos_previos = self.memoria.aciertos if self.memoria else 0
+        fallos_previos = self.memoria.fallos if self.memoria else 0
+        cuentas = {idioma: {'llamadas': 0, 'caracteres': 0, 'segundos': 0.0, 'traducidos': 0, 'no_traducidos': 0}
+                   for idioma in idiomas}
+        # La traducción se intercala con la escritura (y con la espera a
+        # Whisper en modo paralelo): cada una se mide por separado
+        segundos_traduccion = 0.0
+        segundos_escritura = 0.0
+        memoria_traduccion = {}
+        memoria_escritura = {}
+        desde = hasta = None
+        # Con un recorte, los tiempos de Whisper empiezan en el inicio del fragmento
+        desplazamiento = self.recorte_inicio or 0.0
         
-        with open(srt_path, 'w', encoding='utf-8') as f:
-            total = len(resultado['segments'])
-            traducidos = 0
-            no_traducidos = 0
+        with contextlib.ExitStack() as pila:
+            for _ in idiomas:
+                pila.enter_context(self.planificador.etapa('traduccion'))
+            archivos = {
+                idioma: SubtitulosIncrementales(
+                    ruta, os.path.splitext(ruta)[0] + ".vtt" if self.generar_vtt else None,
+                    self.intervalo_publicacion
+                )
+                for idioma, ruta in rutas.items()
+            }
+            ejecutor = None
+            if len(idiomas) > 1:
+                ejecutor = pila.enter_context(ThreadPoolExecutor(max_workers=len(idiomas),
+                                                                 thread_name_prefix="traduccion"))
+            i = 0
             
-            for i, segmento in enumerate(resultado['segments']):
-                texto_original = segmento['text']
-                texto_traducido = self.traducir_texto(texto_original)
-                
-                if texto_traducido == texto_original:
-                    no_traducidos += 1
-                else:
-                    traducidos += 1
+            for lote in lotes:
+                inicio_lote = time.perf_counter()
+                with self.metricas.pico_memoria(memoria_traduccion):
+                    if ejecutor:
+                        futuros = {idioma: ejecutor.submit(self._traducir_lote_idioma, lote, i, idioma,
+                                                           punto_control, cuentas[idioma])
+                                   for idioma in idiomas}
+                        traducciones = {idioma: futuro.result() for idioma, futuro in futuros.items()}
+                    else:
+                        traducciones = {idiomas[0]: self._traducir_lote_idioma(lote, i, idiomas[0], punto_control,
+                                                                               cuentas[idiomas[0]])}
+                inicio_escritura = time.perf_counter()
+                segundos_traduccion += inicio_escritura - inicio_lote
+                desde = lote[0]['start'] if desde is None else desde
+                hasta = lote[-1]['end']
                 
-                inicio = self.formato_srt(segmento['start'])
-                fin = self.formato_srt(segmento['end'])
-                
-                f.write(f"{i+1}\n")
-                f.write(f"{inicio} --> {fin}\n")
-                f.write(f"{texto_traducido}\n\n")
-                
-                if (i + 1) % 10 == 0 or (i + 1) == total:
-                    print(f"   Progreso: {i+1}/{total} segmentos")
+                with self.metricas.pico_memoria(memoria_escritura):
+                    for idioma, textos_traducidos in traducciones.items():
+                        subtitulos = archivos[idioma]
+                        for numero, (segmento, texto_traducido) in enumerate(zip(lote, textos_traducidos), i):
+                            if texto_traducido == segmento['text']:
+                                cuentas[idioma]['no_traducidos'] += 1
+                            else:
+                                cuentas[idioma]['traducidos'] += 1
+                            subtitulos.agregar(numero + 1, segmento['start'] + desplazamiento,
+                                               segmento['end'] + desplazamiento, texto_traducido)
+                        subtitulos.actualizar()
+                    
+                    for _ in lote:
+                        i += 1
+                        if i % 10 == 0 or i == total:
+                            print(f"   Progreso: {i}/{total if total is not None else '?'} segmentos")
+                segundos_escritura += time.perf_counter() - inicio_escritura
+                if al_progreso:
+                    al_progreso({'evento': 'subtitulos', 'segmentos': i, 'total': total,
+                                 'hasta': round(lote[-1]['end'], 3)})
+            
+            with self.metricas.pico_memoria(memoria_escritura):
+                for subtitulos in archivos.values():
+                    subtitulos.publicar(final=True)
             
-            print(f"   📊 Estadísticas: {traducidos} traducidos, {no_traducidos} sin traducir")
+            estadisticas = " | ".join(
+                (f"{idioma}: " if len(idiomas) > 1 else "")
+                + f"{cuentas[idioma]['traducidos']} traducidos, {cuentas[idioma]['no_traducidos']} sin traducir"
+                for idioma in idiomas
+            )
+            if self.memoria:
+                self.memoria.guardar()
+                estadisticas += (f" | memoria: {self.memoria.aciertos - aciertos_previos} aciertos,"
+                                 f" {self.memoria.fallos - fallos_previos} fallos")
+            print(f"   📊 Estadísticas: {estadisticas}")
         
-        return srt_path
+        if len(idiomas) > 1:
+            for idioma, ruta in rutas.items():
+                print(f"   📁 {idioma}: {ruta}")
+        
+        segundos_audio = hasta - desde if hasta is not None else None
+        self.metricas.registrar('traduccion', segundos_traduccion, segundos_audio=segundos_audio,
+                                video=ruta_video, segmentos=i, idiomas=idiomas,
+                                llamadas_traduccion=sum(c['llamadas'] for c in cuentas.values()),
+                                caracteres_traduccion=sum(c['caracteres'] for c in cuentas.values()),
+                                segundos_idioma={idioma: round(c['segundos'], 3) for idioma, c in cuentas.items()},
+                                aciertos_memoria=self.memoria.aciertos - aciertos_previos if self.memoria else None,
+                                **memoria_traduccion)
+        self.metricas.registrar('escritura_srt', segundos_escritura,
+                                segundos_audio=segundos_audio, video=ruta_video, segmentos=i, **memoria_escritura)
+        return rutas[idiomas[0]]
+    
+    def _traducir_lote_idioma(self, lote, primero, idioma, punto_control, cuentas):
+        """Traducciones de un lote a un idioma; `primero` es el número del primer segmento"""
+        llamadas_previas, caracteres_previos = self.metricas.traducciones_hilo()
+        inicio = time.perf_counter()
+        
+        # Los subtítulos ya traducidos antes de una interrupción no se repiten
+        previas = punto_control.traducciones.get(idioma, {}) if punto_control else {}
+        pendientes = [j for j in range(len(lote)) if primero + j not in previas]
+        nuevas = self.traducir_lote([lote[j]['text'] for j in pendientes], idioma)
+        textos_traducidos = [previas.get(primero + j) for j in range(len(lote))]
+        for j, texto in zip(pendientes, nuevas):
+            textos_traducidos[j] = texto
+            if punto_control:
+                punto_control.agregar_traduccion(primero + j, texto, idioma)
+        
+        llamadas, caracteres = self.metricas.traducciones_hilo()
+        cuentas['llamadas'] += llamadas - llamadas_previas
+        cuentas['caracteres'] += caracteres - caracteres_previos
+        cuentas['segundos'] += time.perf_counter() - inicio
+        return textos_traducidos
     
     def formato_srt(self, segundos):
-        horas = int(segundos // 3600)
-        minutos = int((segundos % 3600) // 60)
-        segs = int(segundos % 60)
-        milisegundos = int((segundos - int(segundos)) * 1000)
-        return f"{horas:02d}:{minutos:02d}:{segs:02d},{milisegundos:03d}"
+        return formato_tiempo(segundos)
     
     def limpiar_archivo(self, ruta):
         try:
@@ -450,11 +3995,478 @@ class TraductorPortatil:
         except:
             pass
 
+# ============================================================
+# MODO SERVIDOR
+# ============================================================
+
+# Opciones que un trabajo puede cambiar solo mientras se procesa
+OPCIONES_TRABAJO = {
+    'tamano_lote_traduccion': int,
+    'traduccion_en_paralelo': bool,
+    'procesos_transcripcion': int,
+    'ventana_transcripcion': int,
+    'idiomas': lista_idiomas,
+    'generar_vtt': bool,
+    'recorte_inicio': segundos_de_texto,
+    'recorte_duracion': segundos_de_texto,
+    'pista_audio': int,
+    'filtro_voz': bool,
+    'duracion_en_flujo': float,
+    'division_oraciones': str,
+}
+
+ESTADOS_FINALES = ('completado', 'error')
+
+class ServidorTrabajos:
+    """Proceso residente con los modelos cargados y una cola de trabajos.
+    
+    Los trabajos se atienden de uno en uno por orden de prioridad (mayor
+    primero, y por orden de llegada a igual prioridad). Cada trabajo
+    guarda su lista de eventos para que los clientes puedan seguirlos.
+    """
+    
+    def __init__(self, traductor, modelo_defecto="base"):
+        self.traductor = traductor
+        self.modelo_defecto = modelo_defecto
+        self.modelos = {}
+        self.trabajos = {}
+        self.cola = queue.PriorityQueue()
+        self.condicion = threading.Condition()
+        self._orden = itertools.count(1)
+        self._hilo = threading.Thread(target=self._atender, name="servidor-trabajos", daemon=True)
+        self._hilo.start()
+    
+    def obtener_modelo(self, nombre):
+        """Modelo Whisper residente, uno por tamaño solicitado"""
+        if nombre not in self.modelos:
+            modelo_whisper = self.traductor.crear_modelo_whisper(nombre)
+            if modelo_whisper is None:
+                raise RuntimeError(f"No se pudo cargar el modelo '{nombre}'")
+            self.modelos[nombre] = modelo_whisper
+        return self.modelos[nombre]
+    
+    def enviar(self, datos):
+        """Valida y encola un trabajo; devuelve su estado inicial"""
+        if not isinstance(datos, dict):
+            raise ValueError("El cuerpo debe ser un objeto JSON")
+        ruta_video = datos.get('video')
+        if not ruta_video:
+            raise ValueError("Falta 'video'")
+        modelo = datos.get('modelo') or self.modelo_defecto
+        if modelo not in MODELOS_WHISPER:
+            raise ValueError(f"Modelo desconocido: {modelo}")
+        opciones = datos.get('opciones') or {}
+        for nombre in opciones:
+            if nombre not in OPCIONES_TRABAJO:
+                raise ValueError(f"Opción no admitida: {nombre}")
+            try:
+                OPCIONES_TRABAJO[nombre](opciones[nombre])
+            except (TypeError, ValueError):
+                raise ValueError(f"Valor no válido para '{nombre}': {opciones[nombre]}")
+        # Solo los idiomas con traductor cargado al arrancar el servidor
+        if 'idiomas' in opciones and not lista_idiomas(opciones['idiomas']):
+            raise ValueError("'idiomas' no puede estar vacío")
+        for idioma in lista_idiomas(opciones.get('idiomas') or []):
+            if idioma not in self.traductor.traductores:
+                raise ValueError(f"Idioma sin traductor cargado: {idioma}")
+        if opciones.get('division_oraciones', 'stanza') not in DIVISIONES_ORACIONES:
+            raise ValueError(f"División de oraciones desconocida: {opciones['division_oraciones']}")
+        prioridad = int(datos.get('prioridad', 0))
+        
+        orden = next(self._orden)
+        trabajo = {
+            'id': str(orden),
+            'video': os.path.abspath(ruta_video),
+            'modelo': modelo,
+            'prioridad': prioridad,
+            'opciones': opciones,
+            'estado': 'en_cola',
+            'srt': None,
+            'error': None,
+            'eventos': [],
+        }
+        with self.condicion:
+            self.trabajos[trabajo['id']] = trabajo
+        self._evento(trabajo, {'evento': 'en_cola'})
+        self.cola.put((-prioridad, orden, trabajo['id']))
+        return self.resumen(trabajo)
+    
+    def resumen(self, trabajo):
+        return {k: v for k, v in trabajo.items() if k != 'eventos'}
+    
+    def listar(self):
+        """Resumen de todos los trabajos (copia tomada con el lock)"""
+        with self.condicion:
+            return [self.resumen(t) for t in self.trabajos.values()]
+    
+    def consultar(self, trabajo_id):
+        """Resumen de un trabajo, o None si no existe"""
+        with self.condicion:
+            trabajo = self.trabajos.get(trabajo_id)
+            return self.resumen(trabajo) if trabajo else None
+    
+    def eventos(self, trabajo_id, desde=0):
+        """Genera los eventos de un trabajo, esperando los nuevos hasta que termine"""
+        while True:
+            with self.condicion:
+                trabajo = self.trabajos[trabajo_id]
+                while len(trabajo['eventos']) <= desde and trabajo['estado'] not in ESTADOS_FINALES:
+                    self.condicion.wait(timeout=15)
+                nuevos = trabajo['eventos'][desde:]
+                terminado = trabajo['estado'] in ESTADOS_FINALES
+            for evento in nuevos:
+                yield evento
+            desde += len(nuevos)
+            if terminado and not nuevos:
+                return
+    
+    def _evento(self, trabajo, evento):
+        evento = dict(evento, trabajo=trabajo['id'], tiempo=round(time.time(), 3))
+        with self.condicion:
+            trabajo['eventos'].append(evento)
+            self.condicion.notify_all()
+    
+    def _atender(self):
+        while True:
+            _, _, trabajo_id = self.cola.get()
+            with self.condicion:
+                trabajo = self.trabajos[trabajo_id]
+                trabajo['estado'] = 'procesando'
+            self._evento(trabajo, {'evento': 'inicio', 'video': trabajo['video']})
+            
+            # Las opciones del trabajo se aplican sobre el traductor compartido: es seguro
+            # porque hay un único hilo que atiende los trabajos, de uno en uno
+            anteriores = {n: getattr(self.traductor, n) for n in trabajo['opciones']}
+            srt = error = None
+            try:
+                for nombre, valor in trabajo['opciones'].items():
+                    setattr(self.traductor, nombre, OPCIONES_TRABAJO[nombre](valor))
+                modelo_whisper = None
+                if self.traductor.procesos_transcripcion <= 1:
+                    modelo_whisper = self.obtener_modelo(trabajo['modelo'])
+                srt = self.traductor.procesar_video(
+                    trabajo['video'],
+                    trabajo['modelo'],
+                    modelo_whisper=modelo_whisper,
+                    al_progreso=lambda evento: self._evento(trabajo, evento)
+                )
+                if not srt:
+                    error = "Error durante el procesamiento"
+            except Exception as e:
+                traceback.print_exc()
+                error = str(e)
+            finally:
+                for nombre, valor in anteriores.items():
+                    setattr(self.traductor, nombre, valor)
+            
+            # Resultado, estado y último evento a la vez, con el lock de las consultas
+            # (la condición usa un RLock, así que _evento puede volver a tomarlo)
+            with self.condicion:
+                trabajo.update(srt=srt, error=error, estado='error' if error else 'completado')
+                self._evento(trabajo, {'evento': trabajo['estado'], 'srt': srt, 'error': error})
+
+def crear_servidor_http(servidor, puerto=8765):
+    """API HTTP local (solo 127.0.0.1) sobre un ServidorTrabajos.
+    
+    POST /trabajos                 {"video", "modelo", "prioridad", "opciones"}
+    GET  /trabajos                 lista de trabajos
+    GET  /trabajos/<id>            estado de un trabajo
+    GET  /trabajos/<id>/eventos    eventos en flujo, un JSON por línea
+    GET  /estado                   modelos cargados y trabajos en cola
+    GET  /metricas                 totales por etapa en formato Prometheus
+    """
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+    
+    class Manejador(BaseHTTPRequestHandler):
+        def log_message(self, formato, *args):
+            pass
+        
+        def _responder(self, codigo, datos):
+            cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+            self.send_response(codigo)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+        
+        def do_POST(self):
+            if self.path.rstrip('/') != '/trabajos':
+                return self._responder(404, {'error': 'Ruta no encontrada'})
+            try:
+                longitud = int(self.headers.get('Content-Length', 0))
+                datos = json.loads(self.rfile.read(longitud) or b'{}')
+                self._responder(202, servidor.enviar(datos))
+            except (ValueError, TypeError) as e:
+                self._responder(400, {'error': str(e)})
+        
+        def do_GET(self):
+            partes = [p for p in self.path.split('?')[0].split('/') if p]
+            if partes == ['estado']:
+                return self._responder(200, {
+                    'modelos': sorted(servidor.modelos),
+                    'en_cola': servidor.cola.qsize(),
+                    'trabajos': len(servidor.trabajos),
+                })
+            if partes == ['metricas']:
+                cuerpo = servidor.traductor.metricas.texto_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+                return
+            if partes == ['trabajos']:
+                return self._responder(200, servidor.listar())
+            trabajo = servidor.consultar(partes[1]) if len(partes) >= 2 and partes[0] == 'trabajos' else None
+            if trabajo:
+                if len(partes) == 2:
+                    return self._responder(200, trabajo)
+                if partes[2:] == ['eventos']:
+                    return self._transmitir_eventos(trabajo['id'])
+            self._responder(404, {'error': 'Ruta no encontrada'})
+        
+        def _transmitir_eventos(self, trabajo_id):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+            self.end_headers()
+            try:
+                for evento in servidor.eventos(trabajo_id):
+                    self.wfile.write((json.dumps(evento, ensure_ascii=False) + "\n").encode('utf-8'))
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+    
+    return ThreadingHTTPServer(("127.0.0.1", puerto), Manejador)
+
+def ejecutar_servidor(traductor, puerto=8765, modelos_precarga=("base",)):
+    servidor = ServidorTrabajos(traductor, modelo_defecto=modelos_precarga[0] if modelos_precarga else "base")
+    for nombre in modelos_precarga:
+        servidor.obtener_modelo(nombre)
+    
+    http = crear_servidor_http(servidor, puerto)
+    print(f"\n🛰️ Servidor escuchando en http://127.0.0.1:{puerto} (Ctrl+C para salir)")
+    try:
+        http.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️ Servidor detenido")
+    finally:
+        http.server_close()
+    return 0
+
 # ============================================================
 # FUNCIÓN PRINCIPAL
 # ============================================================
 
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        description="Transcribe videos en inglés y genera subtítulos en español"
+    )
+    parser.add_argument("--lote", nargs="+", metavar="RUTA",
+                        help="Carpetas, videos o listas .txt a procesar sin interacción")
+    parser.add_argument("--servidor", action="store_true",
+                        help="Mantener los modelos cargados y aceptar trabajos por HTTP local")
+    parser.add_argument("--puerto", type=int, default=8765,
+                        help="Puerto del modo servidor (por defecto: 8765)")
+    parser.add_argument("--en-vivo", metavar="ENTRADA",
+                        help="Subtítulos en vivo de un archivo que se está grabando, '-' (entrada "
+                             "estándar), una tubería o una URL de FFmpeg (udp://...)")
+    parser.add_argument("--tiempo-real", action="store_true",
+                        help="Con --en-vivo: leer un archivo ya terminado a velocidad real (para pruebas)")
+    parser.add_argument("--salida", metavar="RUTA",
+                        help="Con --en-vivo: nombre base de los subtítulos (por defecto, el de la entrada)")
+    parser.add_argument("--paso", type=float, default=1.0,
+                        help="Con --en-vivo: segundos de audio nuevo entre pasadas de Whisper (por defecto: 1)")
+    parser.add_argument("--espera", type=float, default=10,
+                        help="Con --en-vivo: segundos sin datos nuevos para dar la grabación por terminada")
+    parser.add_argument("--modelo", default="base", choices=MODELOS_WHISPER + ['auto'],
+                        help="Modelo de Whisper (por defecto: base); auto = el más preciso que cabe "
+                             "en memoria y termina en el plazo")
+    parser.add_argument("--memoria-max", type=int, default=0, metavar="MB",
+                        help="Con --modelo auto: memoria máxima para el modelo (por defecto: la RAM libre)")
+    parser.add_argument("--plazo", type=float, default=0, metavar="MINUTOS",
+                        help="Con --modelo auto: tiempo máximo por video (por defecto: su duración)")
+    parser.add_argument("--calibrar", metavar="VIDEO",
+                        help="Medir la velocidad de los modelos descargados con un video de muestra")
+    parser.add_argument("--motor", default="whisper", choices=sorted(MOTORES_TRANSCRIPCION),
+                        help="Motor de transcripción: whisper (PyTorch fp32) o faster-whisper "
+                             "(CTranslate2 int8, más rápido en CPU)")
+    parser.add_argument("--idiomas", type=lista_idiomas, default="es", metavar="es,pt,fr,de",
+                        help="Idiomas de destino separados por comas: se transcribe una vez y se "
+                             "escribe un SRT por idioma (por defecto: es)")
+    parser.add_argument("--vtt", action="store_true",
+                        help="Escribir también los subtítulos en WebVTT (.vtt) junto al SRT")
+    parser.add_argument("--desde", type=segundos_de_texto, default=0.0, metavar="HH:MM:SS",
+                        help="Procesar solo desde este punto (FFmpeg salta directamente, sin leer lo anterior)")
+    parser.add_argument("--hasta", type=segundos_de_texto, metavar="HH:MM:SS",
+                        help="Procesar solo hasta este punto; los subtítulos conservan los tiempos del original")
+    parser.add_argument("--pista-audio", type=int, metavar="N",
+                        help="Pista de audio a usar (0 = la primera); por defecto, la que elija FFmpeg")
+    parser.add_argument("--trabajadores", type=int, default=0,
+                        help="Videos en paralelo (0 = según núcleos y RAM)")
+    parser.add_argument("--cache-transcripciones", choices=["info", "purgar", "vaciar"],
+                        help="Ver la caché de transcripciones o liberar espacio")
+    parser.add_argument("--limite-cache-mb", type=int, default=4096,
+                        help="Tamaño máximo de la caché de transcripciones (por defecto: 4096)")
+    parser.add_argument("--procesos", type=int, default=1,
+                        help="Procesos para transcribir cada video por ventanas (por defecto: 1)")
+    parser.add_argument("--ventana", type=int, default=600,
+                        help="Duración en segundos de cada ventana con --procesos")
+    parser.add_argument("--audio-en-flujo", type=float, default=60, metavar="MINUTOS",
+                        help="Decodificar por ventanas, sin cargar el audio entero, los videos de más de "
+                             "estos minutos (por defecto: 60; 0 = siempre; -1 = nunca)")
+    parser.add_argument("--filtro-voz", action="store_true",
+                        help="Transcribir solo los tramos con voz (se omiten silencios y fondos sin narración)")
+    parser.add_argument("--division-oraciones", choices=DIVISIONES_ORACIONES, default="stanza",
+                        help="Cómo partir en oraciones lo que se traduce: stanza (la traducción completa de "
+                             "Argos, por defecto), reglas de puntuación o el segmento entero (más rápidas)")
+    parser.add_argument("--lote-whisper", type=int, default=1, metavar="N",
+                        help="Decodificar juntas hasta N ventanas de 30 s de uno o varios videos "
+                             "(solo --motor whisper; útil con muchos clips cortos)")
+    parser.add_argument("--nucleos", type=int, default=0,
+                        help="Núcleos a repartir entre las etapas (0 = los disponibles, con cuota de contenedor)")
+    parser.add_argument("--omitir-existentes", action="store_true",
+                        help="Saltar los videos que ya tienen subtítulos")
+    parser.add_argument("--resumen", metavar="JSON",
+                        help="Guardar el resumen del lote en un archivo JSON")
+    parser.add_argument("--metricas", metavar="JSONL",
+                        help="Registro de métricas por etapa (por defecto: metricas/ejecuciones.jsonl)")
+    parser.add_argument("--sin-metricas", action="store_true",
+                        help="No escribir el registro de métricas")
+    parser.add_argument("--prometheus", metavar="ARCHIVO",
+                        help="Exportar también las métricas como archivo de texto de Prometheus (.prom)")
+    parser.add_argument("--medir-arranque", action="store_true",
+                        help="Importar Whisper y torch, mostrar lo que tarda (JSON) y salir; lo usa el empaquetador")
+    return parser
+
+def medir_arranque():
+    """Tiempo de importar Whisper (y torch) dentro de este proceso, en JSON"""
+    inicio = time.time()
+    try:
+        importar_whisper()
+    except ImportError:
+        return 1
+    print(json.dumps({
+        'segundos_importacion': round(time.time() - inicio, 3),
+        'empaquetado': bool(getattr(sys, 'frozen', False)),
+        'memoria_mb': memoria_actual_mb(),
+    }))
+    return 0
+
+def gestionar_cache_transcripciones(accion, limite_mb):
+    cache = CacheTranscripciones(os.path.join(obtener_ruta_base(), "cache_transcripciones"), limite_mb)
+    
+    if accion == "purgar":
+        borradas = cache.purgar()
+        print(f"🧹 {borradas} transcripciones borradas (límite: {limite_mb} MB)")
+    elif accion == "vaciar":
+        borradas = cache.purgar(limite_mb=0)
+        print(f"🧹 {borradas} transcripciones borradas")
+    
+    entradas = cache.entradas()
+    total_mb = sum(tamano for _, tamano, _ in entradas) / (1024 * 1024)
+    print(f"📦 Caché de transcripciones: {cache.carpeta}")
+    print(f"   {len(entradas)} transcripciones, {total_mb:.1f} MB de {limite_mb} MB")
+    
+    if accion == "info":
+        for ruta, tamano, uso in reversed(entradas[-20:]):
+            try:
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    entrada = json.load(f)
+                segmentos = len(entrada['resultado']['segments'])
+                modelo = entrada.get('modelo')
+            except (OSError, ValueError, KeyError):
+                segmentos, modelo = '?', '?'
+            fecha = time.strftime('%Y-%m-%d %H:%M', time.localtime(uso))
+            print(f"   {fecha}  {os.path.basename(ruta)[:16]}  {modelo:<6}  "
+                  f"{segmentos} segmentos  {tamano / 1024:.0f} KB")
+    return 0
+
+def main_opciones(argv):
+    """Modo sin interacción (línea de comandos con opciones)"""
+    args = crear_parser().parse_args(argv)
+    
+    if args.medir_arranque:
+        return medir_arranque()
+    
+    if args.cache_transcripciones:
+        return gestionar_cache_transcripciones(args.cache_transcripciones, args.limite_cache_mb)
+    
+    if not args.lote and not args.servidor and not args.calibrar and not args.en_vivo:
+        crear_parser().print_help()
+        return 2
+    
+    if args.hasta is not None and args.hasta <= args.desde:
+        print("❌ --hasta debe ser posterior a --desde")
+        return 2
+    
+    if (args.servidor or args.en_vivo) and args.modelo == 'auto':
+        print("❌ --modelo auto necesita la duración del video: no está disponible en modo servidor ni en vivo")
+        return 2
+    
+    try:
+        traductor = TraductorPortatil(
+            procesos_transcripcion=args.procesos,
+            ventana_transcripcion=args.ventana,
+            limite_cache_mb=args.limite_cache_mb,
+            registrar_metricas=not args.sin_metricas,
+            ruta_metricas=args.metricas,
+            ruta_prometheus=args.prometheus,
+            motor_transcripcion=args.motor,
+            nucleos=args.nucleos or None,
+            idiomas=args.idiomas,
+            generar_vtt=args.vtt,
+            recorte_inicio=args.desde,
+            recorte_duracion=args.hasta - args.desde if args.hasta else None,
+            pista_audio=args.pista_audio,
+            lote_whisper=args.lote_whisper,
+            filtro_voz=args.filtro_voz,
+            duracion_en_flujo=args.audio_en_flujo * 60 if args.audio_en_flujo >= 0 else None,
+            division_oraciones=args.division_oraciones
+        )
+        if not traductor.traductor_listo:
+            print("⚠️ El traductor no está funcionando: los subtítulos quedarán sin traducir")
+        
+        if args.calibrar:
+            return 0 if traductor.calibrar_rendimiento(args.calibrar) else 1
+        
+        if args.servidor:
+            return ejecutar_servidor(traductor, args.puerto, (args.modelo,))
+        
+        if args.en_vivo:
+            ruta = traductor.procesar_en_vivo(args.en_vivo, args.modelo, args.salida, args.tiempo_real,
+                                              args.espera, args.paso)
+            return 0 if ruta else 1
+        
+        modelo = args.modelo
+        if modelo == 'auto':
+            # El lote usa un solo modelo: se elige para el video más largo
+            duraciones = {v: traductor.duracion_a_procesar(v) or 0 for v in listar_videos(args.lote)}
+            if duraciones:
+                mas_largo = max(duraciones, key=duraciones.get)
+                modelo = traductor.modelo_automatico(mas_largo, args.memoria_max or None,
+                                                     args.plazo * 60 or None, duraciones[mas_largo])
+            else:
+                modelo = 'base'
+        
+        resumen = traductor.procesar_lote(
+            args.lote,
+            modelo=modelo,
+            trabajadores=args.trabajadores,
+            omitir_existentes=args.omitir_existentes
+        )
+        if args.resumen:
+            with open(args.resumen, 'w', encoding='utf-8') as f:
+                json.dump(resumen, f, ensure_ascii=False, indent=2)
+            print(f"📁 Resumen guardado en: {args.resumen}")
+        return 1 if any(e['error'] for e in resumen) else 0
+    except KeyboardInterrupt:
+        print("\n\n⏹️ Proceso cancelado")
+        return 130
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1].startswith("--"):
+        sys.exit(main_opciones(sys.argv[1:]))
+    
     print("="*60)
     print("🎥 TRADUCTOR DE VIDEOS PORTÁTIL - VERSIÓN FINAL CORREGIDA")
     print("="*60)
@@ -472,6 +4484,9 @@ def main():
     # Crear traductor
     traductor = TraductorPortatil()
     
+    # Importar Whisper (y torch) mientras el usuario elige modelo y video
+    threading.Thread(target=importar_whisper, daemon=True).start()
+    
     # Verificar estado del traductor
     if not traductor.traductor_listo:
         print("\n" + "="*40)
@@ -494,9 +4509,10 @@ def main():
     print("3. small  (mejor calidad, ~2GB RAM)")
     print("4. medium (alta calidad, ~5GB RAM)")
     print("5. large  (máxima calidad, ~10GB RAM)")
+    print("6. auto   (según la RAM libre, la duración del video y la velocidad medida)")
     
-    opcion = input("\nElige modelo (1-5) [2]: ").strip() or "2"
-    modelos = {'1': 'tiny', '2': 'base', '3': 'small', '4': 'medium', '5': 'large'}
+    opcion = input("\nElige modelo (1-6) [2]: ").strip() or "2"
+    modelos = {'1': 'tiny', '2': 'base', '3': 'small', '4': 'medium', '5': 'large', '6': 'auto'}
     modelo = modelos.get(opcion, 'base')
     
     # Obtener video
@@ -520,6 +4536,14 @@ def main():
     print(f"📄 Nombre: {os.path.basename(ruta_video)}")
     print(f"💾 Tamaño: {os.path.getsize(ruta_video) / (1024*1024):.2f} MB")
     
+    if modelo == 'auto':
+        plazo = input("\n⏱️ Tiempo máximo en minutos [la duración del video]: ").strip()
+        try:
+            plazo = (float(plazo.replace(',', '.')) * 60 or None) if plazo else None
+        except ValueError:
+            plazo = None
+        modelo = traductor.modelo_automatico(ruta_video, plazo=plazo)
+    
     # Procesar
     print(f"\n⏳ Procesando con modelo '{modelo}'...")
     inicio = time.time()
@@ -559,6 +4583,7 @@ def main():
     input("\nPresiona Enter para salir...")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     try:
         main()
     except Exception as e: